@@ -0,0 +1,505 @@
+str_about = '''
+    The fakecube module provides a local, in-process stand-in for CUBE:
+    an HTTP server that speaks just enough of the ChRIS collection+json
+    API for python-chrisclient (and so for the controller) to plant
+    seeds, schedule workflows, create topological joins, poll plugin
+    instances and rename feeds.
+
+    Plugin instances do not run anything. Each is given a run time when
+    it is created -- it starts once the instances it depends on are done
+    and then runs for the latency configured for its title (or plugin),
+    optionally with jitter -- and its status is simply derived from the
+    clock when it is read. An instance may be made to fail with a given
+    probability, in which case everything downstream of it is cancelled,
+    as in CUBE. Every API call is counted, and each call may be delayed
+    to mimic a loaded CUBE.
+
+    Pipelines are described as {<name>: [{'title', 'plugin', 'params'}]}
+    linear chains of pipings; `pipelines_fromSpec` derives these from a
+    compute flow spec.
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  itertools
+import  json
+import  random
+import  re
+import  threading
+import  time
+from    http.server             import BaseHTTPRequestHandler, ThreadingHTTPServer
+from    urllib.parse            import urlsplit, parse_qs
+from    typing                  import Any
+
+API_ROUTE       : str   = '/api/v1/'
+
+# the API resources that the client looks up on connecting, but that the
+# controller never uses; these are all served as empty collections
+STUB_LINKS      : list  = [
+    'chrisinstance', 'public_feeds', 'compute_resources', 'plugin_metas',
+    'tags', 'pipelinesourcefiles', 'userfiles', 'pacsfiles', 'pacsseries',
+    'filebrowser'
+]
+
+# the plugins that are not part of any pipeline, with their parameter flags
+PLUGINS         : dict  = {
+    'pl-dircopy'            : ['--dir'],
+    'pl-shexec'             : [
+        '--fileFilter', '--dirFilter', '--exec', '--noJobLogging', '--verbose',
+        '--pftelDB'
+    ],
+    'pl-topologicalcopy'    : ['--filter', '--plugininstances']
+}
+
+# the plugin of a piping, by title substring, where it is not pl-<title>
+PIPING_PLUGINS  : dict  = {
+    'QA-Check'  : 'pl-lld_chxr'
+}
+
+def pipelines_fromSpec(spec : Any) -> dict:
+    """
+    The pipelines that a compute flow <spec> (a dag.FlowSpec) schedules:
+    for each, a chain of the pipings whose titles appear in the spec --
+    those with parameter overrides, the node waited on and any titles
+    referenced by other nodes.
+
+    Args:
+        spec (dag.FlowSpec): the flow spec
+
+    Returns:
+        dict: {<pipeline name>: [{'title', 'plugin', 'params'}]}
+    """
+    d_params    : dict  = {}
+    for d_node in spec.l_node:
+        if d_node['type'] != 'workflow': continue
+        d_piping    : dict  = d_params.setdefault(d_node['pipeline'], {})
+        for str_title, d_override in d_node.get('parameters', {}).items():
+            d_piping.setdefault(str_title, list(d_override))
+        d_piping.setdefault(d_node.get('waitFor', ''), [])
+    for d_node in spec.l_node:
+        for ref in [d_node.get('attach'), d_node.get('parent'), *d_node.get('distal', [])]:
+            if isinstance(ref, dict):
+                d_params[spec.d_node[ref['node']]['pipeline']].setdefault(ref['title'], [])
+
+    d_pipeline  : dict  = {}
+    for str_name, d_piping in d_params.items():
+        # a title that is part of another (e.g. 'heatmaps' of
+        # 'generate-landmark-heatmaps') names the same piping
+        d_pipeline[str_name] = [
+            {
+                'title'     : str_title,
+                'plugin'    : plugin_forTitle(str_title),
+                'params'    : l_param or ['verbose']
+            }
+            for str_title, l_param in d_piping.items()
+            if str_title and not any(str_title != o and str_title in o for o in d_piping)
+        ]
+    return d_pipeline
+
+def plugin_forTitle(str_title : str) -> str:
+    for str_sub, str_plugin in PIPING_PLUGINS.items():
+        if str_sub in str_title: return str_plugin
+    return 'pl-' + str_title.lower()
+
+def rates_match(d_rate : dict, *l_name) -> float:
+    """
+    The value in <d_rate> whose key is a substring of the first of the
+    names <l_name> that has a match, else the 'default' value (or 0).
+    """
+    for str_name in l_name:
+        for str_key, value in d_rate.items():
+            if str_key != 'default' and str_key in str_name: return float(value)
+    return float(d_rate.get('default', 0))
+
+class FakeCUBE:
+    '''
+    The state and API of the stand-in CUBE.
+
+        latency     {<title or plugin substring>: <seconds>} run time of
+                    plugin instances; 'default' for all others
+        failRate    {<title or plugin substring>: <probability>} that an
+                    instance finishes with an error
+        qaFailRate  the probability that a QA (pl-lld_chxr) instance
+                    reports a failed QA check
+        jitter      the fraction by which run times randomly vary
+        callLatency seconds added to every API call
+        pipelines   the pipelines, as from `pipelines_fromSpec`
+        seed        the random seed
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.d_latency      : dict              = {'default': 0.1}
+        self.d_failRate     : dict              = {}
+        self.qaFailRate     : float             = 0.0
+        self.jitter         : float             = 0.0
+        self.callLatency    : float             = 0.0
+        self.d_pipelineSpec : dict              = {}
+        self.random         : random.Random     = random.Random(0)
+        self.lock           : threading.Lock    = threading.Lock()
+        self.d_ids          : dict              = {}
+        self.d_plugin       : dict              = {}
+        self.d_pipeline     : dict              = {}
+        self.d_plinst       : dict              = {}
+        self.d_workflow     : dict              = {}
+        self.d_feed         : dict              = {}
+        self.d_calls        : dict              = {}
+        self.server         : ThreadingHTTPServer   = None
+        self.url            : str               = ''
+
+        for k, v in kwargs.items():
+            if k == 'latency'       : self.d_latency.update(v)
+            if k == 'failRate'      : self.d_failRate       = dict(v)
+            if k == 'qaFailRate'    : self.qaFailRate       = float(v)
+            if k == 'jitter'        : self.jitter           = float(v)
+            if k == 'callLatency'   : self.callLatency      = float(v)
+            if k == 'pipelines'     : self.d_pipelineSpec   = dict(v)
+            if k == 'seed'          : self.random           = random.Random(v)
+
+        for str_plugin, l_flag in PLUGINS.items():
+            self.plugin_add(str_plugin, l_flag)
+        for str_name, l_piping in self.d_pipelineSpec.items():
+            self.pipeline_add(str_name, l_piping)
+        # the plugin instance that the trees grow off, in feed 1
+        self.d_feed[1]      = {'id': 1, 'name': 'fakecube'}
+        self.d_plinst[self.id_next('plinst')] = {
+            'plugin'    : self.plugin_withName('pl-dircopy'),
+            'title'     : 'input', 'feed_id': 1, 'previous_id': None,
+            'start'     : 0.0, 'end': 0.0, 'outcome': 'finishedSuccessfully',
+            'summary'   : ''
+        }
+
+    def id_next(self, str_table : str) -> int:
+        return next(self.d_ids.setdefault(str_table, itertools.count(1)))
+
+    def plugin_withName(self, str_name : str) -> dict:
+        return next(p for p in self.d_plugin.values() if p['name'] == str_name)
+
+    def plugin_add(self, str_name : str, l_flag : list) -> dict:
+        if any(p['name'] == str_name for p in self.d_plugin.values()):
+            return self.plugin_withName(str_name)
+        d_plugin    : dict  = {
+            'id'        : self.id_next('plugin'),
+            'name'      : str_name,
+            'params'    : [{'flag': f, 'name': f.lstrip('-')} for f in l_flag]
+        }
+        self.d_plugin[d_plugin['id']] = d_plugin
+        return d_plugin
+
+    def pipeline_add(self, str_name : str, l_piping : list) -> dict:
+        d_pipeline  : dict  = {'id': self.id_next('pipeline'), 'name': str_name, 'pipings': []}
+        previous    : int   = None
+        for d_piping in l_piping:
+            pipingID    : int   = self.id_next('piping')
+            d_pipeline['pipings'].append({
+                **d_piping,
+                'id'        : pipingID,
+                'previous'  : previous,
+                'plugin_id' : self.plugin_add(d_piping['plugin'], ['--' + p for p in d_piping['params']])['id']
+            })
+            previous    = pipingID
+        self.d_pipeline[d_pipeline['id']] = d_pipeline
+        return d_pipeline
+
+    def plinst_create(self, d_plugin : dict, d_data : dict, l_upstream : list = None) -> int:
+        """
+        Create an instance of <d_plugin> off d_data['previous_id'] that
+        starts once it and the <l_upstream> instances are done.
+        """
+        previousID  : int   = int(d_data['previous_id'])
+        l_up        : list  = [self.d_plinst[i] for i in [previousID, *(l_upstream or [])] if i in self.d_plinst]
+        now         : float = time.monotonic()
+        start       : float = max([now, *(d['end'] for d in l_up)])
+        str_title   : str   = d_data.get('title') or d_plugin['name']
+        outcome     : str   = 'finishedSuccessfully'
+        summary     : str   = ''
+        if any(d['outcome'] != 'finishedSuccessfully' for d in l_up):
+            outcome = 'cancelled'
+            end     = start
+        else:
+            latency : float = rates_match(self.d_latency, str_title, d_plugin['name'])
+            end     = start + latency * (1 + self.jitter * self.random.uniform(-1, 1))
+            if self.random.random() < rates_match(self.d_failRate, str_title, d_plugin['name']):
+                outcome = 'finishedWithError'
+        if d_plugin['name'] == 'pl-lld_chxr':
+            summary = 'QA check failed' if self.random.random() < self.qaFailRate else 'QA check passed'
+        plinstID    : int   = self.id_next('plinst')
+        self.d_plinst[plinstID] = {
+            'plugin'    : d_plugin,
+            'title'     : str_title,
+            'feed_id'   : self.d_plinst[previousID]['feed_id'] if previousID in self.d_plinst else None,
+            'previous_id': previousID,
+            'start'     : start,
+            'end'       : end,
+            'outcome'   : outcome,
+            'summary'   : summary
+        }
+        return plinstID
+
+    def plinst_describe(self, plinstID : int, now : float) -> dict:
+        d_plinst    : dict  = self.d_plinst[plinstID]
+        str_status  : str   = d_plinst['outcome']
+        if now < d_plinst['start']  : str_status = 'scheduled'
+        elif now < d_plinst['end']  : str_status = 'started'
+        return {
+            'id'            : plinstID,
+            'title'         : d_plinst['title'],
+            'status'        : str_status,
+            'feed_id'       : d_plinst['feed_id'],
+            'previous_id'   : d_plinst['previous_id'],
+            'plugin_id'     : d_plinst['plugin']['id'],
+            'plugin_name'   : d_plinst['plugin']['name'],
+            'summary'       : d_plinst['summary']
+        }
+
+    def workflow_create(self, d_pipeline : dict, d_data : dict) -> int:
+        """
+        Create the instances of the pipings in d_data['nodes_info'] off
+        d_data['previous_plugin_inst_id'], each off its previous piping.
+        """
+        d_plinstOfPiping    : dict  = {}
+        l_plinstID          : list  = []
+        for d_info in json.loads(d_data['nodes_info']):
+            d_piping    : dict  = next(p for p in d_pipeline['pipings'] if p['id'] == d_info['piping_id'])
+            previousID  : int   = d_plinstOfPiping.get(
+                                    d_info['previous_piping_id'],
+                                    d_data['previous_plugin_inst_id']
+                                )
+            plinstID    : int   = self.plinst_create(
+                                    self.d_plugin[d_piping['plugin_id']],
+                                    {'previous_id': previousID, 'title': d_info['title']}
+                                )
+            d_plinstOfPiping[d_info['piping_id']] = plinstID
+            l_plinstID.append(plinstID)
+        workflowID          : int   = self.id_next('workflow')
+        self.d_workflow[workflowID] = {'pipeline': d_pipeline, 'plinst': l_plinstID}
+        return workflowID
+
+    def call_count(self, str_method : str, str_path : str) -> None:
+        str_route   : str   = re.sub(r'\d+', '<id>', str_path[len(API_ROUTE):]) or '<feeds>'
+        self.d_calls[(str_method, str_route)] = self.d_calls.get((str_method, str_route), 0) + 1
+
+    def stats(self) -> dict:
+        """
+        The API calls served, in total and per method and route, and the
+        number of plugin instances and workflows created.
+        """
+        with self.lock:
+            return {
+                'calls'         : sum(self.d_calls.values()),
+                'routes'        : {'%s %s' % k: v for k, v in sorted(self.d_calls.items())},
+                'plugininstances': len(self.d_plinst) - 1,
+                'workflows'     : len(self.d_workflow)
+            }
+
+    def link(self, str_path : str) -> str:
+        return self.url + str_path
+
+    def item(self, str_path : str, d_data : dict, d_links : dict = {}) -> dict:
+        return {
+            'href'  : self.link(str_path),
+            'data'  : [{'name': k, 'value': v} for k, v in d_data.items()],
+            'links' : [{'rel': r, 'href': self.link(p)} for r, p in d_links.items()]
+        }
+
+    def collection(self,
+            str_path    : str,
+            l_item      : list,
+            d_query     : dict  = {},
+            d_links     : dict  = {}
+        ) -> dict:
+        """
+        A collection+json page of <l_item>, paged as per the 'limit' and
+        'offset' in <d_query>.
+        """
+        limit       : int   = int(d_query.get('limit', 10))
+        offset      : int   = int(d_query.get('offset', 0))
+        l_link      : list  = [{'rel': r, 'href': self.link(p)} for r, p in d_links.items()]
+        if offset + limit < len(l_item):
+            l_link.append({'rel': 'next', 'href': self.link(str_path) + '?limit=%d&offset=%d' % (limit, offset + limit)})
+        if offset:
+            l_link.append({'rel': 'previous', 'href': self.link(str_path) + '?limit=%d&offset=%d' % (limit, max(0, offset - limit))})
+        return {'collection': {
+            'version'   : '1.0',
+            'href'      : self.link(str_path),
+            'items'     : l_item[offset:offset + limit],
+            'links'     : l_link,
+            'total'     : len(l_item)
+        }}
+
+    @staticmethod
+    def error(str_message : str) -> dict:
+        return {'collection': {'version': '1.0', 'href': '', 'error': {'title': 'error', 'message': str_message}}}
+
+    @staticmethod
+    def matches(d_query : dict, d_data : dict) -> bool:
+        for str_key, str_value in d_query.items():
+            if str_key in ('limit', 'offset'): continue
+            if str_key == 'name':
+                if str_value.lower() not in str(d_data.get('name', '')).lower(): return False
+            elif str(d_data.get(str_key)) != str_value:
+                return False
+        return True
+
+    def plugin_item(self, d_plugin : dict) -> dict:
+        return self.item(
+            'plugins/%d/' % d_plugin['id'],
+            {'id': d_plugin['id'], 'name': d_plugin['name']},
+            {
+                'parameters'    : 'plugins/%d/parameters/' % d_plugin['id'],
+                'instances'     : 'plugins/%d/instances/' % d_plugin['id']
+            }
+        )
+
+    def pipeline_item(self, d_pipeline : dict) -> dict:
+        return self.item(
+            'pipelines/%d/' % d_pipeline['id'],
+            {'id': d_pipeline['id'], 'name': d_pipeline['name']},
+            {
+                'default_parameters'    : 'pipelines/%d/parameters/' % d_pipeline['id'],
+                'workflows'             : 'pipelines/%d/workflows/' % d_pipeline['id']
+            }
+        )
+
+    def pipeline_defaults(self, d_pipeline : dict) -> list:
+        return [
+            {
+                'plugin_piping_id'          : d_piping['id'],
+                'previous_plugin_piping_id' : d_piping['previous'],
+                'plugin_piping_title'       : d_piping['title'],
+                'param_name'                : str_param,
+                'value'                     : ''
+            }
+            for d_piping in d_pipeline['pipings'] for str_param in d_piping['params']
+        ]
+
+    def route(self, str_method : str, str_path : str, d_query : dict, d_body : dict) -> tuple:
+        """
+        Serve an API call.
+
+        Returns:
+            tuple: (<HTTP status>, <collection+json response>)
+        """
+        d_data      : dict  = {d['name']: d['value'] for d in d_body.get('template', {}).get('data', [])}
+        str_sub     : str   = str_path[len(API_ROUTE):]
+        now         : float = time.monotonic()
+        match       = lambda pattern: re.fullmatch(pattern, str_sub)
+        with self.lock:
+            self.call_count(str_method, str_path)
+            if str_method == 'GET':
+                if str_sub in ('', 'search/'):
+                    return 200, self.collection(str_sub, [
+                        self.item('%d/' % i, d) for i, d in self.d_feed.items()
+                        if self.matches(d_query, d)
+                    ], d_query, {
+                        **{r: r + '/' for r in STUB_LINKS},
+                        'plugins'           : 'plugins/',
+                        'plugin_instances'  : 'plugins/instances/',
+                        'pipelines'         : 'pipelines/',
+                        'workflows'         : 'workflows/'
+                    })
+                if str_sub in ('plugins/', 'plugins/search/'):
+                    return 200, self.collection(str_sub, [
+                        self.plugin_item(p) for p in self.d_plugin.values()
+                        if self.matches(d_query, p)
+                    ], d_query)
+                if m := match(r'plugins/(\d+)/parameters/'):
+                    return 200, self.collection(str_sub, [
+                        self.item(str_sub, d) for d in self.d_plugin[int(m[1])]['params']
+                    ], d_query)
+                if str_sub in ('plugins/instances/', 'plugins/instances/search/'):
+                    l_plinst    : list  = [
+                        self.plinst_describe(i, now) for i in sorted(self.d_plinst, reverse = True)
+                    ]
+                    return 200, self.collection(str_sub, [
+                        self.item('plugins/instances/%d/' % d['id'], d) for d in l_plinst
+                        if self.matches(d_query, d)
+                    ], d_query)
+                if str_sub in ('pipelines/', 'pipelines/search/'):
+                    return 200, self.collection(str_sub, [
+                        self.pipeline_item(p) for p in self.d_pipeline.values()
+                        if self.matches(d_query, p)
+                    ], d_query)
+                if m := match(r'pipelines/(\d+)/parameters/'):
+                    return 200, self.collection(str_sub, [
+                        self.item(str_sub, d) for d in self.pipeline_defaults(self.d_pipeline[int(m[1])])
+                    ], d_query)
+                if str_sub in ('workflows/', 'workflows/search/'):
+                    return 200, self.collection(str_sub, [
+                        self.item('workflows/%d/' % i, {'id': i}, {
+                            'plugin_instances': 'workflows/%d/plugininstances/' % i
+                        })
+                        for i in self.d_workflow if self.matches(d_query, {'id': i})
+                    ], d_query)
+                if m := match(r'workflows/(\d+)/plugininstances/'):
+                    return 200, self.collection(str_sub, [
+                        self.item('plugins/instances/%d/' % i, self.plinst_describe(i, now))
+                        for i in self.d_workflow[int(m[1])]['plinst']
+                    ], d_query)
+                if str_sub.rstrip('/') in STUB_LINKS:
+                    return 200, self.collection(str_sub, [], d_query)
+            if str_method == 'POST':
+                if m := match(r'plugins/(\d+)/instances/'):
+                    d_plugin    : dict  = self.d_plugin[int(m[1])]
+                    l_upstream  : list  = [
+                        int(i) for i in str(d_data.get('plugininstances', '')).split(',') if i
+                    ]
+                    plinstID    : int   = self.plinst_create(d_plugin, d_data, l_upstream)
+                    return 201, self.collection(str_sub, [
+                        self.item('plugins/instances/%d/' % plinstID, self.plinst_describe(plinstID, now))
+                    ])
+                if m := match(r'pipelines/(\d+)/workflows/'):
+                    workflowID  : int   = self.workflow_create(self.d_pipeline[int(m[1])], d_data)
+                    return 201, self.collection(str_sub, [
+                        self.item('workflows/%d/' % workflowID, {'id': workflowID})
+                    ])
+            if str_method == 'PUT':
+                if m := match(r'(\d+)/'):
+                    self.d_feed[int(m[1])].update(d_data)
+                    return 200, self.collection(str_sub, [
+                        self.item(str_sub, self.d_feed[int(m[1])])
+                    ])
+        return 404, self.error('%s %s not found' % (str_method, str_path))
+
+    def start(self, str_host : str = '127.0.0.1', port : int = 0) -> str:
+        """
+        Serve the API in a background thread.
+
+        Returns:
+            str: the API URL
+        """
+        cube        : FakeCUBE  = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def handle_call(self, str_method : str) -> None:
+                if cube.callLatency: time.sleep(cube.callLatency)
+                o_url       = urlsplit(self.path)
+                d_query     : dict  = {k: v[-1] for k, v in parse_qs(o_url.query).items()}
+                length      : int   = int(self.headers.get('Content-Length') or 0)
+                d_body      : dict  = json.loads(self.rfile.read(length) or b'{}') if length else {}
+                try:
+                    status, d_response = cube.route(str_method, o_url.path, d_query, d_body)
+                except (KeyError, ValueError, StopIteration) as e:
+                    status, d_response = 400, cube.error(repr(e))
+                b_response  : bytes = json.dumps(d_response).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/vnd.collection+json')
+                self.send_header('Content-Length', str(len(b_response)))
+                self.end_headers()
+                self.wfile.write(b_response)
+
+            def do_GET(self)    : self.handle_call('GET')
+            def do_POST(self)   : self.handle_call('POST')
+            def do_PUT(self)    : self.handle_call('PUT')
+            def log_message(self, *args) : pass
+
+        self.server         = ThreadingHTTPServer((str_host, port), Handler)
+        self.server.daemon_threads  = True
+        self.url            = 'http://%s:%d%s' % (str_host, self.server.server_port, API_ROUTE)
+        threading.Thread(target = self.server.serve_forever, daemon = True).start()
+        return self.url
+
+    def stop(self) -> None:
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
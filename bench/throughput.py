@@ -0,0 +1,242 @@
+str_about = '''
+    The throughput module benchmarks the controller end to end: it starts
+    a fake CUBE (see `fakecube`), makes N synthetic inputs and runs dylld
+    over them in a child process, exactly as it runs in a plugin
+    container. It then reports
+
+        o   trees/hour -- trees fully grown per hour of wall time;
+        o   API calls per tree -- as served by the fake CUBE;
+        o   controller CPU -- user + system seconds of the dylld process;
+        o   peak RSS -- the high-water resident memory of that process.
+
+    Any arguments not known to the benchmark are passed on to dylld, so
+    that its options (e.g. --pollPolicy adaptive, --inflight ...) can be
+    compared under the same load, e.g.
+
+        python bench/throughput.py --trees 200 --mode pipelined \\
+            --latency default=0.5,heatmaps=2 -- --stageBudget default=64
+
+    With --shards N, N controllers (each with --shard K/N) run at once
+    over the same inputs, as N pods would; CPU is then summed over them
+    and peak RSS is that of the largest.
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  sys
+import  json
+import  random
+import  shutil
+import  subprocess
+import  tempfile
+import  time
+from    argparse                import ArgumentParser, Namespace, ArgumentDefaultsHelpFormatter
+from    pathlib                 import Path
+
+ROOT            : Path  = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from    bench                   import fakecube
+from    control                 import admission
+from    control                 import dag
+from    state                   import sink
+
+MODES           : dict  = {
+    'serial'    : [],
+    'thread'    : ['--thread'],
+    'async'     : ['--async'],
+    'pipelined' : ['--pipelined']
+}
+
+def inputs_make(inputdir : Path, count : int, size : int = 4096, seed : int = 0) -> list:
+    """
+    Write <count> synthetic DICOM inputs of <size> bytes each, all with
+    different content (so that none are taken as duplicates).
+
+    Returns:
+        list: the input Paths
+    """
+    rng         : random.Random = random.Random(seed)
+    l_path      : list          = []
+    for i in range(count):
+        path    : Path  = inputdir / ('input-%06d.dcm' % i)
+        path.write_bytes(i.to_bytes(8, 'big') + rng.randbytes(max(0, size - 8)))
+        l_path.append(path)
+    return l_path
+
+def controller_run(l_arg : list, inputdir : Path, outputdir : Path, logfile : Path,
+                   shards : int = 1) -> dict:
+    """
+    Run dylld with <l_arg> over <inputdir> in a child process, logging
+    its output to <logfile> -- or, for <shards> > 1, run that many
+    children at once, one per shard, each logging to its own
+    <logfile>.<K>.
+
+    Returns:
+        dict: the (first non-zero) exit status, wall seconds, CPU seconds
+              and peak RSS (MB) of the controller(s)
+    """
+    tic         : float = time.monotonic()
+    d_run       : dict  = {'returncode': 0, 'cpu': 0.0, 'maxrssMB': 0.0}
+    l_child     : list  = []
+    for k in range(shards):
+        l_shard : list  = [] if shards == 1 else ['--shard', '%d/%d' % (k, shards)]
+        fp              = open(logfile if shards == 1 else logfile.with_name('%s.%d' % (logfile.name, k)), 'w')
+        l_child.append((fp, subprocess.Popen(
+                    [sys.executable, str(ROOT / 'dylld.py'), *l_arg, *l_shard, str(inputdir), str(outputdir)],
+                    stdout = fp, stderr = subprocess.STDOUT, cwd = str(outputdir)
+                )))
+    for fp, child in l_child:
+        _, status, rusage = os.wait4(child.pid, 0)
+        fp.close()
+        child.returncode        = os.waitstatus_to_exitcode(status)
+        d_run['returncode']     = d_run['returncode'] or child.returncode
+        d_run['cpu']           += rusage.ru_utime + rusage.ru_stime
+        # ru_maxrss is in KB on Linux
+        d_run['maxrssMB']       = max(d_run['maxrssMB'], rusage.ru_maxrss / 1024)
+    d_run['wall']   = time.monotonic() - tic
+    return d_run
+
+def treeLog_count(outputdir : Path) -> dict:
+    """
+    The number of trees logged by the controller(s) and of those that
+    were fully grown.
+    """
+    d_count     : dict  = {'logged': 0, 'grown': 0}
+    for path in sink.treeLogs_find([outputdir]):
+        for d_record in sink.treeLog_read(path):
+            d_count['logged']  += 1
+            d_count['grown']   += bool(d_record.get('tree', {}).get('finished'))
+    return d_count
+
+def benchmark_run(options : Namespace, l_extra : list = []) -> dict:
+    """
+    Run one benchmark as per <options>, passing <l_extra> on to dylld.
+
+    Returns:
+        dict: the benchmark report
+    """
+    spec        : dag.FlowSpec      = dag.flowSpec_load(options.flowSpec)
+    cube        : fakecube.FakeCUBE = fakecube.FakeCUBE(
+                                        pipelines   = fakecube.pipelines_fromSpec(spec),
+                                        latency     = admission.budgets_parse(options.latency),
+                                        failRate    = admission.budgets_parse(options.failRate),
+                                        qaFailRate  = options.qaFailRate,
+                                        jitter      = options.jitter,
+                                        callLatency = options.callLatency,
+                                        seed        = options.seed
+                                    )
+    workdir     : Path  = Path(options.workdir or tempfile.mkdtemp(prefix = 'dylld-bench-'))
+    inputdir    : Path  = workdir / 'incoming'
+    outputdir   : Path  = workdir / 'outgoing'
+    inputdir.mkdir(parents = True, exist_ok = True)
+    outputdir.mkdir(parents = True, exist_ok = True)
+    inputs_make(inputdir, options.trees, options.inputSize, options.seed)
+
+    str_url     : str   = cube.start()
+    try:
+        d_run   : dict  = controller_run(
+                            [
+                                '--CUBEurl', str_url,
+                                '--pluginInstanceID', '1',
+                                '--pollInterval', str(options.pollInterval),
+                                *([] if not options.flowSpec else ['--flowSpec', options.flowSpec]),
+                                *MODES[options.mode],
+                                *l_extra
+                            ],
+                            inputdir, outputdir, workdir / 'controller.log',
+                            shards = options.shards
+                        )
+    finally:
+        cube.stop()
+    d_cube      : dict  = cube.stats()
+    d_trees     : dict  = treeLog_count(outputdir)
+    d_report    : dict  = {
+        'mode'          : options.mode,
+        'shards'        : options.shards,
+        'args'          : l_extra,
+        'trees'         : options.trees,
+        **d_trees,
+        'returncode'    : d_run['returncode'],
+        'wall'          : round(d_run['wall'], 3),
+        'treesPerHour'  : round(d_trees['grown'] / d_run['wall'] * 3600, 1),
+        'callsPerTree'  : round(d_cube['calls'] / max(1, options.trees), 2),
+        'cpu'           : round(d_run['cpu'], 3),
+        'cpuPerTree'    : round(d_run['cpu'] / max(1, options.trees), 4),
+        'maxrssMB'      : round(d_run['maxrssMB'], 1),
+        'api'           : d_cube,
+        'workdir'       : str(workdir)
+    }
+    if not options.keep and not options.workdir:
+        shutil.rmtree(workdir, ignore_errors = True)
+        d_report['workdir'] = ''
+    return d_report
+
+def report_format(d_report : dict) -> str:
+    """
+    A one-screen summary of <d_report>
+    """
+    l_line  : list  = [
+        ' '.join([
+            'mode', d_report['mode'], *d_report['args'],
+            *(['(%d shards)' % d_report['shards']] if d_report['shards'] > 1 else [])
+        ]),
+        '%-16s %d of %d (%d logged)' % ('trees grown', d_report['grown'], d_report['trees'], d_report['logged']),
+        '%-16s %.1fs' % ('wall', d_report['wall']),
+        '%-16s %.1f' % ('trees/hour', d_report['treesPerHour']),
+        '%-16s %.2f (%d total)' % ('API calls/tree', d_report['callsPerTree'], d_report['api']['calls']),
+        '%-16s %.2fs (%.4fs/tree)' % ('controller CPU', d_report['cpu'], d_report['cpuPerTree']),
+        '%-16s %.1f MB' % ('peak RSS', d_report['maxrssMB'])
+    ]
+    for str_route, count in sorted(d_report['api']['routes'].items(), key = lambda i: -i[1]):
+        l_line.append('    %-44s %8d' % (str_route, count))
+    if d_report['returncode']:
+        l_line.append('controller exited with %d, see %s' % (d_report['returncode'], d_report['workdir'] or 'the log (use --keep)'))
+    return '\n'.join(l_line)
+
+parser      : ArgumentParser    = ArgumentParser(
+    description     = 'Benchmark dylld end to end against a fake CUBE',
+    formatter_class = ArgumentDefaultsHelpFormatter
+)
+parser.add_argument('--trees',          type = int,     default = 50,
+                    help = 'number of synthetic inputs (one tree each)')
+parser.add_argument('--mode',           choices = list(MODES), default = 'thread',
+                    help = 'how dylld grows the trees')
+parser.add_argument('--shards',         type = int,     default = 1,
+                    help = 'number of controllers, each growing one shard of the inputs, run at once')
+parser.add_argument('--latency',        default = 'default=0.2',
+                    help = "plugin instance run time in seconds by title/plugin substring, e.g. 'default=0.5,heatmaps=2'")
+parser.add_argument('--failRate',       default = '',
+                    help = "probability that a plugin instance fails, by title/plugin substring, e.g. 'heatmaps=0.05'")
+parser.add_argument('--qaFailRate',     type = float,   default = 0.0,
+                    help = 'probability that the QA check reports a failure')
+parser.add_argument('--jitter',         type = float,   default = 0.0,
+                    help = 'fraction by which plugin instance run times randomly vary')
+parser.add_argument('--callLatency',    type = float,   default = 0.0,
+                    help = 'seconds added to every CUBE API call')
+parser.add_argument('--pollInterval',   default = '0.1',
+                    help = 'dylld --pollInterval')
+parser.add_argument('--flowSpec',       default = '',
+                    help = 'dylld --flowSpec (default: the bundled LLD flow)')
+parser.add_argument('--inputSize',      type = int,     default = 4096,
+                    help = 'bytes per synthetic input')
+parser.add_argument('--seed',           type = int,     default = 0,
+                    help = 'random seed of the inputs and the fake CUBE')
+parser.add_argument('--workdir',        default = '',
+                    help = 'directory for the inputs, outputs and controller log (default: a temporary one)')
+parser.add_argument('--keep',           action = 'store_true',
+                    help = 'keep the temporary work directory')
+parser.add_argument('--report',         default = '',
+                    help = 'also write the report as JSON to this file')
+
+def main(l_argv : list = None) -> dict:
+    options, l_extra    = parser.parse_known_args(l_argv)
+    l_extra             = [a for a in l_extra if a != '--']
+    d_report    : dict  = benchmark_run(options, l_extra)
+    print(report_format(d_report))
+    if options.report:
+        Path(options.report).write_text(json.dumps(d_report, indent = 4))
+    return d_report
+
+if __name__ == '__main__':
+    sys.exit(main()['returncode'])
@@ -13,6 +13,11 @@ str_about = '''
 
 from    .                       import  jobber
 from    state                   import  data
+from    state                   import  cache
+from    state                   import  journal
+from    state                   import  records
+from    state                   import  trace
+from    state                   import  status
 import  os
 os.environ['XDG_CONFIG_HOME'] = '/tmp'
 import  re
@@ -21,11 +26,57 @@ import  json
 from    argparse                import ArgumentParser, Namespace
 from    chrisclient             import client
 import  time
+from    concurrent.futures      import Future, TimeoutError as FutureTimeoutError
+from    .                       import  poller
+from    .                       import  granularity
+from    .                       import  dag
+from    .                       import  admission
+from    .                       import  qa
+from    .                       import  retry
+
+LLD_PLUGINS     : list  = ['pl-shexec', 'pl-topologicalcopy']
+
+def metaCache_get(env : data.env) -> cache.CUBEmetaCache:
+    '''
+    Return the process-wide metadata cache, connected to the CUBE
+    described in <env>.
+    '''
+    metaCache   : cache.CUBEmetaCache   = cache.sharedCache_get()
+    metaCache.connect(
+        env.CUBE('url'),
+        env.CUBE('username'),
+        env.CUBE('password')
+    )
+    return metaCache
+
+def metaCache_prime(env : data.env, spec : dag.FlowSpec = None) -> dict:
+    '''
+    Populate the shared metadata cache with the plugins and pipelines
+    used by the compute flow <spec> (by default, the LLD flow).
+    Typically called once at startup before any trees are grown.
+    '''
+    if spec is None: spec = dag.flowSpec_load()
+    return metaCache_get(env).prime(
+        LLD_PLUGINS,
+        spec.pipelines()
+    )
+
+class SeedScriptError(Exception):
+    '''
+    A chrispl-run script that failed, with its job run data <d_run>.
+    '''
+
+    def __init__(self, d_run : dict):
+        self.d_run  : dict  = d_run
+        super().__init__(
+            (d_run.get('stderr') or d_run.get('stdout') or '').strip()[-retry.DIAGNOSTICTAIL:]
+            or 'chrispl-run exited with %s' % d_run.get('returncode')
+        )
 
 class PluginRun:
     '''
-    A class wrapper about the CLI tool "chrispl-run" that POSTs a pl-shexec
-    to CUBE.
+    A class that POSTs a pl-shexec to CUBE, either directly through the
+    CUBE API or by wrapping the CLI tool "chrispl-run".
     '''
     def __init__(self, *args, **kwargs):
         self.env                                    = None
@@ -43,17 +94,25 @@ class PluginRun:
 
         self.l_runCMDresp       : list  = []
         self.l_branchInstanceID : list  = []
+        self.metaCache          : cache.CUBEmetaCache   = None
+        self.admission  : admission.AdmissionController = admission.sharedAdmission_get()
+        self.retry              : retry.RetryPolicy     = retry.sharedPolicy_get()
+        if self.env:
+            self.metaCache                  = metaCache_get(self.env)
 
-    def PLpfdorun_args(self, str_input : str) -> dict:
+    def PLpfdorun_args(self, str_input : str, batch : granularity.Batch = None) -> dict:
         '''
-        Return the argument string pertinent to the pl-pfdorun plugin
+        Return the argument string pertinent to the pl-pfdorun plugin. If a
+        <batch> is passed, filter for all the files in that batch.
         '''
         # pudb.set_trace()
         str_filter  : str   = ""
         # Remove any '*' and/or '/' chars from pattern search. This will
         # transform a string of '**/*dcm" to just 'dcm', suitable for pl-shexec
         str_ff      : str   = re.subn(r'[*/]', '', self.options.pattern)[0]
-        if not self.options.inNode:
+        if batch:
+            str_filter  = batch.filter_args()
+        elif not self.options.inNode:
             str_filter  = "--fileFilter=%s" % str_input
         else:
             str_filter  = "--dirFilter=%s" % str_input
@@ -83,12 +142,12 @@ class PluginRun:
             'onCUBE':  json.dumps(self.env.CUBE.onCUBE())
         }
 
-    def chrispl_run_cmd(self, str_inputData : str) -> dict:
+    def chrispl_run_cmd(self, str_inputData : str, batch : granularity.Batch = None) -> dict:
         '''
         Return the CLI for the chrispl_run
         '''
         str_cmd = """chrispl-run --plugin name=pl-shexec --args="%s" --onCUBE %s""" % (
-                self.PLpfdorun_args(str_inputData)['args'],
+                self.PLpfdorun_args(str_inputData, batch)['args'],
                 json.dumps(self.chrispl_onCUBEargs()['onCUBE'], indent = 4)
             )
         str_cmd = str_cmd.strip().replace('\n', '')
@@ -96,23 +155,101 @@ class PluginRun:
             'cmd' : str_cmd
         }
 
-    def __call__(self, str_input : str, **kwargs) ->dict:
-        '''
-        Copy the <str_input> to the output using pl-pfdorun. If the in-node
-        self.options.inNode is true, perform a bulk copy of all files in the
-        passed directory that conform to the filter.
-        '''
-        # Remove the '/incoming/' from the str_input
-        str_inputTarget     : str   = str_input.split('/')[-1]
-        d_PLCmd             : dict  = self.chrispl_run_cmd(str_inputTarget)
+    def PLshexec_CUBEdata(self, str_inputTarget : str, batch : granularity.Batch = None) -> dict:
+        """
+        Translate the pl-shexec argument string into the data dictionary
+        that CUBE expects when creating a plugin instance, i.e. keyed on
+        parameter *name* rather than CLI flag. This mirrors the parsing
+        done by chrispl-run.
+
+        Args:
+            str_inputTarget (str):      the input file/dir to filter
+            batch (granularity.Batch):  optional batch of inputs to filter
+
+        Returns:
+            dict: plugin instance creation data
+        """
+        l_directArg : list  = ['previous_id', 'title', 'compute_resource_name']
+        d_flagMap   : dict  = self.metaCache.pluginFlagMap_get('pl-shexec')
+        d_data      : dict  = {}
+        for str_keyval in self.PLpfdorun_args(str_inputTarget, batch)['args'].split(';'):
+            str_key, str_sep, str_val   = str_keyval.partition('=')
+            str_key = "".join(str_key.split()).strip('"-=')
+            if not str_key: continue
+            # only the closing quote of a quoted args string is not the value's own
+            val     = str_val.rstrip('"') if str_sep else True
+            if str_key in l_directArg:
+                d_data[str_key] = val
+            elif '--' + str_key in d_flagMap:
+                d_data[d_flagMap['--' + str_key]] = val
+        return d_data
+
+    def seed_submitNative(self, str_inputTarget : str, batch : granularity.Batch = None) -> dict:
+        """
+        Create the pl-shexec plugin instance directly through the shared
+        CUBE client, without forking a chrispl-run process.
+
+        Args:
+            str_inputTarget (str):      the input file/dir to filter
+            batch (granularity.Batch):  optional batch of inputs to filter
+
+        Returns:
+            dict: the creation status, plugin instance id and plugin
+                  instance data (or error message, and for a CUBE failure
+                  its diagnostics)
+        """
+        d_ret       : dict  = {
+            'status'    : False,
+            'mode'      : 'native',
+            'id'        : -1,
+            'plinst'    : {},
+            'error'     : ''
+        }
+        try:
+            plugin_id   : int   = self.metaCache.pluginID_get('pl-shexec')
+            if plugin_id < 0:
+                raise LookupError('plugin pl-shexec not found in CUBE')
+            d_plinst    : dict  = self.metaCache.cl.create_plugin_instance(
+                                    plugin_id,
+                                    self.PLshexec_CUBEdata(str_inputTarget, batch)
+                                )
+            d_ret['plinst']     = d_plinst
+            d_ret['id']         = int(d_plinst['id'])
+            d_ret['status']     = True
+        except Exception as e:
+            d_ret['error']      = str(e)
+            if isinstance(e, retry.CUBEFailure):
+                d_ret['failure']    = e.asdict()
+        return d_ret
+
+    def seed_submitScript(self,
+            str_inputTarget     : str,
+            str_append          : str               = "",
+            batch               : granularity.Batch = None
+        ) -> dict:
+        """
+        Create the pl-shexec plugin instance by writing and running a
+        chrispl-run script. The script is rerun only if the retry policy
+        allows it (e.g. CUBE throttled it); the output of the first failed
+        run is kept in the failure diagnostics.
+
+        Args:
+            str_inputTarget (str):      the input file/dir to filter
+            str_append (str):           extra chrispl-run CLI args
+            batch (granularity.Batch):  optional batch of inputs to filter
+
+        Returns:
+            dict: the creation status, plugin instance id and job run data
+                  (of the last run, with the failure diagnostics if failed)
+        """
+        d_PLCmd             : dict  = self.chrispl_run_cmd(str_inputTarget, batch)
         str_PLCmd           : str   = d_PLCmd['cmd']
         str_PLCmdfile       : str   = '/tmp/%s.sh' % str_inputTarget
-        branchID            : int   = -1
-        b_status            : bool  = False
-
-        str_append          : str   = ""
-        for k,v in kwargs.items():
-            if k == 'append'    : str_append = v
+        d_ret               : dict  = {
+            'status'    : False,
+            'mode'      : 'script',
+            'id'        : -1
+        }
 
         str_PLCmd   += " " + str_append
         if self.options:
@@ -124,14 +261,65 @@ class PluginRun:
             f.write('#!/bin/bash\n')
             f.write(str_PLCmd)
         os.chmod(str_PLCmdfile, 0o755)
-        d_runCMDresp        : dict  = self.shell.job_run(str_PLCmdfile)
-        if not d_runCMDresp['returncode']:
-            b_status                = True
-            self.l_runCMDresp.append(d_runCMDresp)
-            branchID        : int   = d_runCMDresp['stdout'].split()[2]
+        def script_run() -> dict:
+            # the script makes its own CUBE calls, so admit it as one write
+            self.admission.call_admit('chrispl_run')
+            d_runCMDresp    : dict  = self.shell.job_run(str_PLCmdfile)
+            if d_runCMDresp['returncode']:
+                raise SeedScriptError(d_runCMDresp)
+            return d_runCMDresp
+
+        try:
+            d_runCMDresp    : dict  = self.retry.call('chrispl_run', script_run)
+        except retry.CUBEFailure as failure:
+            d_ret.update(getattr(failure.last, 'd_run', {}))
+            d_ret['failure']    = failure.asdict()
+            return d_ret
+        d_ret.update(d_runCMDresp)
+        self.l_runCMDresp.append(d_runCMDresp)
+        d_ret['status']     = True
+        d_ret['id']         = int(d_runCMDresp['stdout'].split()[2])
+        return d_ret
+
+    def __call__(self, str_input : str, **kwargs) ->dict:
+        '''
+        Copy the <str_input> to the output using pl-pfdorun. If the in-node
+        self.options.inNode is true, perform a bulk copy of all files in the
+        passed directory that conform to the filter.
+
+        The <str_input> can also be a granularity.Batch, in which case all
+        the files in the batch are copied by a single seed.
+
+        By default the pl-shexec instance is created in-process through the
+        CUBE API; if that fails (or if options.seedMode is 'script') the
+        chrispl-run script is used instead.
+        '''
+        batch               : granularity.Batch = None
+        if isinstance(str_input, granularity.Batch):
+            batch           = str_input
+            str_input       = batch.name
+        # Remove the '/incoming/' from the str_input
+        str_inputTarget     : str   = str_input.split('/')[-1]
+        d_runCMDresp        : dict  = {}
+        str_append          : str   = ""
+        for k,v in kwargs.items():
+            if k == 'append'    : str_append = v
+
+        with self.admission.work('seed'):
+            if self.options.seedMode == 'native' and not str_append:
+                d_runCMDresp    = self.seed_submitNative(str_inputTarget, batch)
+                if not d_runCMDresp['status']:
+                    d_runCMDresp = {
+                        **self.seed_submitScript(str_inputTarget, batch = batch),
+                        'nativeError'   : d_runCMDresp['error']
+                    }
+            else:
+                d_runCMDresp    = self.seed_submitScript(str_inputTarget, str_append, batch)
+
+        branchID            : int   = d_runCMDresp['id']
+        b_status            : bool  = d_runCMDresp['status']
+        if b_status:
             self.l_branchInstanceID.append(branchID)
-        else:
-            b_status                = False
 
         return {
             'status'            : b_status,
@@ -148,23 +336,36 @@ class LLDcomputeflow:
     def __init__(self, *args, **kwargs):
         self.env                : data.env          =  None
         self.options            : Namespace         = None
+        self.flowSpec           : dag.FlowSpec      = None
+        self.treeKey            : str               = ''
 
         for k, v in kwargs.items():
             if k == 'env'               : self.env                  = v
             if k == 'options'           : self.options              = v
-
-        self.cl         : client.Client = None
-        self.cl                         = client.Client(
-                                            self.env.CUBE('url'),
-                                            self.env.CUBE('username'),
-                                            self.env.CUBE('password')
-                                        )
-        self.request = client.Request(
-            self.env.CUBE('username'),
-            self.env.CUBE('password')
-        )
-        self.d_pipelines        : dict  = self.cl.get_pipelines()
-        self.pltopo             : int   = self.cl.get_plugins({'name': 'pl-topologicalcopy'})
+            if k == 'flowSpec'          : self.flowSpec             = v
+            if k == 'tree'              : self.treeKey              = v
+
+        if self.flowSpec is None:
+            self.flowSpec   = dag.flowSpec_load(getattr(self.options, 'flowSpec', ''))
+
+        self.metaCache  : cache.CUBEmetaCache   = metaCache_get(self.env)
+        self.cl         : client.Client = self.metaCache.cl
+        self.request    : client.Request        = self.metaCache.request()
+        self.pltopo             : int   = self.metaCache.pluginWithName_get('pl-topologicalcopy')
+        self.poller     : poller.StatusPoller   = poller.sharedPoller_get(client = self.cl)
+        self.admission  : admission.AdmissionController = admission.sharedAdmission_get()
+        self.journal    : journal.TreeJournal   = journal.sharedJournal_get()
+        self.rawStore   : records.RawStore      = records.sharedRawStore_get()
+        self.tracer     : trace.Tracer          = trace.sharedTracer_get()
+        self.qaQueue    : qa.QAQueue            = qa.sharedQAQueue_get(
+                                                    client  = self.cl,
+                                                    request = self.request,
+                                                    url     = self.env.CUBE('url')
+                                                )
+        self.traceLane          : int   = self.tracer.lane(self.treeKey)
+        self.status     : status.RunStatus      = status.sharedStatus_get()
+        self.d_nodeSpan         : dict  = {}
+        self.d_resume           : dict  = self.journal.tree_state(self.treeKey)
         self.newTreeID          : int   = -1
         self.ld_workflowhist    : list  = []
         self.ld_topologicalNode : dict  = {'data': []}
@@ -218,7 +419,7 @@ class LLDcomputeflow:
             d_workflowDetail    : dict,
             node_title          : str,
             **kwargs
-        ) -> dict:
+        ) -> records.NodeResult:
         """
         Wait for a node in a workflow to transition to a finishedState
 
@@ -228,94 +429,177 @@ class LLDcomputeflow:
             node_title (str):        the title of the node to find
 
         kwargs:
-                waitPoll        = the polling interval in seconds
+                waitPoll        = the nominal polling interval in seconds,
+                                  used with totalPolls to derive the timeout
                 totalPolls      = total number of polling before abandoning;
                                   if this is 0, then poll forever.
+                admitted        = the admission work kind (if any) that
+                                  is in flight until this wait ends
+
+        The actual polling is done by the shared status poller, which
+        queries all awaited nodes across all trees in bulk, on a schedule
+        set by the poll policy for <node_title>.
 
         Future: expand to wait on list of node_titles
 
         Returns:
-            dict: _description_
+            records.NodeResult: the outcome of the wait
+        """
+        d_wait          : dict  = self.nodeWait_begin(d_workflowDetail, node_title, **kwargs)
+        d_plinfo        : dict  = None
+        if d_wait['future']:
+            try:
+                d_plinfo        = d_wait['future'].result(timeout = d_wait['timeout'])
+            except FutureTimeoutError:
+                d_plinfo        = None
+        return self.nodeWait_end(d_wait, d_plinfo)
+
+    def nodeWait_begin(self,
+            d_workflowDetail    : dict,
+            node_title          : str,
+            **kwargs
+        ) -> dict:
+        """
+        The non-blocking first half of `waitForNodeInWorkflow`: find the
+        node and register it with the status poller.
+
+        Args:
+            d_workflowDetail (dict): the workflow in which the node
+                                     exists
+            node_title (str):        the title of the node to find
+
+        kwargs: as for `waitForNodeInWorkflow`
+
+        Returns:
+            dict: a wait context holding the node id, the poller future
+                  (None if the node was not found) and the timeout
         """
         waitPoll        : int   = 5
         totalPolls      : int   = 100
-        pollCount       : int   = 0
-        b_finished      : bool  = False
+        timeout         : float = None
+        nodeDone        : Future = None
         waitOnPluginID  : int   = self.pluginInstanceID_findWithTitle(
                                         d_workflowDetail, node_title
                                 )
-        str_pluginStatus: str   = 'unknown'
-        d_plinfo        : dict  = {}
+
+        str_admitted    : str   = ''
 
         for k,v in kwargs.items():
             if k == 'waitPoll':     waitPoll    = v
             if k == 'totalPolls':   totalPolls  = v
+            if k == 'admitted':     str_admitted = v
 
+        if totalPolls: timeout = waitPoll * (totalPolls + 1)
         if waitOnPluginID >= 0:
-            while 'finished' not in str_pluginStatus.lower() and \
-                pollCount <= totalPolls :
-                d_plinfo         = self.cl.get_plugin_instance_by_id(waitOnPluginID)
-                str_pluginStatus = d_plinfo['status']
-                time.sleep(waitPoll)
-                if totalPolls:  pollCount += 1
-            if 'finished' in d_plinfo['status']:
-                b_finished  = d_plinfo['status'] == 'finishedSuccessfully'
-                self.QA_check(d_plinfo)
+            self.status.wait_begin(
+                self.treeKey, waitOnPluginID, d_workflowDetail.get('workflow_id')
+            )
+            nodeDone            = self.poller.watch(
+                                    waitOnPluginID,
+                                    self.feedID_findForInstance(
+                                        d_workflowDetail, waitOnPluginID
+                                    ),
+                                    title = node_title
+                                )
         return {
-            'finished'  : b_finished,
-            'status'    : str_pluginStatus,
             'workflow'  : d_workflowDetail,
-            'plinst'    : d_plinfo,
-            'polls'     : pollCount,
-            'plid'      : waitOnPluginID
+            'plid'      : waitOnPluginID,
+            'future'    : nodeDone,
+            'timeout'   : timeout,
+            'admitted'  : str_admitted,
+            'started'   : time.time(),
+            'span'      : self.tracer.span_begin(
+                            'waitForNodeInWorkflow %s' % node_title, self.traceLane,
+                            title = node_title, plid = waitOnPluginID
+                        )
         }
-    def QA_check(self,plugin_info):
+
+    def nodeWait_end(self, d_wait : dict, d_plinfo : dict | None) -> records.NodeResult:
         """
-        A method to check the QA of the output of LLD analysis. This method checks
-        the output of the QA plugin `pl-lld_chxr` and determines if a QA failure as occured.
-        As an effect of this check, the name of the feed of which this plugin, `pl-lld_chxr` is
-        a part, is changed. The updated name becomes `QA-failed:<existing feed name>`.
+        The second half of `waitForNodeInWorkflow`: given the resolved
+        plugin instance <d_plinfo> (or None if the wait timed out), build
+        the wait result and run the QA check on finished nodes. The raw
+        payloads are only kept in the (bounded) raw store, if enabled.
+
         Args:
-            plugin_info: A dictionary representing a plugin instance of CUBE
+            d_wait (dict):          the context from `nodeWait_begin`
+            d_plinfo (dict | None): the finished plugin instance data
 
         Returns:
+            records.NodeResult: the wait result
+        """
+        pollCount       : int   = 0
+        b_finished      : bool  = False
+        str_pluginStatus: str   = 'unknown'
+        waitOnPluginID  : int   = d_wait['plid']
 
+        if d_wait.get('admitted'):
+            self.admission.work_end(d_wait['admitted'])
+        if waitOnPluginID >= 0:
+            self.status.wait_end(self.treeKey, waitOnPluginID)
+            if d_plinfo is None:
+                d_plinfo        = self.poller.status_last(waitOnPluginID)
+                self.poller.unwatch(waitOnPluginID)
+            pollCount           = self.poller.polls_pop(waitOnPluginID)
+            str_pluginStatus    = d_plinfo.get('status', str_pluginStatus)
+            if 'finished' in str_pluginStatus:
+                b_finished  = str_pluginStatus == 'finishedSuccessfully'
+                self.QA_check(d_plinfo)
+            self.rawStore.put(waitOnPluginID, {
+                'plinst'    : d_plinfo,
+                'workflow'  : d_wait['workflow']
+            })
+        self.tracer.span_end(d_wait.get('span'), polls = pollCount, status = str_pluginStatus)
+        return records.NodeResult(
+            finished    = b_finished,
+            status      = str_pluginStatus,
+            plid        = waitOnPluginID,
+            polls       = pollCount,
+            plinst      = records.PluginInstance.from_api(d_plinfo or {}),
+            workflow    = records.workflow_compact(d_wait['workflow']),
+            started     = d_wait['started'],
+            elapsed     = time.time() - d_wait['started']
+        )
+
+    def feedID_findForInstance(self,
+            d_workflowDetail    : dict,
+            plinstID            : int
+        ) -> int | None:
         """
-        QA_plugin = 'pl-lld_chxr'
-        error_string = 'QA check failed'
-        if QA_plugin in plugin_info['plugin_name'] and error_string in plugin_info['summary']:
-            feed_id = plugin_info['feed_id']
-            feed = self.cl.get_feed_by_id(feed_id)
-            name = feed['name']
-            self.request.put(f'{self.env.CUBE("url")}{feed_id}/', {'name': f'QA-failed:{name}'})
+        Determine the feed that contains plugin instance <plinstID> in the
+        `d_workflowDetail` (which can also simply be a plugin instance).
 
-    def pluginParameters_setInNodes(self,
-            d_piping            : dict,
-            d_pluginParameters  : dict
-        ) -> dict:
+        Args:
+            d_workflowDetail (dict):    workflow detail data structure
+            plinstID (int):             the plugin instance id
+
+        Returns:
+            int | None: the feed id, or None if not known
         """
-        Override default parameters in the `d_piping`
+        ld_plinfo           : list          = d_workflowDetail.get('data', [d_workflowDetail])
+        for d_plinfo in ld_plinfo:
+            if d_plinfo.get('id') == plinstID:
+                return d_plinfo.get('feed_id')
+        return None
 
+    def QA_check(self,plugin_info):
+        """
+        A method to check the QA of the output of LLD analysis. This method checks
+        the output of the QA plugin `pl-lld_chxr` and determines if a QA failure as occured.
+        As an effect of this check, the name of the feed of which this plugin, `pl-lld_chxr` is
+        a part, is changed. The updated name becomes `QA-failed:<existing feed name>`.
+        The rename is left to the shared QA queue, in the background, so
+        that this tree does not wait on it.
         Args:
-            d_piping (dict):            the current default parameters for the
-                                        plugins in a pipeline
-            d_pluginParameters (dict):  a list of plugins and parameters to
-                                        set in the response
+            plugin_info: A dictionary representing a plugin instance of CUBE
 
         Returns:
-            dict:   a new piping structure with changes to some parameter values
-                    if required. If no d_pluginParameters is passed, simply
-                    return the piping unchanged.
 
         """
-        for pluginTitle,d_parameters in d_pluginParameters.items():
-            for piping in d_piping:
-                if pluginTitle in piping.get('title'):
-                    for k,v in d_parameters.items():
-                        for d_default in piping.get('plugin_parameter_defaults'):
-                            if k in d_default.get('name'):
-                                d_default['default'] = v
-        return d_piping
+        if qa.QA_PLUGIN not in plugin_info['plugin_name']:
+            return
+        with self.tracer.span('QA_check', self.traceLane, plid = plugin_info.get('id')) as d_span:
+            d_span['failed']    = self.qaQueue.outcome_put(plugin_info)
 
     def pipelineWithName_getNodes(
             self,
@@ -327,6 +611,9 @@ class LLDcomputeflow:
         and if found, return a nodes dictionary. Optionally set relevant
         plugin parameters to values described in <d_pluginParameters>
 
+        The nodes are instantiated from the cached, precompiled pipeline
+        template, so this is a purely local operation.
+
 
         Args:
             str_pipelineName (str):         the name of the pipeline to find
@@ -338,24 +625,12 @@ class LLDcomputeflow:
                   and id of the pipeline
         """
         # pudb.set_trace()
-        id_pipeline     : int   = -1
-        ld_node         : list  = []
-        d_pipeline      : dict  = self.cl.get_pipelines({'name': str_pipelineName})
-        if 'data' in d_pipeline:
-            id_pipeline : int   = d_pipeline['data'][0]['id']
-            d_response  : dict  = self.cl.get_pipeline_default_parameters(
-                                        id_pipeline, {'limit': 1000}
-                                )
-            if 'data' in d_response:
-                ld_node         = self.pluginParameters_setInNodes(
-                        self.cl.compute_workflow_nodes_info(d_response['data'], True),
-                        d_pluginParameters)
-                for piping in ld_node:
-                    if piping.get('compute_resource_name'):
-                        del piping['compute_resource_name']
+        pipeline        : data.Pipeline = self.metaCache.pipelineTemplate_get(
+                                            str_pipelineName
+                                        )
         return {
-            'nodes'         : ld_node,
-            'id'            : id_pipeline
+            'nodes'         : pipeline.instantiate(d_pluginParameters),
+            'id'            : pipeline.id
         }
 
     def workflow_schedule(self,
@@ -376,18 +651,25 @@ class LLDcomputeflow:
         Returns:
             dict: result from calling the client `get_workflow_plugin_instances`
         """
-        d_pipeline      : dict  = self.pipelineWithName_getNodes(
-                                    str_pipelineName, d_pluginParameters
-                                )
-        d_workflow      : dict  = self.cl.create_workflow(
-                d_pipeline['id'],
-                {
-                    'previous_plugin_inst_id'   : inputDataNodeID,
-                    'nodes_info'                : json.dumps(d_pipeline['nodes'])
-                })
-        d_workflowInst  : dict  = self.cl.get_workflow_plugin_instances(
-                    d_workflow['id'], {'limit': 1000}
-        )
+        with self.tracer.span(
+                'workflow_schedule %s' % str_pipelineName, self.traceLane,
+                previous = inputDataNodeID
+            ) as d_span:
+            d_pipeline      : dict  = self.pipelineWithName_getNodes(
+                                        str_pipelineName, d_pluginParameters
+                                    )
+            d_workflow      : dict  = self.cl.create_workflow(
+                    d_pipeline['id'],
+                    {
+                        'previous_plugin_inst_id'   : inputDataNodeID,
+                        'nodes_info'                : json.dumps(d_pipeline['nodes'])
+                    })
+            d_workflowInst  : dict  = self.cl.get_workflow_plugin_instances(
+                        d_workflow['id'], {'limit': 1000}
+            )
+            # so that the workflow is known to those that wait on its nodes
+            d_workflowInst['workflow_id']   = d_workflow['id']
+            d_span['workflow']  = d_workflow['id']
         self.ld_workflowhist.append({
             'name'                      : str_pipelineName,
             'pipeline'                  : d_pipeline,
@@ -414,15 +696,20 @@ class LLDcomputeflow:
             dict: the plugin instance creation data structure
         """
         idTopo          : int   = self.pltopo['data'][0]['id']
-        d_plInstTopo    : dict  = self.cl.create_plugin_instance(
-                                    idTopo,
-                                    {
-                                        'filter'            : str_filterArgs,
-                                        'plugininstances'   : ','.join(map(str, l_nodes)),
-                                        'title'             : str_nodeTitle,
-                                        'previous_id'       : l_nodes[0]
-                                    }
-                                )
+        with self.tracer.span(
+                'topologicalNode_run %s' % str_nodeTitle, self.traceLane,
+                nodes = l_nodes
+            ) as d_span:
+            d_plInstTopo    : dict  = self.cl.create_plugin_instance(
+                                        idTopo,
+                                        {
+                                            'filter'            : str_filterArgs,
+                                            'plugininstances'   : ','.join(map(str, l_nodes)),
+                                            'title'             : str_nodeTitle,
+                                            'previous_id'       : l_nodes[0]
+                                        }
+                                    )
+            d_span['plid']  = d_plInstTopo.get('id')
         self.ld_topologicalNode['data'].append(d_plInstTopo)
         return d_plInstTopo
 
@@ -449,7 +736,7 @@ class LLDcomputeflow:
         b_finished          : bool          = False
         if len(args)        : d_parent      = args[0]
         if not d_parent     : b_finished    = True
-        else                : b_finished    = d_parent['finished']
+        else                : b_finished    = d_parent.finished
         return b_finished
 
     def parentNode_IDappend(self, l_nodes : list, *args) -> list:
@@ -481,7 +768,7 @@ class LLDcomputeflow:
         d_parent            : dict          = None
         if len(args):
             d_parent    = args[0]
-            id          = d_parent['plinst']['id']
+            id          = d_parent.plinst.id
         return id
 
     def pluginID_findInWorkflowDesc(self, tp_workflowAndNode : tuple) -> int :
@@ -536,6 +823,39 @@ class LLDcomputeflow:
         l_nodeID: list[int] = [self.pluginID_findInWorkflowDesc(x) for x in l_nodeID]
         return l_nodeID
 
+    def flow_submit(self, *args, **kwargs) -> dict:
+        """
+        The non-blocking half of `flow_executeAndBlockUntilNodeComplete`:
+        if the parent in args[0] is finished, schedule the workflow.
+
+        Returns:
+            dict: the scheduled workflow and the title of the node to
+                  wait on, or an empty dict if nothing was scheduled
+        """
+        str_workflowTitle   : str   = "no workflow title"
+        attachToNodeID      : int   = -1
+        str_blockNodeTitle  : str   = "no node title"
+        d_pluginParameters  : dict  = {}
+
+        for k, v in kwargs.items():
+            if k == 'workflowTitle'         :   str_workflowTitle   = v
+            if k == 'attachToNodeID'        :   attachToNodeID      = v
+            if k == 'waitForNodeWithTitle'  :   str_blockNodeTitle  = v
+            if k == 'pluginParameters'      :   d_pluginParameters  = v
+
+        if not self.parentNode_isFinished(*args):
+            return {}
+        if attachToNodeID == -1:
+            attachToNodeID = self.parentNode_IDget(*args)
+        return {
+            'workflow'  : self.workflow_schedule(
+                            attachToNodeID,
+                            str_workflowTitle,
+                            d_pluginParameters
+                        ),
+            'waitFor'   : str_blockNodeTitle
+        }
+
     def flow_executeAndBlockUntilNodeComplete(
             self,
             *args,
@@ -557,171 +877,322 @@ class LLDcomputeflow:
 
         Possible future extension: block until node _list_ complete
         """
-        d_prior             : dict  = None
-        str_workflowTitle   : str   = "no workflow title"
-        attachToNodeID      : int   = -1
-        str_blockNodeTitle  : str   = "no node title"
-        b_canFlow           : bool  = False
-        d_pluginParameters  : dict  = {}
-        d_ret               : dict  = {}
+        d_ret               : records.NodeResult | None = None
+        d_submit            : dict  = self.flow_submit(*args, **kwargs)
 
-        for k, v in kwargs.items():
-            if k == 'workflowTitle'         :   str_workflowTitle   = v
-            if k == 'attachToNodeID'        :   attachToNodeID      = v
-            if k == 'waitForNodeWithTitle'  :   str_blockNodeTitle  = v
-            if k == 'pluginParameters'      :   d_pluginParameters  = v
-
-        if self.parentNode_isFinished(*args):
-            if attachToNodeID == -1:
-                attachToNodeID = self.parentNode_IDget(*args)
+        if d_submit:
             d_ret = self.waitForNodeInWorkflow(
-                        self.workflow_schedule(
-                            attachToNodeID,
-                            str_workflowTitle,
-                            d_pluginParameters
-                        ),
-                        str_blockNodeTitle,
+                        d_submit['workflow'],
+                        d_submit['waitFor'],
                         **kwargs
                     )
-            if len(args):
-                d_ret['prior']  = args[0]
-            else:
-                d_ret['prior']  = None
+            d_ret.prior     = args[0] if len(args) else None
         return d_ret
 
-    def flows_connect(
-        self,
-        *args,
-        **kwargs) -> dict:
+    def connect_submit(self, *args, **kwargs) -> dict:
         """
-        Perform a toplogical join by using the args[0] as logical
-        parent and connect this parent to a list of distalNodeIDs
-
+        The non-blocking half of `flows_connect`: if the parent in args[0]
+        is finished, create the topological join node.
 
         Returns:
-            dict: data structure on the nodes_join operation
+            dict: the join plugin instance and its title, or an empty
+                  dict if nothing was created
         """
-        d_prior             : dict  = None
         str_joinNodeTitle   : str   = "no title specified for topo node"
         l_nodeID            : list  = []
         str_topoJoinArgs    : str   = ""
-        b_canFlow           : bool  = False
-        d_ret               : dict  = {}
         b_invertOrder       : bool  = False
 
-        # pudb.set_trace()
         for k, v in kwargs.items():
             if k == 'connectionNodeTitle'   :   str_joinNodeTitle   = v
-            if k == 'distalNodeIDs'         :   l_nodeID            = v
+            if k == 'distalNodeIDs'         :   l_nodeID            = list(v)
             if k == 'invertIDorder'         :   b_invert            = v
             if k == 'topoJoinArgs'          :   str_topoJoinArgs    = v
 
-        if self.parentNode_isFinished(*args):
-            l_nodeID    = self.parentNode_IDappend(l_nodeID, *args)
-            l_nodeID    = self.nodeIDs_verify(l_nodeID)
-            if b_invertOrder: l_nodeID.reverse()
-            d_ret       = self.nodes_join(
-                str_joinNodeTitle,
-                l_nodeID,
-                str_topoJoinArgs
+        if not self.parentNode_isFinished(*args):
+            return {}
+        l_nodeID    = self.parentNode_IDappend(l_nodeID, *args)
+        l_nodeID    = self.nodeIDs_verify(l_nodeID)
+        if b_invertOrder: l_nodeID.reverse()
+        return {
+            'node'      : self.topologicalNode_run(
+                            str_joinNodeTitle,
+                            l_nodeID,
+                            str_topoJoinArgs
+                        ),
+            'waitFor'   : str_joinNodeTitle
+        }
+
+    def flows_connect(
+        self,
+        *args,
+        **kwargs) -> dict:
+        """
+        Perform a toplogical join by using the args[0] as logical
+        parent and connect this parent to a list of distalNodeIDs
+
+
+        Returns:
+            dict: data structure on the nodes_join operation
+        """
+        d_ret               : records.NodeResult | None = None
+        d_submit            : dict  = self.connect_submit(*args, **kwargs)
+
+        if d_submit:
+            d_ret       = self.waitForNodeInWorkflow(
+                d_submit['node'],
+                d_submit['waitFor']
             )
-            if len(args):
-                d_ret['prior']  = args[0]
-            else:
-                d_ret['prior']  = None
+            d_ret.prior     = args[0] if len(args) else None
         return d_ret
 
-    def computeFlow_build(self) -> dict:
-        """The main controller for the compute flow logic
+    def flowContext(self) -> dict:
+        """
+        The values that fill the ${name} placeholders in the parameters
+        of the flow spec.
 
-        Somewhat pedantically, this method demonstrates how to inject
-        override parameters for certain plugin parameters in the
-        workflow.
+        Returns:
+            dict: the placeholder context
+        """
+        return {
+            'pftelDB'           : self.options.pftelDB,
+            'orthanc.url'       : self.env.orthanc('url'),
+            'orthanc.username'  : self.env.orthanc('username'),
+            'orthanc.password'  : self.env.orthanc('password'),
+            'orthanc.remote'    : self.env.orthanc('remote')
+        }
+
+    def flowRef_resolve(self, ref : str | dict, d_result : dict) -> int:
+        """
+        Resolve a flow spec node reference to a plugin instance id: the
+        seed of this tree, the waited-on instance of a done node, or (for
+        a {"node", "title"} reference) the instance with the given title
+        in the workflow of a done node.
+
+        Args:
+            ref (str | dict):   the node reference
+            d_result (dict):    the results of the nodes done so far
 
         Returns:
-            dict: a composite structure of the last call executed.
+            int: the plugin instance id
         """
+        if ref == 'seed':
+            return self.newTreeID
+        if isinstance(ref, dict):
+            return self.pluginInstanceID_findWithTitle(
+                        d_result[ref['node']].workflow_detail(), ref['title']
+                    )
+        return self.parentNode_IDget(d_result[ref])
 
-        self.env.set_trace()
-        totalPolls:int      = 100 if not self.options.notimeout else 0
-
-        d_ret : dict = \
-        self.flow_executeAndBlockUntilNodeComplete(
-            self.flows_connect(
-                self.flow_executeAndBlockUntilNodeComplete(
-                    self.flows_connect(
-                        self.flow_executeAndBlockUntilNodeComplete(
-                            self.flows_connect(
-                                self.flow_executeAndBlockUntilNodeComplete(
-                                    attachToNodeID          = self.newTreeID,
-                                    workflowTitle           = 'Leg Length Discrepency inference on DICOM inputs v20230324-1 using CPU',
-                                    waitForNodeWithTitle    = 'heatmaps',
-                                    totalPolls              = totalPolls,
-                                    pluginParameters        = {
-                                        'dcm-to-mha'  : {
-                                                    'imageName'         : 'composite.png',
-                                                    'rotate'            : '90',
-                                                    'pftelDB'           : self.options.pftelDB
-                                        },
-                                        'generate-landmark-heatmaps' : {
-                                                    'heatmapThreshold' : '0.5',
-                                                    'imageType'        : 'jpg',
-                                                    'compositeWeight'  : '0.3,0.7',
-                                                    'pftelDB'           : self.options.pftelDB
-                                        }
-                                    }
-                                ),
-                                connectionNodeTitle     = 'mergeDICOMSwithInference',
-                                distalNodeIDs           = [self.newTreeID],
-                                topoJoinArgs            = '\.dcm$,\.csv$'
-                            ),
-                            workflowTitle           = 'Leg Length Discrepency prediction formatter v20230324',
-                            waitForNodeWithTitle    = 'landmarks-to-json',
-                            totalPolls              = totalPolls,
-                            pluginParameters        = {
-                                'landmarks-to-json' : {
-                                    'pftelDB'       : self.options.pftelDB
-                                }
-                            }
-                        ),
-                        connectionNodeTitle     = 'mergeJPGSwithInference',
-                        distalNodeIDs           = [('Leg Length Discrepency inference', 'heatmaps')],
-                        topoJoinArgs            = '\.jpg$,\.json$'
-                    ),
-                    workflowTitle           = 'Leg Length Discrepency measurements on image v20230324',
-                    waitForNodeWithTitle    = 'measure-leg-segments',
-                    totalPolls              = 0,
-                    pluginParameters        = {
-                        'measure-leg-segments'  : {
-                            'pftelDB'           : self.options.pftelDB
-                        }
-                    }
-                ),
-                connectionNodeTitle     = 'mergeMarkedJPGSwithDICOMS',
-                distalNodeIDs           = [('Topological', 'mergeDICOMSwithInference')],
-                topoJoinArgs            = '\.dcm$,\.*$'
-            ),
-            workflowTitle           = 'PNG-to-DICOM and push to PACS v20230324',
-            waitForNodeWithTitle    = 'QA-Check',
-            totalPolls              = totalPolls,
-            pluginParameters        = {
-                'image-to-DICOM'    : {
-                    'pftelDB'       : self.options.pftelDB
-                },
-                'pacs-push'         : {
-                    'pftelDB'       : self.options.pftelDB,
-                    'orthancUrl'    : self.env.orthanc('url'),
-                    'username'      : self.env.orthanc('username'),
-                    'password'      : self.env.orthanc('password'),
-                    'pushToRemote'  : self.env.orthanc('remote')
+    def flowNode_submit(self, d_node : dict, d_result : dict, admitted : bool = False) -> dict:
+        """
+        The non-blocking half of `flowNode_execute`: schedule the workflow
+        or create the join described by the spec node <d_node>. This only
+        blocks if the admission controller's cap on in-flight workflows
+        (or joins) is reached.
+
+        Args:
+            d_node (dict):      the flow spec node
+            d_result (dict):    the results of the nodes done so far
+            admitted (bool):    the caller has already admitted the node
+                                (`work_begin`), e.g. on an event loop
+
+        Returns:
+            dict: the workflow/node to wait on, the title to wait for, the
+                  wait kwargs and the parent result, or an empty dict if
+                  nothing was submitted
+        """
+        str_parent          : str   = self.flowSpec.node_parent(d_node)
+        l_parent            : list  = [] if str_parent == 'seed' else [d_result[str_parent]]
+        totalPolls          : int   = d_node.get(
+                                        'totalPolls',
+                                        100 if not self.options.notimeout else 0
+                                    )
+        d_submit            : dict  = {}
+
+        self.status.tree_stage(self.treeKey, d_node['id'])
+        # the node span runs from here until the node is done
+        self.d_nodeSpan[d_node['id']]   = self.tracer.span_begin(
+                                            'node %s' % d_node['id'], self.traceLane,
+                                            type = d_node['type']
+                                        )
+        # a workflow (or join) counts as in flight from here until the
+        # wait on it ends
+        if not admitted:
+            self.admission.work_begin(d_node['type'])
+        try:
+            d_submit        = self.flowNode_reattach(d_node)
+            if not d_submit and d_node['type'] == 'workflow':
+                d_flowArgs      : dict  = {
+                    'workflowTitle'         : d_node['pipeline'],
+                    'waitForNodeWithTitle'  : d_node['waitFor'],
+                    'pluginParameters'      : dag.parameters_resolve(
+                                                d_node.get('parameters', {}),
+                                                self.flowContext()
+                                            )
                 }
-            }
+                if not l_parent:
+                    d_flowArgs['attachToNodeID']    = self.newTreeID
+                d_submit        = self.flow_submit(*l_parent, **d_flowArgs)
+                if d_submit:
+                    d_submit['detail']  = d_submit['workflow']
+            elif not d_submit:
+                d_submit        = self.connect_submit(
+                                    *l_parent,
+                                    connectionNodeTitle = d_node['id'],
+                                    distalNodeIDs       = [
+                                        self.flowRef_resolve(r, d_result)
+                                        for r in d_node.get('distal', [])
+                                    ],
+                                    topoJoinArgs        = d_node.get('filter', '')
+                                )
+                if d_submit:
+                    d_submit['detail']  = d_submit['node']
+            if d_submit and not d_submit.get('reattached'):
+                self.journal.record(
+                    self.treeKey, 'submit',
+                    node    = d_node['id'],
+                    submit  = {
+                        'detail'    : journal.detail_compact(d_submit['detail']),
+                        'waitFor'   : d_submit['waitFor']
+                    }
+                )
+        except Exception as e:
+            self.admission.work_end(d_node['type'])
+            self.tracer.span_end(self.d_nodeSpan.pop(d_node['id'], 0), error = repr(e))
+            raise
+        if not d_submit:
+            self.admission.work_end(d_node['type'])
+            self.tracer.span_end(self.d_nodeSpan.pop(d_node['id'], 0), submitted = False)
+            return d_submit
+        d_submit['waitArgs']    = {
+            'totalPolls'    : totalPolls,
+            'admitted'      : d_node['type']
+        }
+        d_submit['prior']       = l_parent[0] if l_parent else None
+        return d_submit
+
+    def flowNode_reattach(self, d_node : dict) -> dict:
+        """
+        On resume, if the journal shows that <d_node> was submitted in an
+        earlier run but did not finish, return that submission so that it
+        is waited on again rather than resubmitted.
+
+        Args:
+            d_node (dict):      the flow spec node
+
+        Returns:
+            dict: the journaled submission, or an empty dict
+        """
+        d_submit            : dict  = self.d_resume.get('submit', {}).get(d_node['id'], {})
+        if not d_submit or d_node['id'] in self.d_resume.get('done', {}):
+            return {}
+        return {**d_submit, 'reattached': True}
+
+    def flowNode_done(self,
+            d_node  : dict,
+            d_ret   : records.NodeResult
+        ) -> records.NodeResult:
+        """
+        Journal the outcome of <d_node>.
+
+        Args:
+            d_node (dict):              the flow spec node
+            d_ret (records.NodeResult): the wait result of the node
+
+        Returns:
+            records.NodeResult: <d_ret>
+        """
+        self.journal.record(
+            self.treeKey, 'done',
+            node    = d_node['id'],
+            result  = d_ret.record()
         )
+        self.tracer.span_end(
+            self.d_nodeSpan.pop(d_node['id'], 0),
+            status = d_ret.status, finished = d_ret.finished
+        )
+        return d_ret
 
-        # pudb.set_trace()
+    def nodesDone_resumed(self) -> dict:
+        """
+        On resume, the results of the nodes that the journal shows had
+        finished successfully in an earlier run.
+
+        Returns:
+            dict: the node results, keyed on node id
+        """
+        return {
+            str_id: records.NodeResult.from_record(d_ret)
+            for str_id, d_ret in self.d_resume.get('done', {}).items()
+            if d_ret.get('finished')
+        }
+
+    def flowNode_execute(self,
+            d_node      : dict,
+            d_result    : dict
+        ) -> records.NodeResult | None:
+        """
+        Run a single node of the flow spec and block until the node it
+        waits on is finished.
+
+        Args:
+            d_node (dict):      the flow spec node
+            d_result (dict):    the results of the nodes done so far
+
+        Returns:
+            records.NodeResult: the wait result of this node, with its
+                                parent's result in 'prior' -- or None if
+                                the node could not be submitted
+        """
+        d_ret               : records.NodeResult | None = None
+        d_submit            : dict  = self.flowNode_submit(d_node, d_result)
+
+        if d_submit:
+            d_ret           = self.waitForNodeInWorkflow(
+                                d_submit['detail'],
+                                d_submit['waitFor'],
+                                **d_submit['waitArgs']
+                            )
+            d_ret.prior     = d_submit['prior']
+            self.flowNode_done(d_node, d_ret)
         return d_ret
 
-    def __call__(self, filteredCopyInstanceID  : int) -> dict:
+    def computeFlow_build(self) -> records.NodeResult:
+        """The main controller for the compute flow logic
+
+        Run the nodes of the flow spec, each as soon as the nodes it
+        depends on are done, with independent branches run concurrently.
+        On resume, nodes that the journal shows had finished are skipped.
+
+        Returns:
+            records.NodeResult: the result of the last node of the spec,
+                                with the results of the nodes before it
+                                along its 'prior' chain.
+        """
+
+        self.env.set_trace()
+        d_result    : dict  = dag.FlowScheduler(
+                                self.flowSpec,
+                                done = self.nodesDone_resumed()
+                            ).run(self.flowNode_execute)
+
+        # pudb.set_trace()
+        return self.flowResult_last(d_result)
+
+    def flowResult_last(self, d_result : dict) -> records.NodeResult:
+        """
+        The result of the last node of the spec, out of the results of
+        all nodes in <d_result>. If the last node was not run (because a
+        node before it failed), a skipped result is returned instead.
+        """
+        str_last    : str   = self.flowSpec.node_last()
+        return d_result.get(str_last) or records.NodeResult(
+            status  = 'skipped',
+            error   = 'node %s was not run' % str_last
+        )
+
+    def __call__(self, filteredCopyInstanceID  : int) -> records.NodeResult:
         """        Execute/manage the LLD compute flow
 
 
@@ -730,9 +1201,9 @@ class LLDcomputeflow:
                                           from which to grow the compute flow
 
         Returns:
-            dict: the compute flow data structure
+            records.NodeResult: the compute flow result
         """
         self.newTreeID  : str           = int(filteredCopyInstanceID)
-        d_computeFlow   : dict          = self.computeFlow_build()
+        d_computeFlow   : records.NodeResult = self.computeFlow_build()
         return d_computeFlow
 
@@ -0,0 +1,251 @@
+str_about = '''
+    The admission module bounds the load that a growth cycle puts on
+    CUBE.
+
+    Without it, the number of API calls, workflows and seeds hitting
+    CUBE at once simply scales with the number of trees growing in
+    parallel -- and past a point, an overwhelmed CUBE scheduler makes
+    everything slower. Here, a single process-wide controller provides
+
+        o   a token bucket per API call type ('read' for queries,
+            'write' for calls that create or change things) that limits
+            the rate of calls through the shared client; and
+
+        o   a cap per kind of in-flight work ('seed', 'workflow', 'join')
+            on how many may be scheduled in CUBE at any one time.
+
+    The shared client is wrapped in a `GatedClient` proxy, so every CUBE
+    call made by `PluginRun`, `LLDcomputeflow` and the status poller is
+    admitted through the controller.
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  asyncio
+import  threading
+import  time
+from    collections             import deque
+from    contextlib              import contextmanager
+from    typing                  import Any, Iterator
+from    state                   import shared
+
+class TokenBucket:
+    '''
+    A thread-safe token bucket refilled at <rate> tokens per second, up
+    to <burst> tokens. A rate of 0 means no limit.
+    '''
+
+    def __init__(self, rate : float = 0.0, *args, **kwargs):
+        self.rate           : float             = float(rate)
+        self.burst          : float             = max(1.0, self.rate)
+        self.lock           : threading.Lock    = threading.Lock()
+
+        for k, v in kwargs.items():
+            if k == 'burst'     : self.burst    = max(1.0, float(v))
+
+        self.tokens         : float             = self.burst
+        self.stamp          : float             = time.monotonic()
+
+    def acquire(self, tokens : float = 1.0) -> float:
+        """
+        Take <tokens> from the bucket, sleeping until they are available.
+
+        Returns:
+            float: the seconds spent waiting
+        """
+        if not self.rate: return 0.0
+        waited      : float = 0.0
+        while True:
+            with self.lock:
+                now         : float = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp  = now
+                if self.tokens >= tokens:
+                    self.tokens    -= tokens
+                    return waited
+                delay       : float = (tokens - self.tokens) / self.rate
+            time.sleep(delay)
+            waited     += delay
+
+class InflightCap:
+    '''
+    A counter of in-flight work that blocks new work once <limit> are
+    in flight. A limit of 0 means no limit. Work can wait for a slot in
+    a thread (`acquire`) or in a coroutine (`acquire_async`), which then
+    holds no thread while it waits.
+    '''
+
+    def __init__(self, limit : int = 0, *args, **kwargs):
+        self.limit          : int                   = int(limit)
+        self.inflight       : int                   = 0
+        self.peak           : int                   = 0
+        self.cond           : threading.Condition   = threading.Condition()
+        self.q_waiter       : deque                 = deque()
+
+    def slot_take(self) -> bool:
+        """
+        Take a slot if one is free (the caller holds the condition).
+        """
+        if self.limit and self.inflight >= self.limit:
+            return False
+        self.inflight  += 1
+        self.peak       = max(self.peak, self.inflight)
+        return True
+
+    def acquire(self) -> None:
+        with self.cond:
+            while not self.slot_take():
+                self.cond.wait()
+
+    async def acquire_async(self) -> None:
+        loop                                = asyncio.get_running_loop()
+        while True:
+            with self.cond:
+                if self.slot_take():
+                    return
+                waiter  : asyncio.Future    = loop.create_future()
+                self.q_waiter.append((loop, waiter))
+            await waiter
+
+    def release(self) -> None:
+        with self.cond:
+            self.inflight  -= 1
+            self.cond.notify()
+            if self.q_waiter:
+                loop, waiter    = self.q_waiter.popleft()
+                loop.call_soon_threadsafe(lambda: waiter.done() or waiter.set_result(None))
+
+def budgets_parse(str_spec : str) -> dict:
+    """
+    Parse a budget spec of the form 'read=50,write=10' into a
+    {<name>: <float>} dictionary.
+
+    Args:
+        str_spec (str): the budget spec
+
+    Returns:
+        dict: the budget for each name
+    """
+    d_budget    : dict  = {}
+    for str_item in filter(None, (s.strip() for s in str_spec.split(','))):
+        str_name, _, str_value = str_item.partition('=')
+        if not str_value:
+            raise ValueError("budget '%s' is not of form <name>=<value>" % str_item)
+        d_budget[str_name.strip()] = float(str_value)
+    return d_budget
+
+def callType_get(str_method : str) -> str:
+    """
+    The API call type of client method <str_method>: 'read' for the
+    get_* queries, 'write' for everything else.
+    """
+    return 'read' if str_method.startswith('get') else 'write'
+
+class AdmissionController:
+    '''
+    Rate limits for CUBE API calls and caps on in-flight work.
+
+        rates       {<call type>: <calls per second>}
+        caps        {<work kind>: <max in flight>}
+    '''
+
+    # client methods that do no I/O and so are never rate limited
+    l_local         : list  = ['compute_workflow_nodes_info']
+
+    def __init__(self, *args, **kwargs):
+        self.d_bucket       : dict              = {}
+        self.d_cap          : dict              = {}
+        self.lock           : threading.Lock    = threading.Lock()
+        self.d_stats        : dict              = {}
+
+        for k, v in kwargs.items():
+            if k == 'rates'     :
+                self.d_bucket   = {t: TokenBucket(r) for t, r in v.items()}
+            if k == 'caps'      :
+                self.d_cap      = {w: InflightCap(int(c)) for w, c in v.items()}
+
+    def stats_add(self, str_key : str, waited : float) -> None:
+        with self.lock:
+            d_stat  : dict  = self.d_stats.setdefault(str_key, {'calls': 0, 'waited': 0.0})
+            d_stat['calls']    += 1
+            d_stat['waited']   += waited
+
+    def call_admit(self, str_method : str) -> None:
+        """
+        Block until a call to client method <str_method> is admitted.
+        """
+        if str_method in self.l_local: return
+        str_type    : str           = callType_get(str_method)
+        bucket      : TokenBucket   = self.d_bucket.get(str_type)
+        self.stats_add(str_type, bucket.acquire() if bucket else 0.0)
+
+    def work_begin(self, str_kind : str) -> None:
+        """
+        Block until another piece of work of <str_kind> may be in flight.
+        Every call must be paired with a `work_end`.
+        """
+        cap         : InflightCap   = self.d_cap.get(str_kind)
+        tic         : float         = time.monotonic()
+        if cap: cap.acquire()
+        self.stats_add(str_kind, time.monotonic() - tic)
+
+    async def work_beginAsync(self, str_kind : str) -> None:
+        """
+        The coroutine equivalent of `work_begin`, which waits on the event
+        loop rather than in a thread.
+        """
+        cap         : InflightCap   = self.d_cap.get(str_kind)
+        tic         : float         = time.monotonic()
+        if cap: await cap.acquire_async()
+        self.stats_add(str_kind, time.monotonic() - tic)
+
+    def work_end(self, str_kind : str) -> None:
+        cap         : InflightCap   = self.d_cap.get(str_kind)
+        if cap: cap.release()
+
+    @contextmanager
+    def work(self, str_kind : str) -> Iterator[None]:
+        """
+        A context in which one piece of work of <str_kind> is in flight.
+        """
+        self.work_begin(str_kind)
+        try:
+            yield
+        finally:
+            self.work_end(str_kind)
+
+    def client_gate(self, cl : Any) -> 'GatedClient':
+        return GatedClient(cl, self)
+
+    def stats(self) -> dict:
+        """
+        Calls admitted and seconds spent waiting, per call type and work
+        kind, with the peak in-flight count of each capped kind.
+        """
+        with self.lock:
+            d_stats : dict  = {k: dict(v) for k, v in self.d_stats.items()}
+        for str_kind, cap in self.d_cap.items():
+            d_stats.setdefault(str_kind, {'calls': 0, 'waited': 0.0})['peak'] = cap.peak
+        return d_stats
+
+class GatedClient:
+    '''
+    A proxy about a CUBE client (or request) object whose method calls
+    are each admitted through an `AdmissionController`.
+    '''
+
+    def __init__(self, cl : Any, controller : AdmissionController):
+        self.cl             : Any                   = cl
+        self.controller     : AdmissionController   = controller
+
+    def __getattr__(self, str_name : str) -> Any:
+        attr        : Any   = getattr(self.cl, str_name)
+        if not callable(attr): return attr
+
+        def call_gated(*args, **kwargs) -> Any:
+            self.controller.call_admit(str_name)
+            return attr(*args, **kwargs)
+        return call_gated
+
+# the process-wide admission controller (see `shared.Shared`)
+sharedAdmission_get = shared.Shared(AdmissionController).get
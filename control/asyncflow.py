@@ -0,0 +1,102 @@
+str_about = '''
+    The asyncflow module provides a coroutine-based driver for the LLD
+    compute flow.
+
+    Each tree spends nearly all of its time waiting on CUBE nodes to
+    finish. Rather than dedicate a thread to each such wait, the driver
+    here awaits the shared status poller's futures, so that a single
+    event loop can keep thousands of trees in flight. The (short) CUBE
+    API calls that schedule workflows and joins are run in a thread
+    pool so as not to block the loop.
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  asyncio
+from    .                       import action
+from    .                       import dag
+from    state                   import records
+
+class AsyncLLDcomputeflow:
+    '''
+    An awaitable wrapper about an `action.LLDcomputeflow` object.
+    '''
+
+    def __init__(self, flow : action.LLDcomputeflow, *args, **kwargs):
+        self.flow           : action.LLDcomputeflow = flow
+
+    async def waitForNodeInWorkflow(self,
+            d_workflowDetail    : dict,
+            node_title          : str,
+            **kwargs
+        ) -> records.NodeResult:
+        """
+        Await a node in a workflow transitioning to a finishedState. See
+        `action.LLDcomputeflow.waitForNodeInWorkflow`.
+
+        Returns:
+            records.NodeResult: the wait result
+        """
+        d_wait      : dict  = self.flow.nodeWait_begin(d_workflowDetail, node_title, **kwargs)
+        d_plinfo    : dict  = None
+        if d_wait['future']:
+            try:
+                # shield the poller's future -- a timeout here must not
+                # cancel it for any other waiter
+                d_plinfo    = await asyncio.wait_for(
+                                asyncio.shield(asyncio.wrap_future(d_wait['future'])),
+                                d_wait['timeout']
+                            )
+            except asyncio.TimeoutError:
+                d_plinfo    = None
+        return await asyncio.to_thread(self.flow.nodeWait_end, d_wait, d_plinfo)
+
+    async def flowNode_execute(self,
+            d_node      : dict,
+            d_result    : dict
+        ) -> records.NodeResult | None:
+        """
+        Run a single node of the flow spec and await the node it waits
+        on. See `action.LLDcomputeflow.flowNode_execute`.
+        """
+        d_ret       : records.NodeResult | None = None
+        # wait for admission on the loop: a submitter blocked on a cap in
+        # an I/O thread could starve the nodeWait_end that frees the cap
+        await self.flow.admission.work_beginAsync(d_node['type'])
+        d_submit    : dict  = await asyncio.to_thread(
+                                self.flow.flowNode_submit, d_node, d_result, admitted = True
+                            )
+        if d_submit:
+            d_ret   = await self.waitForNodeInWorkflow(
+                        d_submit['detail'],
+                        d_submit['waitFor'],
+                        **d_submit['waitArgs']
+                    )
+            d_ret.prior = d_submit['prior']
+            await asyncio.to_thread(self.flow.flowNode_done, d_node, d_ret)
+        return d_ret
+
+    async def computeFlow_build(self) -> records.NodeResult:
+        """
+        Run the nodes of the flow spec, each as soon as the nodes it
+        depends on are done, with independent branches run as
+        concurrent tasks.
+
+        Returns:
+            records.NodeResult: the result of the last node of the spec.
+        """
+        d_result    : dict  = await dag.FlowScheduler(
+                                self.flow.flowSpec,
+                                done = self.flow.nodesDone_resumed()
+                            ).run_async(self.flowNode_execute)
+        return self.flow.flowResult_last(d_result)
+
+    async def __call__(self, filteredCopyInstanceID : int) -> records.NodeResult:
+        """
+        Execute/manage the LLD compute flow off <filteredCopyInstanceID>
+
+        Returns:
+            records.NodeResult: the compute flow result
+        """
+        self.flow.newTreeID = int(filteredCopyInstanceID)
+        return await self.computeFlow_build()
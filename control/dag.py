@@ -0,0 +1,255 @@
+str_about = '''
+    The dag module describes a compute flow as data -- a directed acyclic
+    graph of CUBE workflows and topological join nodes -- and provides a
+    scheduler that runs each node of the graph as soon as all of the
+    nodes it depends on have finished, running independent branches
+    concurrently.
+
+    A flow spec is a JSON document with a list of "nodes". Each node has
+    an "id" and a "type":
+
+        workflow    schedule the pipeline named by "pipeline" off the node
+                    named in "attach", with optional default "parameters"
+                    overrides, and wait for the node titled "waitFor"
+
+        join        create a topological join of the "parent" node with
+                    the "distal" nodes, using the "filter" regex list,
+                    and wait for the join to finish
+
+    References to other nodes are either a node id, the special id
+    "seed" (the seed the tree grows from), or {"node": <id>, "title":
+    <substring>} to name a specific plugin instance within a workflow
+    node. Parameter values may use ${name} placeholders that are filled
+    in from the run context (e.g. ${pftelDB}, ${orthanc.url}). An
+    optional "totalPolls" sets the node's wait timeout in polls (0 for
+    no timeout).
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  json
+import  string
+import  threading
+import  asyncio
+from    pathlib                 import Path
+from    typing                  import Callable, Awaitable
+from    concurrent.futures      import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from    state                   import records
+
+LLD_FLOWSPEC    : Path  = Path(__file__).parent / 'lld_flow.json'
+
+class FlowSpec:
+    '''
+    A validated flow spec with its dependency graph.
+    '''
+
+    def __init__(self, d_spec : dict, *args, **kwargs):
+        self.name           : str   = d_spec.get('name', '')
+        self.l_node         : list  = d_spec['nodes']
+        self.d_node         : dict  = {}
+        self.d_deps         : dict  = {}
+        self.d_dependents   : dict  = {}
+
+        for d_node in self.l_node:
+            if d_node['id'] in self.d_node or d_node['id'] == 'seed':
+                raise ValueError("duplicate or reserved node id '%s'" % d_node['id'])
+            if d_node.get('type') not in ['workflow', 'join']:
+                raise ValueError("node '%s' has unknown type '%s'" % (d_node['id'], d_node.get('type')))
+            self.d_node[d_node['id']] = d_node
+        for d_node in self.l_node:
+            self.d_deps[d_node['id']] = self.node_deps(d_node)
+            for str_dep in self.d_deps[d_node['id']]:
+                if str_dep not in self.d_node:
+                    raise ValueError("node '%s' refers to unknown node '%s'" % (d_node['id'], str_dep))
+                self.d_dependents.setdefault(str_dep, []).append(d_node['id'])
+        self.l_order        : list  = self.order()
+
+    @staticmethod
+    def ref_node(ref : str | dict) -> str:
+        """
+        The node id named by a reference
+        """
+        if isinstance(ref, dict): return ref['node']
+        return ref
+
+    def node_parent(self, d_node : dict) -> str:
+        """
+        The node that <d_node> is anchored to ('seed' for the root)
+        """
+        return self.ref_node(d_node.get('attach', d_node.get('parent', 'seed')))
+
+    def node_deps(self, d_node : dict) -> list:
+        """
+        The ids of all the nodes that <d_node> depends on
+        """
+        l_ref   : list  = [self.node_parent(d_node)] + \
+                          [self.ref_node(r) for r in d_node.get('distal', [])]
+        l_dep   : list  = []
+        for str_ref in l_ref:
+            if str_ref != 'seed' and str_ref not in l_dep:
+                l_dep.append(str_ref)
+        return l_dep
+
+    def order(self) -> list:
+        """
+        A topological order of the node ids
+
+        Raises:
+            ValueError: if the graph has a cycle
+        """
+        d_indegree  : dict  = {k: len(v) for k, v in self.d_deps.items()}
+        l_ready     : list  = [d['id'] for d in self.l_node if not d_indegree[d['id']]]
+        l_order     : list  = []
+        while l_ready:
+            str_id  : str   = l_ready.pop(0)
+            l_order.append(str_id)
+            for str_dependent in self.d_dependents.get(str_id, []):
+                d_indegree[str_dependent] -= 1
+                if not d_indegree[str_dependent]:
+                    l_ready.append(str_dependent)
+        if len(l_order) != len(self.l_node):
+            raise ValueError("flow spec '%s' has a cycle" % self.name)
+        return l_order
+
+    def pipelines(self) -> list:
+        """
+        The names of all the pipelines used in this flow
+        """
+        return [d['pipeline'] for d in self.l_node if d['type'] == 'workflow']
+
+    def node_last(self) -> str:
+        """
+        The id of the last node declared in the spec -- its result is
+        taken as the result of the whole flow
+        """
+        return self.l_node[-1]['id']
+
+class ContextTemplate(string.Template):
+    idpattern   = r'(?a:[_a-z][_a-z0-9.]*)'
+
+def parameters_resolve(d_parameters : dict, d_context : dict) -> dict:
+    """
+    Fill in the ${name} placeholders in the (nested) <d_parameters>
+    from <d_context>. Unknown placeholders are left as is.
+
+    Args:
+        d_parameters (dict):    {<node title>: {<param>: <value>}}
+        d_context (dict):       placeholder values
+
+    Returns:
+        dict: a new, resolved parameter dictionary
+    """
+    return {
+        str_title: {
+            k: ContextTemplate(v).safe_substitute(d_context) if isinstance(v, str) else v
+            for k, v in d_param.items()
+        }
+        for str_title, d_param in d_parameters.items()
+    }
+
+_d_flowSpec     : dict              = {}
+_flowSpecLock   : threading.Lock    = threading.Lock()
+
+def flowSpec_load(str_path : str = '') -> FlowSpec:
+    """
+    Load (once per path) and validate a flow spec file. With no path,
+    the bundled LLD flow is used.
+
+    Args:
+        str_path (str, optional): path to a JSON flow spec. Defaults to ''.
+
+    Returns:
+        FlowSpec: the flow spec
+    """
+    path    : Path  = Path(str_path) if str_path else LLD_FLOWSPEC
+    with _flowSpecLock:
+        if str(path) not in _d_flowSpec:
+            _d_flowSpec[str(path)] = FlowSpec(json.loads(path.read_text()))
+        return _d_flowSpec[str(path)]
+
+class FlowScheduler:
+    '''
+    Run the nodes of a FlowSpec, each as soon as its dependencies are
+    done. A node only runs if all of its dependencies finished
+    successfully; otherwise it (and everything downstream of it) is
+    skipped with a None result.
+
+    The <execute> callable passed to `run` (or coroutine function passed
+    to `run_async`) is called as execute(d_node, d_result) where
+    d_result holds the results of all nodes done so far, keyed on id.
+    A result is a successful finish if its `finished` attribute is true
+    (see `records.result_finished`).
+    '''
+
+    def __init__(self, spec : FlowSpec, *args, **kwargs):
+        self.spec           : FlowSpec  = spec
+        self.d_result       : dict      = {}
+
+        for k, v in kwargs.items():
+            if k == 'done'      : self.d_result = dict(v)
+
+    def node_succeeded(self, str_id : str) -> bool:
+        return records.result_finished(self.d_result.get(str_id))
+
+    def nodes_ready(self, s_started : set) -> list:
+        """
+        The nodes that can start now. Nodes downstream of a failure are
+        marked as skipped along the way.
+        """
+        l_ready     : list  = []
+        b_skipped   : bool  = True
+        while b_skipped:
+            b_skipped   = False
+            for str_id in self.spec.l_order:
+                if str_id in s_started or str_id in self.d_result: continue
+                l_dep   : list  = self.spec.d_deps[str_id]
+                if not all(d in self.d_result for d in l_dep): continue
+                if all(self.node_succeeded(d) for d in l_dep):
+                    if str_id not in l_ready: l_ready.append(str_id)
+                else:
+                    self.d_result[str_id]   = None
+                    b_skipped               = True
+        return l_ready
+
+    def run(self, execute : Callable[[dict, dict], dict]) -> dict:
+        """
+        Run the flow, with independent nodes run concurrently in threads.
+
+        Returns:
+            dict: the result of each node, keyed on id
+        """
+        s_started   : set   = set()
+        d_running   : dict  = {}
+        with ThreadPoolExecutor(max_workers = len(self.spec.l_node)) as pool:
+            while True:
+                for str_id in self.nodes_ready(s_started):
+                    s_started.add(str_id)
+                    d_running[pool.submit(
+                        execute, self.spec.d_node[str_id], self.d_result
+                    )] = str_id
+                if not d_running: break
+                s_done, _ = wait(list(d_running), return_when = FIRST_COMPLETED)
+                for future in s_done:
+                    self.d_result[d_running.pop(future)] = future.result()
+        return self.d_result
+
+    async def run_async(self, execute : Callable[[dict, dict], Awaitable[dict]]) -> dict:
+        """
+        Run the flow, with independent nodes run as concurrent tasks.
+
+        Returns:
+            dict: the result of each node, keyed on id
+        """
+        s_started   : set   = set()
+        d_running   : dict  = {}
+        while True:
+            for str_id in self.nodes_ready(s_started):
+                s_started.add(str_id)
+                d_running[asyncio.ensure_future(
+                    execute(self.spec.d_node[str_id], self.d_result)
+                )] = str_id
+            if not d_running: break
+            s_done, _ = await asyncio.wait(list(d_running), return_when = asyncio.FIRST_COMPLETED)
+            for task in s_done:
+                self.d_result[d_running.pop(task)] = task.result()
+        return self.d_result
@@ -3,15 +3,44 @@ str_about = '''
     directory for files conforming to some pattern. The primary purpose
     of this class is to provide an alternative to the built-in chris_plugin
     'PathMapper' object.
+
+    In its streaming mode, the filter does not catalog the input space up
+    front but walks it lazily with `os.scandir`, yielding each match as it
+    is found, so that the first tree can start growing before the walk of
+    a large input directory is done.
 '''
 
 
 from    argparse                import ArgumentParser, Namespace
 from    pathlib                 import Path
+from    fnmatch                 import fnmatchcase
+from    typing                  import Iterator
 import  pfmisc
 import  glob
 import  os
 
+def patterns_parse(patterns : str | list) -> list:
+    '''
+    A list of patterns from a comma separated string (or a list)
+    '''
+    if isinstance(patterns, str):
+        patterns = patterns.split(',')
+    return [p.strip() for p in patterns if p.strip()]
+
+def pattern_match(str_relpath : str, str_pattern : str) -> bool:
+    '''
+    Does the (posix) path <str_relpath>, relative to the input directory,
+    match <str_pattern>? A pattern with no '/' is matched against the
+    name only, otherwise against the whole relative path -- in which a
+    leading '**/' also matches no directory at all (as it does in
+    `Path.glob`).
+    '''
+    if '/' not in str_pattern:
+        return fnmatchcase(str_relpath.rsplit('/', 1)[-1], str_pattern)
+    if str_pattern.startswith('**/') and fnmatchcase(str_relpath, str_pattern[3:]):
+        return True
+    return fnmatchcase(str_relpath, str_pattern)
+
 class   PathFilter:
     '''
     A simple filter class that operates on directories to catalog
@@ -28,15 +57,31 @@ class   PathFilter:
         self.l_files        : list          = []
         self.LOG            : pfmisc.debug  = None
         self.b_filesOnly    : bool          = False
+        self.b_stream       : bool          = False
+        self.l_include      : list          = []
+        self.l_exclude      : list          = []
+        self.maxDepth       : int           = -1
+        self.logEvery       : int           = 10000
+        self.d_stats        : dict          = {}
 
         for k,v in kwargs.items():
             if k == 'glob'          : self.glob         = v
             if k == 'logger'        : self.LOG          = v
             if k == 'only_files'    : self.b_filesOnly  = True
+            if k == 'stream'        : self.b_stream     = bool(v)
+            if k == 'include'       : self.l_include    = patterns_parse(v)
+            if k == 'exclude'       : self.l_exclude    = patterns_parse(v)
+            if k == 'maxDepth'      : self.maxDepth     = int(v)
+            if k == 'logEvery'      : self.logEvery     = int(v)
 
-        self.inputdir_filter(self.inputdir)
+        if not self.l_include:
+            self.l_include  = [self.glob]
+        if not self.b_stream:
+            self.inputdir_filter(self.inputdir)
 
     def __iter__(self):
+        if self.b_stream:
+            return self.inputdir_walk()
         return PathIterator(self)
 
     def log(self, message, **kwargs):
@@ -59,6 +104,80 @@ class   PathFilter:
         l_glob = [self.LOG(f) for f in self.l_files]
         return self.l_files
 
+    def path_excluded(self, str_relpath : str) -> bool:
+        return any(pattern_match(str_relpath, p) for p in self.l_exclude)
+
+    def path_included(self, str_relpath : str) -> bool:
+        return any(pattern_match(str_relpath, p) for p in self.l_include)
+
+    def inputdir_walk(self) -> Iterator[tuple[Path, Path]]:
+        '''
+        The streaming mode: walk the input directory with `os.scandir`,
+        depth first, and yield an (input, output) tuple -- as the
+        chris_plugin PathMapper does -- for each file that matches an
+        include pattern and no exclude pattern, as soon as it is found.
+
+        Excluded directories are not descended into, nor are those deeper
+        than maxDepth (where 0 is the input directory itself, and a
+        negative maxDepth is unlimited). Symbolic links to directories are
+        followed, but no directory is walked twice, so that a link loop
+        still ends. Entries are yielded in directory order, which is not
+        sorted. Rather than every entry, only a running
+        count (every logEvery matches) and a final summary are logged.
+        '''
+        self.d_stats    = {'dirs': 0, 'entries': 0, 'matched': 0, 'excluded': 0, 'pruned': 0, 'revisits': 0}
+        l_stack : list  = [(str(self.inputdir), '', 0)]
+        # the (st_dev, st_ino) of every directory queued to be walked
+        s_visited   : set   = set()
+        try:
+            st          = os.stat(self.inputdir)
+            s_visited.add((st.st_dev, st.st_ino))
+        except OSError:
+            pass
+        self.log("Streaming files in %s matching %s%s, maxDepth %d" % (
+                    str(self.inputdir), ','.join(self.l_include),
+                    (' but not %s' % ','.join(self.l_exclude)) if self.l_exclude else '',
+                    self.maxDepth
+                ))
+        while l_stack:
+            str_dir, str_reldir, depth = l_stack.pop()
+            self.d_stats['dirs']   += 1
+            l_subdir    : list  = []
+            try:
+                it_entry        = os.scandir(str_dir)
+            except OSError as e:
+                self.log("Unable to scan %s: %s" % (str_dir, e))
+                continue
+            with it_entry:
+                for entry in it_entry:
+                    self.d_stats['entries'] += 1
+                    str_relpath : str   = str_reldir + entry.name
+                    if self.path_excluded(str_relpath):
+                        self.d_stats['excluded']    += 1
+                        continue
+                    if entry.is_dir():
+                        st          = entry.stat()
+                        if (st.st_dev, st.st_ino) in s_visited:
+                            self.d_stats['revisits']    += 1
+                        elif self.maxDepth < 0 or depth < self.maxDepth:
+                            s_visited.add((st.st_dev, st.st_ino))
+                            l_subdir.append((entry.path, str_relpath + '/', depth + 1))
+                        else:
+                            self.d_stats['pruned']  += 1
+                        continue
+                    if not self.path_included(str_relpath):
+                        continue
+                    self.d_stats['matched'] += 1
+                    if not self.d_stats['matched'] % self.logEvery:
+                        self.log("... %d files matched so far" % self.d_stats['matched'])
+                    yield Path(entry.path), Path(self.outputdir) / str_relpath
+            # descend into the subdirectories in the order they were found
+            l_stack.extend(reversed(l_subdir))
+        self.log("Matched %d of %d entries in %d directories (%d excluded, %d directories beyond maxDepth, %d already walked)" % (
+                    self.d_stats['matched'], self.d_stats['entries'], self.d_stats['dirs'],
+                    self.d_stats['excluded'], self.d_stats['pruned'], self.d_stats['revisits']
+                ))
+
 class   PathIterator:
     '''
     An iterator over the PathFilter class
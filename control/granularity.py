@@ -0,0 +1,216 @@
+str_about = '''
+    The granularity module plans how the input space is divided into
+    seeds (and hence trees).
+
+    By default each DICOM file gets its own seed and its own five
+    pipeline tree, and with --inNode each directory gets one tree no
+    matter how many files it holds. Since each tree carries a fixed
+    CUBE overhead, the planner here instead packs many small inputs into
+    a single seed (up to a target batch size) and splits oversized
+    directories into balanced chunks, so that the number of trees scales
+    with the volume of data rather than the number of files.
+
+    The inputs can also be sharded across controllers: with --shard K/N,
+    each controller only takes the inputs whose (stable) hash puts them
+    in partition K of N, so that N controllers over the same input space
+    grow every tree exactly once between them.
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  hashlib
+import  math
+import  re
+from    pathlib                 import Path
+from    typing                  import Iterator
+
+class Batch:
+    '''
+    A group of input files that is planted as a single seed. If <str_dir>
+    is set, the batch is a chunk of that directory (the in-node case).
+    The full paths of the files, if known, are in <paths>.
+    '''
+
+    def __init__(self, str_name : str, l_file : list, str_dir : str = '', **kwargs):
+        self.name           : str       = str_name
+        self.l_file         : list      = l_file
+        self.str_dir        : str       = str_dir
+        self.size           : int       = 0
+        self.l_path         : list      = []
+
+        for k, v in kwargs.items():
+            if k == 'size'      : self.size     = v
+            if k == 'paths'     : self.l_path   = v
+
+    def __str__(self) -> str:
+        return self.name
+
+    def __len__(self) -> int:
+        return len(self.l_file)
+
+    def filter_args(self) -> str:
+        """
+        The pl-shexec filter arguments that select (only) the files of
+        this batch. pl-shexec accepts a comma separated list of file
+        filters.
+
+        Returns:
+            str: the filter CLI argument string
+        """
+        l_filter        : list  = []
+        if self.str_dir:
+            l_filter.append("--dirFilter=%s" % self.str_dir)
+        if self.l_file:
+            l_filter.append("--fileFilter=%s" % ','.join(self.l_file))
+        return ';'.join(l_filter)
+
+class GranularityPlanner:
+    '''
+    An iterable over the input directory that yields (Batch, outputdir)
+    tuples -- a drop-in replacement for the chris_plugin PathMapper.
+
+        batchFiles      the maximum number of files packed into one seed
+        batchBytes      the maximum total size of one seed (0: no limit)
+        maxDirFiles     in-node mode: directories with more files than
+                        this are split into balanced chunks (0: no split)
+    '''
+
+    def __init__(self, inputdir : Path, outputdir : Path, *args, **kwargs):
+        self.inputdir       : Path      = inputdir
+        self.outputdir      : Path      = outputdir
+        self.glob           : str       = '**/*'
+        self.b_inNode       : bool      = False
+        self.batchFiles     : int       = 1
+        self.batchBytes     : int       = 0
+        self.maxDirFiles    : int       = 0
+
+        for k, v in kwargs.items():
+            if k == 'glob'          : self.glob         = v
+            if k == 'inNode'        : self.b_inNode     = v
+            if k == 'batchFiles'    : self.batchFiles   = max(1, int(v))
+            if k == 'batchBytes'    : self.batchBytes   = int(v)
+            if k == 'maxDirFiles'   : self.maxDirFiles  = int(v)
+
+    def __iter__(self) -> Iterator:
+        if self.b_inNode:
+            return ((batch, self.outputdir) for batch in self.dirs_chunk())
+        return ((batch, self.outputdir) for batch in self.files_pack())
+
+    def files_pack(self) -> Iterator[Batch]:
+        """
+        Pack the files matching the glob into batches of at most
+        batchFiles files (and batchBytes bytes).
+        """
+        l_path      : list  = []
+        batchSize   : int   = 0
+        for path in sorted(self.inputdir.glob(self.glob)):
+            if not path.is_file(): continue
+            fileSize    : int   = path.stat().st_size
+            if l_path and (
+                len(l_path) >= self.batchFiles or
+                (self.batchBytes and batchSize + fileSize > self.batchBytes)
+            ):
+                yield self.batch_name(l_path, batchSize)
+                l_path, batchSize   = [], 0
+            l_path.append(path)
+            batchSize  += fileSize
+        if l_path:
+            yield self.batch_name(l_path, batchSize)
+
+    def path_rel(self, path : Path) -> str:
+        """
+        The name of <path> in batch names: its path relative to the
+        input directory, so that (unlike a bare file or directory name)
+        it is unique -- the journal, dedup index, status and result log
+        all key trees on it.
+        """
+        try:
+            return Path(path).relative_to(self.inputdir).as_posix()
+        except ValueError:
+            return Path(path).as_posix()
+
+    def batch_name(self, l_path : list, batchSize : int) -> Batch:
+        l_file      : list  = [p.name for p in l_path]
+        str_name    : str   = self.path_rel(l_path[0])
+        if len(l_file) > 1:
+            str_name += '+%d' % (len(l_file) - 1)
+        return Batch(str_name, l_file, size = batchSize, paths = l_path)
+
+    def dirs_chunk(self) -> Iterator[Batch]:
+        """
+        Yield one batch per directory that contains matching files,
+        splitting directories of more than maxDirFiles files into as few
+        evenly sized chunks as possible.
+        """
+        # '**/*dcm' -> 'dcm', as used by the pl-shexec file filter
+        str_ff      : str   = re.subn(r'[*/]', '', self.glob)[0]
+        for str_root, l_dir, l_name in os.walk(self.inputdir):
+            l_dir.sort()
+            l_file  : list  = sorted(f for f in l_name if str_ff in f)
+            if not l_file: continue
+            str_dir     : str   = Path(str_root).name
+            str_name    : str   = self.path_rel(str_root)
+            l_path      : list  = [Path(str_root) / f for f in l_file]
+            chunks      : int   = 1
+            if self.maxDirFiles and len(l_file) > self.maxDirFiles:
+                chunks  = math.ceil(len(l_file) / self.maxDirFiles)
+            if chunks == 1:
+                yield Batch(str_name, [str_ff] if str_ff else [], str_dir, paths = l_path)
+                continue
+            for chunk in range(chunks):
+                yield Batch(
+                    '%s-part%dof%d' % (str_name, chunk + 1, chunks),
+                    l_file[chunk::chunks],
+                    str_dir,
+                    paths   = l_path[chunk::chunks]
+                )
+
+def shard_parse(str_shard : str) -> tuple[int, int]:
+    """
+    Parse a 'K/N' shard spec, where 0 <= K < N.
+
+    Returns:
+        tuple[int, int]: (K, N); an empty spec is the one shard (0, 1)
+    """
+    if not str_shard:
+        return 0, 1
+    try:
+        k, n    = (int(s) for s in str_shard.split('/'))
+    except ValueError:
+        raise ValueError("shard spec '%s' is not of the form K/N" % str_shard)
+    if not 0 <= k < n:
+        raise ValueError("shard spec '%s' needs 0 <= K < N" % str_shard)
+    return k, n
+
+def shard_key(input : Path | Batch, inputdir : Path) -> str:
+    """
+    The key by which <input> is assigned to a shard: its path relative to
+    <inputdir>, so that controllers that mount the input space at
+    different places still agree. A batch is keyed on its first file (or,
+    for a batch with no known files, its directory and name).
+    """
+    if isinstance(input, Batch):
+        if not input.l_path:
+            return '%s/%s' % (input.str_dir, input.name)
+        input   = input.l_path[0]
+    try:
+        return Path(input).relative_to(inputdir).as_posix()
+    except ValueError:
+        return Path(input).as_posix()
+
+def shard_of(str_key : str, shards : int) -> int:
+    """
+    The shard of <str_key> out of <shards>: a stable hash (unlike the
+    builtin hash(), the same in every process) modulo the shard count.
+    """
+    digest  : bytes = hashlib.blake2b(str_key.encode('utf-8'), digest_size = 8).digest()
+    return int.from_bytes(digest, 'big') % shards
+
+def inputs_shard(mapper : Iterator, inputdir : Path, k : int, n : int) -> Iterator:
+    """
+    Pass through the (input, output) tuples of <mapper> that fall in
+    shard <k> of <n>.
+    """
+    for input, output in mapper:
+        if n == 1 or shard_of(shard_key(input, inputdir), n) == k:
+            yield input, output
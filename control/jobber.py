@@ -4,13 +4,54 @@ str_about = '''
     and the Jobber class executes the command, returning to the caller a
     dictionary structure containing misc info such as <stdout>, <stderr>, and
     <returncode>.
+
+    Many jobs can run concurrently (one per thread): output is streamed into
+    bounded buffers and each job's record is written to its own file
+    (unless 'noJobLogging' is set, as the controller does).
 '''
 
 import  subprocess
+import  selectors
+import  threading
+import  codecs
+import  time
+import  uuid
 import  os
 os.environ['XDG_CONFIG_HOME'] = '/tmp'
 import  pudb
 import  json
+from    collections             import deque
+
+class RingBuffer:
+    '''
+    A text buffer that keeps only the most recent <size> characters,
+    counting (rather than keeping) anything that falls off the front.
+    '''
+
+    def __init__(self, size : int):
+        self.size       : int   = size
+        self.length     : int   = 0
+        self.dropped    : int   = 0
+        self.chunks     : deque = deque()
+
+    def append(self, str_chunk : str) -> None:
+        if not str_chunk: return
+        self.chunks.append(str_chunk)
+        self.length    += len(str_chunk)
+        while self.length > self.size:
+            excess      : int   = self.length - self.size
+            str_head    : str   = self.chunks[0]
+            if len(str_head) <= excess:
+                self.chunks.popleft()
+                self.length    -= len(str_head)
+                self.dropped   += len(str_head)
+            else:
+                self.chunks[0]  = str_head[excess:]
+                self.length    -= excess
+                self.dropped   += excess
+
+    def text(self) -> str:
+        return ''.join(self.chunks)
 
 class Jobber:
 
@@ -24,6 +65,9 @@ class Jobber:
         self.args   = d_args.copy()
         if not 'verbosity'      in self.args.keys(): self.args['verbosity']     = 0
         if not 'noJobLogging'   in self.args.keys(): self.args['noJobLogging']  = False
+        if not 'jobDir'         in self.args.keys(): self.args['jobDir']        = '/tmp/jobs'
+        if not 'bufferSize'     in self.args.keys(): self.args['bufferSize']    = 1 << 20
+        if not 'spill'          in self.args.keys(): self.args['spill']         = False
 
     def dict2JSONcli(self, d_dict : dict) -> str:
         """Convert a dictionary into a CLI conformant JSON string.
@@ -81,7 +125,25 @@ class Jobber:
                 str_cli += '--%s %s ' % (k, v)
         return str_cli
 
-    def job_run(self, str_cmd):
+    def job_record(self, d_job : dict) -> str:
+        """
+        Write the record of a completed job to a path unique to that job
+        (so that concurrent jobs never clobber each other's records) --
+        unless 'noJobLogging' is set.
+
+        Args:
+            d_job (dict): the job return structure
+
+        Returns:
+            str: the path of the record ('' if none was written)
+        """
+        if self.args['noJobLogging']: return ''
+        str_record  : str = os.path.join(self.args['jobDir'], '%s.json' % d_job['jobid'])
+        with open(str_record, 'w') as f:
+            json.dump(d_job, f, indent=4)
+        return str_record
+
+    def job_run(self, str_cmd, **kwargs):
         """
         Running some CLI process via python is cumbersome. The typical/easy
         path of
@@ -92,47 +154,117 @@ class Jobber:
         method is via subprocess, which has a cumbersome processing
         syntax. Still, this method runs the `str_cmd` and returns the
         stderr and stdout strings as well as a returncode.
-        Providing readtime output of both stdout and stderr seems
-        problematic. The approach here is to provide realtime
-        output on stdout and only provide stderr on process completion.
+
+        Both stdout and stderr are drained concurrently as data arrives
+        (so a chatty stderr can never block the child on a full pipe),
+        into ring buffers bounded by 'bufferSize' characters. If the
+        'spill' arg is set, the complete streams are also written to
+        per-job files in 'jobDir'. Realtime output of stdout is echoed
+        if verbosity is set.
+
+        kwargs:
+                timeout     = seconds after which the job is terminated
+                cancel      = a threading.Event that, when set, terminates
+                              the job
         """
         d_ret       : dict = {
             'stdout':       "",
             'stderr':       "",
             'cmd':          "",
             'cwd':          "",
-            'returncode':   0
+            'returncode':   0,
+            'jobid':        uuid.uuid4().hex,
+            'truncated':    False,
+            'timedout':     False,
+            'cancelled':    False
         }
-        str_stdoutLine  : str   = ""
-        str_stdout      : str   = ""
+        timeout     : float             = None
+        cancel      : threading.Event   = None
+        for k, v in kwargs.items():
+            if k == 'timeout'   : timeout   = v
+            if k == 'cancel'    : cancel    = v
 
+        if self.args['spill'] or not self.args['noJobLogging']:
+            os.makedirs(self.args['jobDir'], exist_ok = True)
+        d_stream    : dict = {}
         p = subprocess.Popen(
                     str_cmd.split(),
                     stdout      = subprocess.PIPE,
                     stderr      = subprocess.PIPE,
         )
+        sel = selectors.DefaultSelector()
+        for str_stream in ['stdout', 'stderr']:
+            pipe        = getattr(p, str_stream)
+            d_stream[str_stream] = {
+                'buffer'    : RingBuffer(int(self.args['bufferSize'])),
+                'decoder'   : codecs.getincrementaldecoder('utf-8')('replace'),
+                'spill'     : open(os.path.join(
+                                self.args['jobDir'],
+                                '%s.%s' % (d_ret['jobid'], str_stream)
+                            ), 'w') if self.args['spill'] else None
+            }
+            sel.register(pipe, selectors.EVENT_READ, str_stream)
 
-        # Realtime output on stdout
-        while True:
-            stdout      = p.stdout.readline()
-            if p.poll() is not None:
+        deadline    : float = time.monotonic() + timeout if timeout else None
+        while sel.get_map():
+            if cancel is not None and cancel.is_set():
+                d_ret['cancelled']  = True
+                self.job_terminate(p)
                 break
-            if stdout:
-                str_stdoutLine = stdout.decode()
-                if int(self.args['verbosity']):
-                    print(str_stdoutLine, end = '')
-                str_stdout      += str_stdoutLine
+            if deadline and time.monotonic() > deadline:
+                d_ret['timedout']   = True
+                self.job_terminate(p)
+                break
+            for key, _ in sel.select(timeout = 0.1):
+                chunk   : bytes = os.read(key.fd, 65536)
+                if not chunk:
+                    sel.unregister(key.fileobj)
+                    continue
+                d_s             = d_stream[key.data]
+                str_chunk       = d_s['decoder'].decode(chunk)
+                d_s['buffer'].append(str_chunk)
+                if d_s['spill']: d_s['spill'].write(str_chunk)
+                if key.data == 'stdout' and int(self.args['verbosity']):
+                    print(str_chunk, end = '')
+        sel.close()
+        p.wait()
+        for str_stream, d_s in d_stream.items():
+            str_tail    = d_s['decoder'].decode(b'', final = True)
+            d_s['buffer'].append(str_tail)
+            if d_s['spill']:
+                d_s['spill'].write(str_tail)
+                d_s['spill'].close()
+            d_ret[str_stream]   = d_s['buffer'].text()
+            d_ret['truncated'] |= d_s['buffer'].dropped > 0
+            getattr(p, str_stream).close()
         d_ret['cmd']        = str_cmd
         d_ret['cwd']        = os.getcwd()
-        d_ret['stdout']     = str_stdout
-        d_ret['stderr']     = p.stderr.read().decode()
         d_ret['returncode'] = p.returncode
-        with open('/tmp/job.json', 'w') as f:
-            json.dump(d_ret, f, indent=4)
+        self.job_record(d_ret)
         if int(self.args['verbosity']) and len(d_ret['stderr']):
             print('\nstderr: \n%s' % d_ret['stderr'])
         return d_ret
 
+    def job_terminate(self, p : subprocess.Popen, grace : float = 5.0) -> int:
+        """
+        Terminate a running job, escalating to a kill if it does not exit
+        within <grace> seconds.
+
+        Args:
+            p (subprocess.Popen): the job process
+            grace (float):        seconds to wait after SIGTERM
+
+        Returns:
+            int: the job returncode
+        """
+        p.terminate()
+        try:
+            p.wait(timeout = grace)
+        except subprocess.TimeoutExpired:
+            p.kill()
+            p.wait()
+        return p.returncode
+
     def job_runbg(self, str_cmd : str) -> dict:
         """Run a job in the background
 
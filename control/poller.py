@@ -0,0 +1,427 @@
+str_about = '''
+    The poller module provides a single, process-wide status poller for
+    CUBE plugin instances.
+
+    Rather than have every tree spin in its own polling loop, callers
+    register the plugin instance IDs they are waiting on, and receive a
+    future. One background thread periodically queries CUBE in bulk
+    (listing each feed with due IDs) and resolves the futures of those
+    that have reached a finished state. A feed is only listed while that
+    takes fewer queries than fetching its due IDs one by one, so API
+    traffic per poll interval is at most O(due IDs), and usually far
+    less.
+
+    How often each awaited node is polled is governed by a PollPolicy,
+    which can be tuned per node title: short initial intervals for fast
+    stages, an expected minimum runtime for slow stages, and exponential
+    backoff with jitter up to a capped maximum.
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  threading
+import  time
+import  random
+import  math
+import  json
+from    collections             import deque
+from    pathlib                 import Path
+from    concurrent.futures      import Future
+from    chrisclient             import client
+from    loguru                  import logger
+from    state                   import shared
+
+LOG         = logger.debug
+
+class PollPolicy:
+    '''
+    The polling schedule for a single awaited node.
+
+        expect      seconds before the first poll (the expected minimum
+                    runtime of the node)
+        initial     the first interval between polls
+        factor      multiplicative backoff applied after each poll
+        maximum     the cap on the interval
+        jitter      fractional +/- randomization of each interval
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.expect         : float     = 0.0
+        self.initial        : float     = 5.0
+        self.factor         : float     = 1.0
+        self.maximum        : float     = 5.0
+        self.jitter         : float     = 0.0
+
+        for k, v in kwargs.items():
+            if k == 'expect'    : self.expect   = float(v)
+            if k == 'initial'   : self.initial  = float(v)
+            if k == 'factor'    : self.factor   = float(v)
+            if k == 'maximum'   : self.maximum  = float(v)
+            if k == 'jitter'    : self.jitter   = float(v)
+
+    def jittered(self, interval : float) -> float:
+        if not self.jitter: return interval
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def delay_first(self) -> float:
+        """
+        The delay before the first poll of a newly watched node
+        """
+        return self.jittered(self.expect or self.initial)
+
+    def interval_next(self, interval : float) -> float:
+        """
+        Given the current (un-jittered) <interval>, return the next one
+        """
+        if not interval: return self.initial
+        return min(interval * self.factor, self.maximum)
+
+    def asdict(self) -> dict:
+        return {
+            'expect'    : self.expect,
+            'initial'   : self.initial,
+            'factor'    : self.factor,
+            'maximum'   : self.maximum,
+            'jitter'    : self.jitter
+        }
+
+def pollPolicies_build(str_policy : str, interval : float, str_spec : str = '') -> dict:
+    """
+    Build the per-title poll policies.
+
+    The 'fixed' policy polls every <interval> seconds. The 'adaptive'
+    policy starts at 1s and backs off (x1.5, +/-20% jitter) to a cap of
+    six times <interval>. In either case, <str_spec> -- a JSON string or
+    the path to a JSON file -- can override the settings for the
+    'default' entry or for any node title (substring), for example
+
+        {"heatmaps": {"expect": 60, "maximum": 30}, "QA-Check": {"initial": 2}}
+
+    Args:
+        str_policy (str):   'fixed' or 'adaptive'
+        interval (float):   the nominal poll interval in seconds
+        str_spec (str):     optional JSON overrides
+
+    Returns:
+        dict: PollPolicy objects keyed on title, including 'default'
+    """
+    d_base      : dict  = {
+        'initial'   : interval,
+        'factor'    : 1.0,
+        'maximum'   : interval,
+        'jitter'    : 0.0
+    }
+    if str_policy == 'adaptive':
+        d_base  = {
+            'initial'   : min(1.0, interval),
+            'factor'    : 1.5,
+            'maximum'   : interval * 6,
+            'jitter'    : 0.2
+        }
+    elif str_policy != 'fixed':
+        raise ValueError("unknown poll policy '%s'" % str_policy)
+
+    d_spec      : dict  = {}
+    if str_spec:
+        if Path(str_spec).is_file():
+            str_spec    = Path(str_spec).read_text()
+        d_spec  = json.loads(str_spec)
+
+    d_policy    : dict  = {'default': PollPolicy(**{**d_base, **d_spec.get('default', {})})}
+    for str_title, d_override in d_spec.items():
+        if str_title == 'default': continue
+        d_policy[str_title] = PollPolicy(**{**d_policy['default'].asdict(), **d_override})
+    return d_policy
+
+class StatusPoller:
+    '''
+    A background poller that tracks awaited plugin instance IDs across
+    all threads and wakes the waiters when their nodes finish.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.cl             : client.Client     = None
+        self.interval       : float             = 5.0
+        self.pageLimit      : int               = 100
+        self.d_policy       : dict              = {}
+        self.d_waiter       : dict              = {}
+        self.d_lastStatus   : dict              = {}
+        self.d_pollCount    : dict              = {}
+        self.lock           : threading.Condition   = threading.Condition()
+        self.thread         : threading.Thread  = None
+        self.b_stop         : bool              = False
+        self.d_stats        : dict              = {
+            'rounds'    : 0,
+            'queries'   : 0,
+            'resolved'  : 0,
+            'failed'    : 0
+        }
+        # (time, queries so far) after each recent round
+        self.q_round        : deque             = deque(maxlen = 4096)
+
+        for k, v in kwargs.items():
+            if k == 'client'    : self.cl           = v
+            if k == 'interval'  : self.interval     = float(v)
+            if k == 'pageLimit' : self.pageLimit    = max(1, int(v))
+            if k == 'policies'  : self.d_policy     = v
+
+        if 'default' not in self.d_policy:
+            self.d_policy['default'] = PollPolicy(
+                initial = self.interval, maximum = self.interval
+            )
+
+    def policy_forTitle(self, str_title : str) -> PollPolicy:
+        """
+        The poll policy whose key is a (case-insensitive) substring of
+        <str_title>, or the default policy.
+        """
+        for str_key, policy in self.d_policy.items():
+            if str_key != 'default' and str_key.lower() in str_title.lower():
+                return policy
+        return self.d_policy['default']
+
+    def watch(self, plinstID : int, feedID : int = None, title : str = '') -> Future:
+        """
+        Register interest in plugin instance <plinstID>. The returned
+        future resolves to the plugin instance data structure once its
+        status is 'finished*'. Several waiters on the same ID share the
+        same future.
+
+        Args:
+            plinstID (int):         the plugin instance to wait on
+            feedID (int, optional): the feed containing the instance --
+                                    allows bulk querying. Defaults to None.
+            title (str, optional):  the node title, used to select the
+                                    poll policy. Defaults to ''.
+
+        Returns:
+            Future: resolves to the plugin instance dictionary
+        """
+        plinstID                = int(plinstID)
+        with self.lock:
+            d_waiter    : dict  = self.d_waiter.get(plinstID)
+            if not d_waiter:
+                policy  : PollPolicy    = self.policy_forTitle(title)
+                d_waiter        = {
+                    'future'    : Future(),
+                    'feed'      : feedID,
+                    'policy'    : policy,
+                    'interval'  : 0.0,
+                    'due'       : time.monotonic() + policy.delay_first(),
+                    'polls'     : 0
+                }
+                self.d_waiter[plinstID] = d_waiter
+            elif feedID is not None:
+                d_waiter['feed']        = feedID
+            self.start()
+            self.lock.notify_all()
+            return d_waiter['future']
+
+    def unwatch(self, plinstID : int) -> None:
+        """
+        Stop tracking <plinstID> (e.g. after a waiter timed out).
+        """
+        with self.lock:
+            self.d_waiter.pop(int(plinstID), None)
+            self.d_lastStatus.pop(int(plinstID), None)
+
+    def status_last(self, plinstID : int) -> dict:
+        """
+        The last plugin instance data seen for <plinstID>, if any.
+        """
+        with self.lock:
+            return self.d_lastStatus.get(int(plinstID), {})
+
+    def polls_pop(self, plinstID : int) -> int:
+        """
+        The number of times <plinstID> was polled before it resolved (or
+        so far, if it is still being watched).
+        """
+        with self.lock:
+            if int(plinstID) in self.d_waiter:
+                return self.d_waiter[int(plinstID)]['polls']
+            return self.d_pollCount.pop(int(plinstID), 0)
+
+    def load(self, window : float = 60.0) -> dict:
+        """
+        The current poll load: the number of nodes watched (and of those,
+        due for a poll), and the queries per second over the last
+        <window> seconds.
+        """
+        with self.lock:
+            now         : float = time.monotonic()
+            l_recent    : list  = [t for t in self.q_round if now - t[0] <= window]
+            rate        : float = 0.0
+            if len(l_recent) > 1 and l_recent[-1][0] > l_recent[0][0]:
+                rate    = (l_recent[-1][1] - l_recent[0][1]) / (l_recent[-1][0] - l_recent[0][0])
+            return {
+                'watched'   : len(self.d_waiter),
+                'due'       : sum(1 for d in self.d_waiter.values() if d['due'] <= now),
+                'queriesPerSecond'  : round(rate, 2),
+                **self.d_stats
+            }
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.b_stop     = False
+            self.thread     = threading.Thread(
+                                target  = self.run,
+                                name    = 'StatusPoller',
+                                daemon  = True
+                            )
+            self.thread.start()
+
+    def stop(self) -> None:
+        with self.lock:
+            self.b_stop     = True
+            self.lock.notify_all()
+        if self.thread:
+            self.thread.join()
+
+    def run(self) -> None:
+        """
+        The poller main loop: sleep until the earliest waiter is due (or
+        until stopped), then query the status of every due waiter.
+        """
+        while True:
+            with self.lock:
+                while not self.b_stop:
+                    if not self.d_waiter:
+                        self.lock.wait()
+                        continue
+                    wait    : float = min(d['due'] for d in self.d_waiter.values()) \
+                                        - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self.lock.wait(wait)
+                if self.b_stop:
+                    return
+            try:
+                self.poll_once(dueOnly = True)
+            except Exception as e:
+                LOG("Status poll failed: %s" % e)
+
+    def ids_due(self, dueOnly : bool = False) -> list:
+        """
+        The currently watched IDs (if <dueOnly>, only those whose
+        schedule is due), sorted.
+        """
+        now         : float = time.monotonic()
+        with self.lock:
+            return sorted(
+                plinstID for plinstID, d_waiter in self.d_waiter.items()
+                if not dueOnly or d_waiter['due'] <= now
+            )
+
+    def feeds_group(self, l_plinstID : list) -> dict:
+        """
+        Group <l_plinstID> by the feed each was watched in; IDs with an
+        unknown feed are grouped under None.
+        """
+        d_feed      : dict  = {}
+        with self.lock:
+            for plinstID in l_plinstID:
+                d_waiter    : dict  = self.d_waiter.get(plinstID)
+                if d_waiter:
+                    d_feed.setdefault(d_waiter['feed'], []).append(plinstID)
+        return d_feed
+
+    def id_query(self, plinstID : int) -> dict:
+        self.d_stats['queries'] += 1
+        return self.cl.get_plugin_instance_by_id(plinstID)
+
+    def feed_query(self, feedID : int, l_plinstID : list) -> list:
+        """
+        Return the plugin instance data for all <l_plinstID> in <feedID>.
+        The feed is paged through only while that takes fewer queries
+        than fetching the IDs not yet seen one by one -- a large, shared
+        feed is not paged through for a few IDs.
+        """
+        ld_plinst   : list  = []
+        offset      : int   = 0
+        s_remaining : set   = set(l_plinstID)
+        while s_remaining:
+            d_page  : dict  = self.cl.get_plugin_instances({
+                                'feed_id'   : feedID,
+                                'limit'     : self.pageLimit,
+                                'offset'    : offset
+                            })
+            self.d_stats['queries'] += 1
+            for d_plinst in d_page['data']:
+                if d_plinst['id'] in s_remaining:
+                    ld_plinst.append(d_plinst)
+                    s_remaining.discard(d_plinst['id'])
+            offset += self.pageLimit
+            pagesLeft   : int   = math.ceil(max(0, d_page.get('total', 0) - offset) / self.pageLimit)
+            if not d_page.get('hasNextPage') or not s_remaining:
+                break
+            if pagesLeft >= len(s_remaining):
+                ld_plinst.extend(self.id_query(i) for i in sorted(s_remaining))
+                break
+        return ld_plinst
+
+    def waiter_reschedule(self, d_waiter : dict, now : float) -> None:
+        policy  : PollPolicy    = d_waiter['policy']
+        d_waiter['polls']      += 1
+        d_waiter['interval']    = policy.interval_next(d_waiter['interval'])
+        d_waiter['due']         = now + policy.jittered(d_waiter['interval'])
+
+    def poll_once(self, dueOnly : bool = False) -> int:
+        """
+        Query CUBE once for the watched IDs. The IDs in a feed are
+        fetched together by listing the feed (see `feed_query`); a lone
+        ID, or one of unknown feed, is fetched directly.
+
+        The polled waiters are rescheduled whether or not the queries
+        succeed, so that a failing CUBE is polled on the (backed off)
+        schedule rather than in a tight loop; whatever was fetched before
+        a query failed is still resolved.
+
+        Args:
+            dueOnly (bool): only poll waiters whose schedule is due.
+                            Defaults to False.
+
+        Raises:
+            Exception: what a failed query raised
+
+        Returns:
+            int: the number of waiters resolved in this round
+        """
+        ld_plinst   : list  = []
+        l_polled    : list  = self.ids_due(dueOnly)
+        resolved    : int   = 0
+        try:
+            for feedID, l_plinstID in self.feeds_group(l_polled).items():
+                if feedID is None or len(l_plinstID) == 1:
+                    ld_plinst.extend(self.id_query(i) for i in l_plinstID)
+                else:
+                    ld_plinst.extend(self.feed_query(feedID, l_plinstID))
+        except Exception:
+            self.d_stats['failed'] += 1
+            raise
+        finally:
+            with self.lock:
+                now     : float = time.monotonic()
+                self.d_stats['rounds'] += 1
+                self.q_round.append((now, self.d_stats['queries']))
+                for plinstID in l_polled:
+                    if plinstID in self.d_waiter:
+                        self.waiter_reschedule(self.d_waiter[plinstID], now)
+                for d_plinst in ld_plinst:
+                    if d_plinst['id'] not in self.d_waiter:
+                        continue
+                    self.d_lastStatus[d_plinst['id']] = d_plinst
+                    if 'finished' in d_plinst['status'].lower():
+                        self.d_lastStatus.pop(d_plinst['id'], None)
+                        d_waiter    = self.d_waiter.pop(d_plinst['id'], None)
+                        self.d_pollCount[d_plinst['id']] = d_waiter['polls']
+                        if not d_waiter['future'].done():
+                            d_waiter['future'].set_result(d_plinst)
+                            resolved += 1
+                self.d_stats['resolved'] += resolved
+        return resolved
+
+# the process-wide status poller (see `shared.Shared`)
+sharedPoller_get = shared.Shared(StatusPoller).get
@@ -0,0 +1,241 @@
+str_about = '''
+    The priority module orders the inputs before any tree is grown, so
+    that (say) a stat study is not stuck behind a bulk backfill.
+
+    Inputs are ordered on a composite key, e.g. 'manifest,-studydate',
+    built from the keys
+
+        manifest    the priority given to the input in a manifest (lower
+                    is sooner; inputs not in the manifest go last)
+        mtime       the input's modification time
+        studydate   the StudyDate/StudyTime in its DICOM header
+        size        its size in bytes
+        deadline    its deadline -- from the manifest, or else its mtime
+                    plus a default slack -- for earliest-deadline-first
+
+    each ascending unless prefixed with '-'. More keys can be added with
+    `priorityKey_register`. A manifest is JSON (a string or a file) that
+    maps inputs -- by path relative to the input directory, by name, or
+    by a glob pattern -- to a priority, or to an object with a 'priority'
+    and/or a 'deadline' (epoch seconds or an ISO 8601 time), e.g.
+
+        {"stat/*": {"priority": 0, "deadline": "2026-10-18T14:00:00"},
+         "backfill/*": 10}
+
+    Since the engines start trees in the order the mapper yields them,
+    and the stage engine serves its queues in that order too, the order
+    set here holds all the way through.
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  heapq
+import  itertools
+import  json
+import  math
+from    datetime                import datetime
+from    fnmatch                 import fnmatchcase
+from    functools               import total_ordering
+from    pathlib                 import Path
+from    typing                  import Any, Callable, Iterator
+from    concurrent.futures      import ThreadPoolExecutor
+from    .                       import granularity
+from    logic                   import dicom
+
+@total_ordering
+class Descending:
+    '''
+    A key value that sorts in the reverse order of <value>
+    '''
+
+    __slots__   = ('value',)
+
+    def __init__(self, value : Any):
+        self.value  = value
+
+    def __eq__(self, other) -> bool:
+        return self.value == other.value
+
+    def __lt__(self, other) -> bool:
+        return other.value < self.value
+
+def manifest_load(str_manifest : str) -> dict:
+    """
+    Load a priority manifest -- a JSON string or file -- into a dict of
+    {<path, name or pattern>: {'priority': <float>, 'deadline': <epoch>}}
+
+    Args:
+        str_manifest (str): the manifest
+
+    Returns:
+        dict: the manifest entries
+    """
+    d_manifest  : dict  = {}
+    if not str_manifest:
+        return d_manifest
+    if Path(str_manifest).is_file():
+        str_manifest    = Path(str_manifest).read_text()
+    for str_input, entry in json.loads(str_manifest).items():
+        d_entry : dict  = entry if isinstance(entry, dict) else {'priority': entry}
+        if isinstance(d_entry.get('deadline'), str):
+            d_entry['deadline'] = datetime.fromisoformat(d_entry['deadline']).timestamp()
+        d_manifest[str_input]   = d_entry
+    return d_manifest
+
+class PriorityContext:
+    '''
+    What the key functions know besides the input: the input directory,
+    the manifest and the default deadline slack.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.inputdir       : Path      = Path('.')
+        self.d_manifest     : dict      = {}
+        self.slack          : float     = 86400.0
+
+        for k, v in kwargs.items():
+            if k == 'inputdir'  : self.inputdir     = Path(v)
+            if k == 'manifest'  : self.d_manifest   = manifest_load(v) if isinstance(v, str) else dict(v)
+            if k == 'slack'     : self.slack        = float(v)
+
+    def manifest_entry(self, path : Path) -> dict:
+        """
+        The manifest entry of <path>: that of its relative path, else of
+        its name, else of the first pattern that matches its relative path.
+        """
+        str_relpath : str   = granularity.shard_key(path, self.inputdir)
+        for str_key in (str_relpath, path.name):
+            if str_key in self.d_manifest:
+                return self.d_manifest[str_key]
+        for str_pattern, d_entry in self.d_manifest.items():
+            if fnmatchcase(str_relpath, str_pattern):
+                return d_entry
+        return {}
+
+def key_manifest(path : Path, context : PriorityContext) -> float:
+    return float(context.manifest_entry(path).get('priority', math.inf))
+
+def key_mtime(path : Path, context : PriorityContext) -> float:
+    return path.stat().st_mtime
+
+def key_size(path : Path, context : PriorityContext) -> int:
+    return path.stat().st_size if path.is_file() else sum(
+        p.stat().st_size for p in path.rglob('*') if p.is_file()
+    )
+
+def key_studydate(path : Path, context : PriorityContext) -> str:
+    d_header    : dict  = dicom.header_read(path, ['StudyDate', 'StudyTime']) if path.is_file() else {}
+    if not d_header.get('StudyDate'):
+        raise ValueError('%s has no StudyDate' % path)
+    return d_header['StudyDate'] + d_header.get('StudyTime', '')
+
+def key_deadline(path : Path, context : PriorityContext) -> float:
+    deadline    : float = context.manifest_entry(path).get('deadline')
+    if deadline is None:
+        deadline    = path.stat().st_mtime + context.slack
+    return float(deadline)
+
+d_KEY           : dict  = {
+    'manifest'  : key_manifest,
+    'mtime'     : key_mtime,
+    'size'      : key_size,
+    'studydate' : key_studydate,
+    'deadline'  : key_deadline
+}
+
+def priorityKey_register(str_name : str, key : Callable[[Path, PriorityContext], Any]) -> None:
+    """
+    Make <key> -- called as key(path, context) and returning a sortable
+    value -- available as the priority key <str_name>.
+    """
+    d_KEY[str_name] = key
+
+def keys_parse(str_keys : str) -> list[tuple[Callable, bool]]:
+    """
+    Parse a comma separated list of key names, each optionally prefixed
+    with '-' to sort descending, e.g. 'manifest,-studydate'. 'edf' is
+    an alias of 'deadline'.
+
+    Returns:
+        list: (key function, descending) tuples
+    """
+    l_key       : list  = []
+    for str_key in filter(None, (s.strip() for s in str_keys.split(','))):
+        b_descending    : bool  = str_key.startswith('-')
+        str_name        : str   = str_key.lstrip('-')
+        str_name        = 'deadline' if str_name == 'edf' else str_name
+        if str_name not in d_KEY:
+            raise ValueError("unknown priority key '%s' (known: %s)" % (str_name, ', '.join(d_KEY)))
+        l_key.append((d_KEY[str_name], b_descending))
+    return l_key
+
+class PriorityScheduler:
+    '''
+    An iterable over the (input, output) tuples of <mapper> in priority
+    order -- a drop-in wrapper of any mapper.
+
+        keys        the composite key, e.g. 'manifest,-studydate'
+        inputdir    the input directory (for manifest lookups)
+        manifest    the manifest (JSON string, file, or dict)
+        slack       seconds after its mtime that an input with no
+                    manifest deadline is due
+        window      the number of inputs reordered at a time; 0 (the
+                    default) orders all the inputs, which then have to
+                    be discovered before the first is yielded
+        threads     threads computing keys (which may read headers)
+    '''
+
+    def __init__(self, mapper : Iterator, *args, **kwargs):
+        self.mapper                             = mapper
+        self.l_key          : list              = []
+        self.window         : int               = 0
+        self.threads        : int               = 8
+        self.chunk          : int               = 256
+        self.d_context      : dict              = {}
+        self.d_stats        : dict              = {'ordered': 0, 'failed': 0}
+
+        for k, v in kwargs.items():
+            if k == 'keys'      : self.l_key        = keys_parse(v)
+            if k == 'window'    : self.window       = int(v)
+            if k == 'threads'   : self.threads      = max(1, int(v))
+            if k in ('inputdir', 'manifest', 'slack'):
+                self.d_context[k]   = v
+        self.context        : PriorityContext   = PriorityContext(**self.d_context)
+
+    def key(self, input : Any) -> tuple:
+        """
+        The composite key of <input>. A batch is keyed on its most urgent
+        file (the least value of an ascending key, the greatest of a
+        descending one); a key that cannot be computed (e.g. the input
+        vanished) sorts last, as (1, 0).
+        """
+        l_path  : list  = input.l_path if isinstance(input, granularity.Batch) and input.l_path else [input]
+        l_value : list  = []
+        for key, b_descending in self.l_key:
+            try:
+                value   = (max if b_descending else min)(key(Path(p), self.context) for p in l_path)
+                l_value.append((0, Descending(value) if b_descending else value))
+            except (OSError, ValueError):
+                l_value.append((1, 0))
+        return tuple(l_value)
+
+    def __iter__(self) -> Iterator[tuple]:
+        if not self.l_key:
+            yield from self.mapper
+            return
+        mapper          = iter(self.mapper)
+        l_heap  : list  = []
+        seq             = itertools.count()
+        with ThreadPoolExecutor(max_workers = self.threads, thread_name_prefix = 'priority') as pool:
+            chunk   : int   = min(self.chunk, self.window) if self.window else self.chunk
+            while l_chunk := list(itertools.islice(mapper, chunk)):
+                for t_input, key in zip(l_chunk, pool.map(lambda t: self.key(t[0]), l_chunk)):
+                    # counted here, not in the key threads
+                    self.d_stats['failed'] += sum(v[0] for v in key)
+                    heapq.heappush(l_heap, (key, next(seq), t_input))
+                while self.window and len(l_heap) > self.window:
+                    self.d_stats['ordered'] += 1
+                    yield heapq.heappop(l_heap)[-1]
+        while l_heap:
+            self.d_stats['ordered'] += 1
+            yield heapq.heappop(l_heap)[-1]
@@ -0,0 +1,209 @@
+str_about = '''
+    The qa module takes the QA bookkeeping off the trees' critical path.
+
+    A tree that sees a QA (pl-lld_chxr) node finish only reports the
+    outcome to the process-wide QA queue, and moves on. A background
+    thread then marks each feed with a failed QA check by renaming it
+    'QA-failed:<name>'. Failures are coalesced per feed -- however many
+    are reported, and however often, a feed is renamed once -- and a
+    rename is idempotent: a feed whose name already carries the prefix
+    is left alone, so that a rename that is retried (after, say, a
+    timeout whose PUT did land) or re-reported never stacks prefixes.
+    A rename that fails is retried with exponential backoff.
+
+    The queue also counts the QA outcomes, for the run summary.
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  threading
+import  time
+from    chrisclient             import client
+from    loguru                  import logger
+from    state                   import shared
+
+LOG         = logger.debug
+
+QA_PLUGIN   : str   = 'pl-lld_chxr'
+QA_FAILED   : str   = 'QA check failed'
+PREFIX      : str   = 'QA-failed:'
+
+def outcome_failed(d_plinfo : dict) -> bool:
+    """
+    Does the (finished) QA plugin instance <d_plinfo> report a failure?
+    """
+    return QA_FAILED in (d_plinfo.get('summary') or '')
+
+class QAQueue:
+    '''
+    A background worker that renames the feeds of failed QA checks.
+
+        client      the CUBE client (to read feed names)
+        request     the request object (to PUT the new names)
+        url         the CUBE API url
+        delay       seconds to wait after a failure is reported, so that
+                    the failures reported meanwhile are renamed together
+        retries     the number of times a failed rename is retried
+        backoff     the delay before the first retry, doubled each time
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.cl             : client.Client     = None
+        self.request        : client.Request    = None
+        self.url            : str               = ''
+        self.delay          : float             = 0.5
+        self.retries        : int               = 5
+        self.backoff        : float             = 1.0
+        self.d_pending      : dict              = {}
+        self.s_reported     : set               = set()
+        self.s_renamed      : set               = set()
+        self.lock           : threading.Condition   = threading.Condition()
+        self.thread         : threading.Thread  = None
+        self.b_stop         : bool              = False
+        self.d_stats        : dict              = {
+            'passed'    : 0,
+            'failed'    : 0,
+            'renamed'   : 0,
+            'already'   : 0,
+            'retried'   : 0,
+            'abandoned' : 0
+        }
+
+        for k, v in kwargs.items():
+            if k == 'client'    : self.cl           = v
+            if k == 'request'   : self.request      = v
+            if k == 'url'       : self.url          = v
+            if k == 'delay'     : self.delay        = float(v)
+            if k == 'retries'   : self.retries      = int(v)
+            if k == 'backoff'   : self.backoff      = float(v)
+
+    def outcome_put(self, d_plinfo : dict) -> bool:
+        """
+        Report the outcome of the finished QA plugin instance <d_plinfo>,
+        without waiting on CUBE. An instance is counted once, however
+        often it is reported; a failure queues the rename of its feed.
+
+        Args:
+            d_plinfo (dict): the plugin instance data structure
+
+        Returns:
+            bool: whether the QA check failed
+        """
+        b_failed    : bool  = outcome_failed(d_plinfo)
+        with self.lock:
+            if d_plinfo.get('id') in self.s_reported:
+                return b_failed
+            self.s_reported.add(d_plinfo.get('id'))
+            self.d_stats['failed' if b_failed else 'passed'] += 1
+            feedID      = d_plinfo.get('feed_id')
+            if b_failed and feedID not in self.s_renamed:
+                self.d_pending.setdefault(feedID, {
+                    'attempts'  : 0,
+                    'due'       : time.monotonic() + self.delay
+                })
+                self.start()
+                self.lock.notify_all()
+        return b_failed
+
+    def feed_rename(self, feedID : int) -> bool:
+        """
+        Prefix the name of feed <feedID> with 'QA-failed:', unless it is
+        already.
+
+        Returns:
+            bool: whether the feed was renamed (False if it already was)
+        """
+        str_name    : str   = self.cl.get_feed_by_id(feedID)['name']
+        if str_name.startswith(PREFIX):
+            return False
+        self.request.put(f'{self.url}{feedID}/', {'name': PREFIX + str_name})
+        return True
+
+    def due_pop(self) -> list:
+        """
+        Pop the pending feeds that are due.
+        """
+        now         : float = time.monotonic()
+        l_due       : list  = [
+            feedID for feedID, d in self.d_pending.items() if d['due'] <= now
+        ]
+        return [(feedID, self.d_pending.pop(feedID)) for feedID in l_due]
+
+    def renames_apply(self, l_due : list) -> None:
+        """
+        Rename the feeds in <l_due>, requeueing those that fail (until
+        they run out of retries).
+        """
+        for feedID, d_rename in l_due:
+            try:
+                b_renamed   : bool  = self.feed_rename(feedID)
+            except Exception as e:
+                d_rename['attempts'] += 1
+                with self.lock:
+                    if d_rename['attempts'] > self.retries:
+                        self.d_stats['abandoned'] += 1
+                        LOG("Giving up renaming QA-failed feed %s: %s" % (feedID, e))
+                        continue
+                    self.d_stats['retried'] += 1
+                    d_rename['due'] = time.monotonic() + self.backoff * 2 ** (d_rename['attempts'] - 1)
+                    self.d_pending.setdefault(feedID, d_rename)
+                LOG("Renaming QA-failed feed %s failed, will retry: %s" % (feedID, e))
+                continue
+            with self.lock:
+                self.s_renamed.add(feedID)
+                self.d_stats['renamed' if b_renamed else 'already'] += 1
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.b_stop     = False
+            self.thread     = threading.Thread(
+                                target  = self.run,
+                                name    = 'QAQueue',
+                                daemon  = True
+                            )
+            self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Apply the pending renames now -- those backing off still get
+        their remaining retries -- and stop the worker.
+        """
+        with self.lock:
+            self.b_stop     = True
+            for d_rename in self.d_pending.values():
+                if not d_rename['attempts']:
+                    d_rename['due'] = 0.0
+            self.lock.notify_all()
+        if self.thread:
+            self.thread.join()
+
+    def run(self) -> None:
+        """
+        The worker main loop: sleep until the earliest pending rename is
+        due, then apply all the due renames. Once stopped, the loop ends
+        when no renames are pending.
+        """
+        while True:
+            with self.lock:
+                while True:
+                    if not self.d_pending:
+                        if self.b_stop:
+                            return
+                        self.lock.wait()
+                        continue
+                    wait    : float = min(d['due'] for d in self.d_pending.values()) \
+                                        - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self.lock.wait(wait)
+                l_due   : list  = self.due_pop()
+            self.renames_apply(l_due)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {**self.d_stats, 'pending': len(self.d_pending)}
+
+# the process-wide QA queue (see `shared.Shared`)
+sharedQAQueue_get = shared.Shared(QAQueue).get
@@ -0,0 +1,237 @@
+str_about = '''
+    The retry module gives every CUBE interaction one failure policy.
+
+    A failed call is classified as
+
+        throttled   CUBE asked us to slow down (429, 'Request was
+                    throttled'); retried after the delay CUBE asks for,
+                    if it says, else after the backoff
+        transient   the network or a gateway failed (connection errors,
+                    timeouts, 502/503/504, a non-JSON error page); retried
+                    with exponential backoff and full jitter
+        permanent   anything else (a missing object, a validation error);
+                    never retried
+
+    A write (anything but a get_* query) is only retried on a transient
+    failure if the request provably never reached CUBE -- e.g. the
+    connection was refused -- since, say, a POST that timed out may well
+    have created its plugin instance.
+
+    The shared client and request objects are wrapped in a `RetryingClient`
+    proxy (about the admission `GatedClient`, so that every attempt is
+    admitted), and work that is not a client call (such as a chrispl-run
+    script) can be run through `RetryPolicy.call`. Once a call has failed
+    for good, a `CUBEFailure` is raised that carries the diagnostics of
+    the first failed attempt as well as of the last, so that the error
+    detail never has to be fetched by doing the work again.
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  json
+import  random
+import  re
+import  threading
+import  time
+from    typing                  import Any, Callable
+from    loguru                  import logger
+from    .                       import admission
+from    state                   import shared
+
+LOG         = logger.debug
+
+THROTTLED   : re.Pattern    = re.compile(
+    r'throttl|too many requests|\b429\b|rate limit', re.IGNORECASE
+)
+TRANSIENT   : re.Pattern    = re.compile(
+    r'connection|timed? ?out|temporarily|unavailable|bad gateway|gateway time|reset by peer'
+    r'|remote ?disconnected|max retries exceeded|\b50[234]\b',
+    re.IGNORECASE
+)
+# transient failures that show the request never reached CUBE
+UNSENT      : re.Pattern    = re.compile(
+    r'refused|failed to establish|name or service not known|name resolution'
+    r'|connect ?timeout|throttl|too many requests|\b429\b|\b503\b|unavailable',
+    re.IGNORECASE
+)
+RETRYAFTER  : re.Pattern    = re.compile(r'available in (\d+(?:\.\d+)?) seconds?', re.IGNORECASE)
+# the tail of a failed process's error output kept as its error
+DIAGNOSTICTAIL  : int   = 2000
+
+def failure_classify(error : BaseException | str) -> str:
+    """
+    Classify the <error> (an exception, or the error output of a
+    process) as 'throttled', 'transient' or 'permanent'.
+    """
+    if isinstance(error, (ConnectionError, TimeoutError, json.JSONDecodeError)):
+        return 'transient'
+    str_error   : str   = str(error)
+    if THROTTLED.search(str_error):
+        return 'throttled'
+    if TRANSIENT.search(str_error):
+        return 'transient'
+    return 'permanent'
+
+def failure_unsent(error : BaseException | str) -> bool:
+    """
+    Does the <error> show that the request never reached CUBE?
+    """
+    return isinstance(error, ConnectionRefusedError) or bool(UNSENT.search(str(error)))
+
+def retryAfter_get(error : BaseException | str) -> float:
+    """
+    The delay that a throttled CUBE asked for in <error>, or 0.
+    """
+    match   = RETRYAFTER.search(str(error))
+    return float(match[1]) if match else 0.0
+
+class CUBEFailure(Exception):
+    '''
+    A CUBE interaction that failed for good: <kind> of failure, after
+    <attempts>, with the <first> and <last> errors.
+    '''
+
+    def __init__(self, str_method : str, kind : str, attempts : int,
+                 first : BaseException, last : BaseException):
+        self.method         : str           = str_method
+        self.kind           : str           = kind
+        self.attempts       : int           = attempts
+        self.first          : BaseException = first
+        self.last           : BaseException = last
+        str_message         : str           = '%s failure of %s after %d attempt%s: %s' % (
+            kind, str_method, attempts, '' if attempts == 1 else 's', last
+        )
+        if attempts > 1 and str(first) != str(last):
+            str_message    += ' (first: %s)' % first
+        super().__init__(str_message)
+
+    def asdict(self) -> dict:
+        return {
+            'method'    : self.method,
+            'kind'      : self.kind,
+            'attempts'  : self.attempts,
+            'first'     : str(self.first),
+            'last'      : str(self.last)
+        }
+
+class RetryPolicy:
+    '''
+    How CUBE interactions are retried.
+
+        retries     the number of retries after the first attempt
+        backoff     the backoff (seconds) of the first retry, doubled
+                    with each retry after that
+        cap         the cap on the backoff
+        jitter      whether the delay is drawn uniformly from [0, backoff]
+                    ("full jitter") so that trees that failed together
+                    do not retry together
+    '''
+
+    # client methods that do no I/O and so are never retried
+    l_local         : list  = admission.AdmissionController.l_local
+
+    def __init__(self, *args, **kwargs):
+        self.retries        : int               = 4
+        self.backoff        : float             = 0.5
+        self.cap            : float             = 30.0
+        self.jitter         : bool              = True
+        self.sleep          : Callable          = time.sleep
+        self.lock           : threading.Lock    = threading.Lock()
+        self.d_stats        : dict              = {
+            'retried'   : 0,
+            'recovered' : 0,
+            'throttled' : 0,
+            'transient' : 0,
+            'permanent' : 0
+        }
+
+        for k, v in kwargs.items():
+            if k == 'retries'   : self.retries      = int(v)
+            if k == 'backoff'   : self.backoff      = float(v)
+            if k == 'cap'       : self.cap          = float(v)
+            if k == 'jitter'    : self.jitter       = bool(v)
+            if k == 'sleep'     : self.sleep        = v
+
+    def stats_add(self, str_key : str) -> None:
+        with self.lock:
+            self.d_stats[str_key]  += 1
+
+    def delay_get(self, attempt : int, error : BaseException, kind : str) -> float:
+        """
+        The delay before retry number <attempt> (from 1) after <error>.
+        """
+        delay       : float = min(self.cap, self.backoff * 2 ** (attempt - 1))
+        if self.jitter:
+            delay   = random.uniform(0, delay)
+        if kind == 'throttled':
+            delay   = max(delay, min(self.cap, retryAfter_get(error)))
+        return delay
+
+    def retryable(self, str_method : str, error : BaseException, kind : str) -> bool:
+        if kind == 'permanent':
+            return False
+        if kind == 'transient' and admission.callType_get(str_method) == 'write':
+            return failure_unsent(error)
+        return True
+
+    def call(self, str_method : str, fn : Callable, *args, **kwargs) -> Any:
+        """
+        Call <fn>(*args, **kwargs) -- the CUBE interaction <str_method>,
+        which is a write unless it is a get_* query -- retrying it as the
+        policy allows.
+
+        Raises:
+            CUBEFailure: if the interaction failed for good
+
+        Returns:
+            Any: what <fn> returns
+        """
+        first       : BaseException = None
+        attempt     : int           = 0
+        while True:
+            try:
+                ret     = fn(*args, **kwargs)
+                if attempt:
+                    self.stats_add('recovered')
+                return ret
+            except Exception as e:
+                kind    : str   = failure_classify(e)
+                first           = first or e
+                attempt        += 1
+                if attempt > self.retries or not self.retryable(str_method, e, kind):
+                    self.stats_add(kind)
+                    raise CUBEFailure(str_method, kind, attempt, first, e) from e
+                delay   : float = self.delay_get(attempt, e, kind)
+                self.stats_add('retried')
+                LOG("%s call %s failed (%s), retry %d in %.1fs" % (
+                    kind.capitalize(), str_method, e, attempt, delay
+                ))
+                self.sleep(delay)
+
+    def client_wrap(self, cl : Any) -> 'RetryingClient':
+        return RetryingClient(cl, self)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return dict(self.d_stats)
+
+class RetryingClient:
+    '''
+    A proxy about a CUBE client (or request) object whose method calls
+    are each retried as a `RetryPolicy` allows.
+    '''
+
+    def __init__(self, cl : Any, policy : RetryPolicy):
+        self.cl             : Any           = cl
+        self.policy         : RetryPolicy   = policy
+
+    def __getattr__(self, str_name : str) -> Any:
+        attr        : Any   = getattr(self.cl, str_name)
+        if not callable(attr) or str_name in self.policy.l_local: return attr
+
+        def call_retried(*args, **kwargs) -> Any:
+            return self.policy.call(str_name, attr, *args, **kwargs)
+        return call_retried
+
+# the process-wide retry policy (see `shared.Shared`)
+sharedPolicy_get = shared.Shared(RetryPolicy).get
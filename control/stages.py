@@ -0,0 +1,456 @@
+str_about = '''
+    The stages module provides a stage-pipelined engine for growing a
+    forest of trees.
+
+    In the threaded mode, each worker thread owns one tree from seed to
+    QA-Check, and so is blocked for the whole multi-minute flow; the pool
+    size then caps end-to-end throughput. Here, instead, each stage -- the
+    seed, and each node of the flow spec -- has its own queue, a small set
+    of worker threads that do the (short) CUBE calls that submit work, and
+    a budget of trees that may have a node in flight in that stage. Once a
+    node is submitted, the tree leaves its worker thread and simply waits
+    on the shared status poller; when the node finishes, the tree moves on
+    to the queues of the stages that follow. Throughput is then bounded by
+    the slowest stage's budget rather than by the number of threads.
+
+    By default, workflow nodes are each their own stage and all join
+    nodes share a single 'join' stage. A spec node can name its stage
+    explicitly with a "stage" key.
+
+    With ordered queues, each stage serves the trees waiting on it in the
+    order they entered the engine (rather than the order they reached the
+    stage), so that the priority order of the inputs holds at every stage.
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  heapq
+import  itertools
+import  math
+import  queue
+import  threading
+import  time
+from    pathlib                 import Path
+from    typing                  import Callable, Iterable, Any
+from    concurrent.futures      import ThreadPoolExecutor
+from    .                       import dag
+from    state                   import records
+
+def stageBudgets_parse(str_spec : str) -> dict:
+    """
+    Parse a stage budget spec of the form 'seed=8,join=32,default=64'
+    into a {<stage>: <budget>} dictionary. A budget of 0 means no limit.
+
+    Args:
+        str_spec (str): the budget spec
+
+    Returns:
+        dict: the budget of each named stage
+    """
+    d_budget    : dict  = {}
+    for str_item in filter(None, (s.strip() for s in str_spec.split(','))):
+        str_stage, _, str_budget = str_item.partition('=')
+        if not str_budget:
+            raise ValueError("stage budget '%s' is not of form <stage>=<count>" % str_item)
+        d_budget[str_stage.strip()] = int(str_budget)
+    return d_budget
+
+def node_stage(d_node : dict) -> str:
+    """
+    The name of the stage that runs the spec node <d_node>
+    """
+    if 'stage' in d_node: return d_node['stage']
+    return d_node['id'] if d_node['type'] == 'workflow' else 'join'
+
+class TreeJob:
+    '''
+    The state of one tree as it moves through the stages.
+    '''
+
+    def __init__(self, index : int, input : Any, output : Path = None, **kwargs):
+        self.index          : int               = index
+        self.input          : Any               = input
+        self.output         : Path              = output
+        self.flow                               = None
+        self.d_seed         : dict              = {}
+        self.scheduler      : dag.FlowScheduler = None
+        self.s_started      : set               = set()
+        self.lock           : threading.Lock    = threading.Lock()
+        self.d_ret          : dict              = {'seed': {}, 'tree': None}
+
+class Stage:
+    '''
+    A queue of trees waiting to enter a stage, the worker threads that
+    serve it and the budget of trees that may be in flight in it. An
+    ordered queue is served lowest rank first.
+    '''
+
+    def __init__(self, name : str, *args, **kwargs):
+        self.name           : str               = name
+        self.budget         : int               = 0
+        self.workers        : int               = 1
+        self.b_ordered      : bool              = False
+        self.queue          : queue.Queue       = None
+        self.seq                                = itertools.count()
+        self.slots          : threading.Semaphore = None
+        self.l_thread       : list              = []
+        self.d_stats        : dict              = {
+            'entered'   : 0,
+            'done'      : 0,
+            'inflight'  : 0,
+            'peak'      : 0,
+            'busy'      : 0.0
+        }
+        self.statsLock      : threading.Lock    = threading.Lock()
+
+        for k, v in kwargs.items():
+            if k == 'budget'    : self.budget   = int(v)
+            if k == 'workers'   : self.workers  = max(1, int(v))
+            if k == 'ordered'   : self.b_ordered = bool(v)
+
+        self.queue          = queue.PriorityQueue() if self.b_ordered else queue.Queue()
+        if self.budget:
+            self.slots      = threading.Semaphore(self.budget)
+
+    def put(self, item : Any, rank : float = 0) -> None:
+        """
+        Queue <item> with <rank> (only used by an ordered queue); a None
+        item (which stops a worker) ranks last.
+        """
+        if not self.b_ordered:
+            self.queue.put(item)
+            return
+        self.queue.put((math.inf if item is None else rank, next(self.seq), item))
+
+    def get(self) -> Any:
+        if not self.b_ordered:
+            return self.queue.get()
+        return self.queue.get()[-1]
+
+    def slot_acquire(self) -> None:
+        if self.slots: self.slots.acquire()
+        with self.statsLock:
+            self.d_stats['entered']    += 1
+            self.d_stats['inflight']   += 1
+            self.d_stats['peak']        = max(self.d_stats['peak'], self.d_stats['inflight'])
+
+    def slot_release(self) -> None:
+        with self.statsLock:
+            self.d_stats['done']       += 1
+            self.d_stats['inflight']   -= 1
+        if self.slots: self.slots.release()
+
+    def busy_add(self, seconds : float) -> None:
+        with self.statsLock:
+            self.d_stats['busy']       += seconds
+
+class StageEngine:
+    '''
+    Grow a forest of trees through a pipeline of stages.
+
+        seed        called as seed(job) in a 'seed' stage worker; it plants
+                    the seed of the tree, sets job.flow to the tree's
+                    `action.LLDcomputeflow` and returns the seed result
+                    dictionary (with 'status' and 'branchInstanceID')
+        done        called as done(job) once a tree is complete, with the
+                    result in job.d_ret
+        budgets     {<stage>: <max trees in flight>}; a 'default' entry
+                    applies to unnamed stages. 0 means no limit.
+        workers     the number of submit threads per stage (the seed
+                    stage gets one thread per unit of its budget, since
+                    planting a seed blocks -- or, with no seed budget,
+                    one per CPU)
+        maxTrees    the maximum number of trees in the engine at once
+        ordered     serve each stage's queue in the order the trees
+                    entered the engine (see above)
+    '''
+
+    def __init__(self, spec : dag.FlowSpec, *args, **kwargs):
+        self.spec           : dag.FlowSpec      = spec
+        self.seed           : Callable          = None
+        self.done           : Callable          = lambda job: None
+        self.d_budget       : dict              = {}
+        self.workers        : int               = 4
+        self.maxTrees       : int               = 0
+        self.b_ordered      : bool              = False
+        self.d_stage        : dict              = {}
+        self.lock           : threading.Lock    = threading.Lock()
+        self.treesDone      : threading.Condition = threading.Condition(self.lock)
+        self.pending        : int               = 0
+        self.admission      : threading.Semaphore = None
+        self.d_waiting      : dict              = {}
+        self.l_deadline     : list              = []
+        self.waitIDs                            = itertools.count()
+        self.reaper         : threading.Thread  = None
+        self.b_stop         : bool              = False
+        self.completion     : ThreadPoolExecutor = None
+
+        for k, v in kwargs.items():
+            if k == 'seed'      : self.seed         = v
+            if k == 'done'      : self.done         = v
+            if k == 'budgets'   : self.d_budget     = dict(v)
+            if k == 'workers'   : self.workers      = int(v)
+            if k == 'maxTrees'  : self.maxTrees     = int(v)
+            if k == 'ordered'   : self.b_ordered    = bool(v)
+
+        seedBudget  : int   = self.d_budget.get('seed', 0)
+        self.d_stage['seed']    = Stage(
+                                    'seed',
+                                    budget  = seedBudget,
+                                    workers = seedBudget or os.cpu_count() or 1,
+                                    ordered = self.b_ordered
+                                )
+        for d_node in self.spec.l_node:
+            str_stage   : str   = node_stage(d_node)
+            if str_stage not in self.d_stage:
+                self.d_stage[str_stage] = Stage(
+                    str_stage,
+                    budget  = self.d_budget.get(str_stage, self.d_budget.get('default', 0)),
+                    workers = self.workers,
+                    ordered = self.b_ordered
+                )
+        if self.maxTrees:
+            self.admission  = threading.Semaphore(self.maxTrees)
+
+    def start(self) -> None:
+        """
+        Start the stage worker threads, the wait timeout reaper and the
+        pool that completes finished nodes.
+        """
+        self.b_stop         = False
+        self.completion     = ThreadPoolExecutor(
+                                max_workers         = self.workers,
+                                thread_name_prefix  = 'stage-complete'
+                            )
+        for stage in self.d_stage.values():
+            worker      : Callable  = self.seed_work if stage.name == 'seed' else self.node_work
+            for i in range(stage.workers):
+                thread  : threading.Thread  = threading.Thread(
+                    target  = worker,
+                    args    = (stage,),
+                    name    = 'stage-%s-%d' % (stage.name, i),
+                    daemon  = True
+                )
+                thread.start()
+                stage.l_thread.append(thread)
+        self.reaper         = threading.Thread(
+                                target  = self.deadlines_reap,
+                                name    = 'stage-reaper',
+                                daemon  = True
+                            )
+        self.reaper.start()
+
+    def stop(self) -> None:
+        """
+        Stop all threads of the engine.
+        """
+        for stage in self.d_stage.values():
+            for _ in stage.l_thread: stage.put(None)
+        for stage in self.d_stage.values():
+            for thread in stage.l_thread: thread.join()
+            stage.l_thread  = []
+        with self.lock:
+            self.b_stop     = True
+            self.treesDone.notify_all()
+        self.reaper.join()
+        self.completion.shutdown(wait = True)
+
+    def run(self, trees : Iterable) -> int:
+        """
+        Grow a tree for each (input, output) in <trees> and block until
+        all are done. The engine keeps no tree once it is done: each
+        result is only handed to <done>, as the tree finishes.
+
+        Args:
+            trees (Iterable): yields (input, output) tuples
+
+        Returns:
+            int: the number of trees grown
+        """
+        count       : int   = 0
+        self.start()
+        try:
+            for index, (input, output) in enumerate(trees):
+                if self.admission: self.admission.acquire()
+                with self.lock:
+                    self.pending   += 1
+                self.d_stage['seed'].put(TreeJob(index, input, output), index)
+                count   = index + 1
+            with self.lock:
+                while self.pending:
+                    self.treesDone.wait()
+        finally:
+            self.stop()
+        return count
+
+    def seed_work(self, stage : Stage) -> None:
+        """
+        Worker loop of the seed stage: plant each tree's seed and, if it
+        took, start its flow.
+        """
+        while (job := stage.get()) is not None:
+            stage.slot_acquire()
+            tic     : float = time.monotonic()
+            try:
+                job.d_seed  = self.seed(job)
+            except Exception as e:
+                job.d_seed  = {'status': False, 'message': 'seed raised %s' % repr(e)}
+            stage.busy_add(time.monotonic() - tic)
+            stage.slot_release()
+            if job.d_seed.get('status') and job.flow is not None:
+                job.flow.newTreeID  = int(job.d_seed['branchInstanceID'])
+                job.scheduler       = dag.FlowScheduler(
+                                        self.spec,
+                                        done = job.flow.nodesDone_resumed()
+                                    )
+                self.tree_advance(job)
+            else:
+                self.tree_finish(job)
+
+    def node_work(self, stage : Stage) -> None:
+        """
+        Worker loop of a flow stage: submit the node of each tree and
+        hand its wait over to the status poller.
+        """
+        while (item := stage.get()) is not None:
+            job, d_node     = item
+            stage.slot_acquire()
+            tic     : float = time.monotonic()
+            try:
+                self.node_submit(stage, job, d_node)
+            except Exception as e:
+                stage.slot_release()
+                self.node_record(job, d_node, records.NodeResult(
+                    status  = 'error',
+                    error   = repr(e)
+                ))
+            stage.busy_add(time.monotonic() - tic)
+
+    def node_submit(self, stage : Stage, job : TreeJob, d_node : dict) -> None:
+        """
+        Submit <d_node> of <job> to CUBE and register a wait on the node
+        it waits on. The stage slot is held until that wait is over.
+        """
+        with job.lock:
+            d_result    : dict  = dict(job.scheduler.d_result)
+        d_submit        : dict  = job.flow.flowNode_submit(d_node, d_result)
+        if not d_submit:
+            stage.slot_release()
+            self.node_record(job, d_node, None)
+            return
+        d_wait          : dict  = job.flow.nodeWait_begin(
+                                    d_submit['detail'],
+                                    d_submit['waitFor'],
+                                    **d_submit['waitArgs']
+                                )
+        waitID          : int   = next(self.waitIDs)
+        with self.lock:
+            self.d_waiting[waitID]  = {
+                'job'       : job,
+                'node'      : d_node,
+                'stage'     : stage,
+                'wait'      : d_wait,
+                'prior'     : d_submit['prior']
+            }
+            if d_wait['future'] and d_wait['timeout']:
+                heapq.heappush(
+                    self.l_deadline,
+                    (time.monotonic() + d_wait['timeout'], waitID)
+                )
+                self.treesDone.notify_all()
+        if d_wait['future']:
+            d_wait['future'].add_done_callback(
+                lambda f, waitID = waitID: self.wait_resolve(waitID, f.result())
+            )
+        else:
+            self.wait_resolve(waitID, None)
+
+    def wait_resolve(self, waitID : int, d_plinfo : dict | None) -> None:
+        """
+        End the wait <waitID>, either with the finished plugin instance
+        <d_plinfo> or (if None) on a timeout. Only the first call for a
+        given wait has any effect.
+        """
+        with self.lock:
+            d_waiter    : dict  = self.d_waiting.pop(waitID, None)
+        if d_waiter:
+            self.completion.submit(self.node_complete, d_waiter, d_plinfo)
+
+    def node_complete(self, d_waiter : dict, d_plinfo : dict | None) -> None:
+        """
+        Record the outcome of a finished wait and move the tree on.
+        """
+        job         : TreeJob   = d_waiter['job']
+        try:
+            d_ret   : records.NodeResult = job.flow.nodeWait_end(d_waiter['wait'], d_plinfo)
+            d_ret.prior         = d_waiter['prior']
+            job.flow.flowNode_done(d_waiter['node'], d_ret)
+        except Exception as e:
+            d_ret               = records.NodeResult(status = 'error', error = repr(e))
+        d_waiter['stage'].slot_release()
+        self.node_record(job, d_waiter['node'], d_ret)
+
+    def deadlines_reap(self) -> None:
+        """
+        Time out the waits whose deadline has passed.
+        """
+        with self.lock:
+            while not self.b_stop:
+                now         : float = time.monotonic()
+                l_expired   : list  = []
+                while self.l_deadline and self.l_deadline[0][0] <= now:
+                    l_expired.append(heapq.heappop(self.l_deadline)[1])
+                if l_expired:
+                    self.lock.release()
+                    try:
+                        for waitID in l_expired: self.wait_resolve(waitID, None)
+                    finally:
+                        self.lock.acquire()
+                    continue
+                self.treesDone.wait(
+                    self.l_deadline[0][0] - now if self.l_deadline else None
+                )
+
+    def node_record(self,
+            job     : TreeJob,
+            d_node  : dict,
+            d_ret   : records.NodeResult | None
+        ) -> None:
+        with job.lock:
+            job.scheduler.d_result[d_node['id']]    = d_ret
+        self.tree_advance(job)
+
+    def tree_advance(self, job : TreeJob) -> None:
+        """
+        Queue the nodes of <job> that have become ready, or finish the
+        tree if all its nodes are done.
+        """
+        with job.lock:
+            l_ready     : list  = job.scheduler.nodes_ready(job.s_started)
+            job.s_started.update(l_ready)
+            b_done      : bool  = len(job.scheduler.d_result) == len(self.spec.l_node)
+        for str_id in l_ready:
+            d_node      : dict  = self.spec.d_node[str_id]
+            self.d_stage[node_stage(d_node)].put((job, d_node), job.index)
+        if b_done:
+            self.tree_finish(job)
+
+    def tree_finish(self, job : TreeJob) -> None:
+        d_tree      : records.NodeResult    = records.NodeResult(error = 'unable to grow tree')
+        if job.scheduler:
+            d_tree  = job.scheduler.d_result.get(self.spec.node_last()) or d_tree
+        job.d_ret   = {'seed': job.d_seed, 'tree': d_tree}
+        try:
+            self.done(job)
+        finally:
+            if self.admission: self.admission.release()
+            with self.lock:
+                self.pending   -= 1
+                self.treesDone.notify_all()
+
+    def stats(self) -> dict:
+        """
+        The per-stage counters: trees entered and done, peak number in
+        flight, and the seconds spent by workers submitting.
+        """
+        return {name: dict(stage.d_stats) for name, stage in self.d_stage.items()}
@@ -9,24 +9,42 @@ from pathlib import Path
 
 from io import TextIOWrapper
 import os, sys
+import asyncio
+import itertools
 
 os.environ["XDG_CONFIG_HOME"] = "/tmp"
 import pudb
 from pudb.remote import set_trace
 
 from loguru import logger
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
 from threading import current_thread, get_native_id
 
 from typing import Callable, Any
 
 from datetime import datetime, timezone
-import json
 
 from state import data
+from state import cache
+from state import journal
+from state import dedup
+from state import sink
+from state import records
+from state import trace
+from state import status
+from state import shared
 from logic import behavior
 from control import action
 from control.filter import PathFilter
+from control import poller
+from control import asyncflow
+from control import dag
+from control import admission
+from control import granularity
+from control import stages
+from control import priority
+from control import qa
+from control import retry
 from pftag import pftag
 from pflog import pflog
 
@@ -45,7 +63,6 @@ logger.add(sys.stderr, format=logger_format)
 
 pluginInputDir: Path
 pluginOutputDir: Path
-ld_forestResult: list = []
 
 __version__ = "4.4.45"
 
@@ -114,6 +131,70 @@ parser.add_argument(
     help="an optional pftel telemetry logger, of form '<pftelURL>/api/v1/<object>/<collection>/<event>'",
     default="",
 )
+parser.add_argument(
+    "--async",
+    help="grow all trees as coroutines on a single event loop (instead of --thread)",
+    dest="asyncMode",
+    action="store_true",
+    default=False,
+)
+parser.add_argument(
+    "--pipelined",
+    help="grow trees through a pipeline of stages, each with its own queue and budget (instead of --thread)",
+    action="store_true",
+    default=False,
+)
+parser.add_argument(
+    "--stageBudget",
+    help="with --pipelined, the maximum trees in flight per stage, e.g. 'seed=8,join=32,default=64' (0: no limit)",
+    default="",
+)
+parser.add_argument(
+    "--stageWorkers",
+    help="with --pipelined, the number of threads submitting work in each stage",
+    default="4",
+)
+parser.add_argument(
+    "--maxTrees",
+    help="in --async or --pipelined mode, the maximum number of trees growing concurrently",
+    default="256",
+)
+parser.add_argument(
+    "--ioThreads",
+    help="in --async mode, the number of threads making blocking CUBE calls",
+    default="32",
+)
+parser.add_argument(
+    "--headerFilter",
+    help="only grow trees off DICOM files whose headers meet these ';' separated criteria (or a file of them), e.g. 'Modality=DX,CR;BodyPartExamined~LEG;ImageType!~LOCALIZER;Rows>=1024'",
+    default="",
+)
+parser.add_argument(
+    "--filterWorkers",
+    help="the number of processes evaluating --headerFilter, in chunks of --filterChunk inputs, before the inputs' trees are started (0: one per CPU)",
+    default="0",
+)
+parser.add_argument(
+    "--filterChunk",
+    help="the number of inputs per --headerFilter work unit",
+    default="512",
+)
+parser.add_argument(
+    "--streamInputs",
+    help="discover input files lazily (os.scandir), starting trees as files are found, instead of cataloging the input directory first; --pattern may then be a comma separated list",
+    action="store_true",
+    default=False,
+)
+parser.add_argument(
+    "--exclude",
+    help="with --streamInputs, comma separated patterns of files and directories to skip, e.g. '*.txt,scratch'",
+    default="",
+)
+parser.add_argument(
+    "--maxDepth",
+    help="with --streamInputs, the deepest directory level to descend into (0 is the input directory itself; -1 is unlimited)",
+    default="-1",
+)
 parser.add_argument(
     "--inNode",
     help="perform in-node implicit parallelization in conjunction with --thread",
@@ -121,6 +202,21 @@ parser.add_argument(
     action="store_true",
     default=False,
 )
+parser.add_argument(
+    "--batchFiles",
+    help="pack up to this many input files into a single seed/tree",
+    default="1",
+)
+parser.add_argument(
+    "--batchBytes",
+    help="with --batchFiles, also cap the total size of a seed at this many bytes (0: no cap)",
+    default="0",
+)
+parser.add_argument(
+    "--maxDirFiles",
+    help="with --inNode, split directories with more files than this into balanced chunks (0: never split)",
+    default="0",
+)
 parser.add_argument(
     "--notimeout",
     help="if specified, then controller never timesout while waiting on nodes to complete",
@@ -140,6 +236,132 @@ parser.add_argument(
     help="the terminal 'cols,rows' size for debugging",
     default="253,62",
 )
+parser.add_argument(
+    "--seedMode",
+    help="how to plant seeds: 'native' (CUBE API, falling back to chrispl-run) or 'script' (chrispl-run)",
+    choices=["native", "script"],
+    default="native",
+)
+parser.add_argument(
+    "--flowSpec",
+    help="JSON file describing the compute flow DAG to grow off each seed (default: the bundled LLD flow)",
+    default="",
+)
+parser.add_argument(
+    "--resume",
+    help="resume an interrupted growth cycle from the journal in the output directory",
+    action="store_true",
+    default=False,
+)
+parser.add_argument(
+    "--compressLog",
+    help="gzip the streamed per-tree result log (treeLog.jsonl.gz)",
+    action="store_true",
+    default=False,
+)
+parser.add_argument(
+    "--legacyTreeLog",
+    help="also write the result log as the legacy treeLog.json array at the end of the run",
+    action="store_true",
+    default=False,
+)
+parser.add_argument(
+    "--rawStore",
+    help="number of raw CUBE plugin instance payloads to keep in memory for debugging (0 keeps none); results otherwise only hold compact records",
+    default="0",
+)
+parser.add_argument(
+    "--trace",
+    help="write timed spans of each tree's growth (seed, workflows, joins, waits, QA) to trace.json in the output directory, in Chrome trace format",
+    action="store_true",
+    default=False,
+)
+parser.add_argument(
+    "--statusInterval",
+    help="seconds between rewrites of status.json (live tree counts by stage, workflows in flight, trees/hour, ETA, poll load) in the output directory; 0 means never",
+    default="5",
+)
+parser.add_argument(
+    "--statusAddress",
+    help="also serve the live status over HTTP at [<host>:]<port>/status (host: 127.0.0.1)",
+    default="",
+)
+parser.add_argument(
+    "--shard",
+    help="grow only shard K of N (0 <= K < N) of the inputs, by a stable hash of their relative paths, so that N controllers can share an input space; the output logs are then named for the shard",
+    default="",
+)
+parser.add_argument(
+    "--priority",
+    help="grow trees in the order of this composite key of 'manifest', 'mtime', 'studydate', 'size' and 'deadline' (or 'edf', earliest deadline first), each ascending unless prefixed with '-', e.g. 'manifest,-studydate' (unset: mapper order)",
+    default="",
+)
+parser.add_argument(
+    "--priorityManifest",
+    help="JSON string or file mapping inputs (relative path, name or glob) to a priority (lower is sooner) or to {\"priority\": ..., \"deadline\": ...}",
+    default="",
+)
+parser.add_argument(
+    "--deadlineSlack",
+    help="with --priority deadline, seconds after its mtime that an input without a manifest deadline is due",
+    default="86400",
+)
+parser.add_argument(
+    "--priorityWindow",
+    help="with --priority, the number of inputs ordered at a time (0: all inputs are discovered and ordered before the first tree is started)",
+    default="0",
+)
+parser.add_argument(
+    "--dedupIndex",
+    help="path of a persistent content-hash index; inputs already grown into a tree (in this or an earlier run) are skipped",
+    default="",
+)
+parser.add_argument(
+    "--hashThreads",
+    help="with --dedupIndex, the number of threads hashing input files",
+    default="8",
+)
+parser.add_argument(
+    "--apiRate",
+    help="CUBE API calls per second by call type, e.g. 'read=50,write=10' (unset: no limit)",
+    default="",
+)
+parser.add_argument(
+    "--inflight",
+    help="maximum work in flight in CUBE by kind, e.g. 'seed=8,workflow=64,join=32' (unset: no limit)",
+    default="",
+)
+parser.add_argument(
+    "--retries",
+    help="times a failed CUBE call is retried, if it was throttled or failed transiently (writes: only if it never reached CUBE)",
+    default="4",
+)
+parser.add_argument(
+    "--retryBackoff",
+    help="seconds of backoff (with full jitter) before the first retry of a CUBE call, doubling with each retry",
+    default="0.5",
+)
+parser.add_argument(
+    "--metaCacheTTL",
+    help="seconds before cached CUBE metadata (pipelines, plugins) is refetched; 0 means never",
+    default="0",
+)
+parser.add_argument(
+    "--pollInterval",
+    help="nominal seconds between status queries of awaited nodes",
+    default="5",
+)
+parser.add_argument(
+    "--pollPolicy",
+    help="node polling policy: 'fixed' (every --pollInterval) or 'adaptive' (backoff with jitter)",
+    choices=["fixed", "adaptive"],
+    default="fixed",
+)
+parser.add_argument(
+    "--pollSpec",
+    help="JSON string or file with per node-title poll overrides, e.g. '{\"heatmaps\": {\"expect\": 60}}'",
+    default="",
+)
 parser.add_argument("--debugPort", help="the debugging telnet port", default="7900")
 parser.add_argument("--debugHost", help="the debugging telnet host", default="0.0.0.0")
 
@@ -214,6 +436,51 @@ def preamble(options: Namespace) -> str:
     return pftelDB
 
 
+def metaCache_setup(options: Namespace, inputdir: Path, outputdir: Path) -> dict:
+    """
+    Create and prime the process-wide CUBE metadata cache so that the
+    pipeline and plugin lookups are done once, and not once per tree.
+    The shared client is gated by the admission controller (--apiRate,
+    --inflight), and its calls retried by the retry policy (--retries,
+    --retryBackoff). Also create the shared status poller that waits on
+    nodes for all trees.
+
+    Args:
+        options (Namespace): CLI options namespace
+        inputdir (Path): plugin global input directory
+        outputdir (Path): plugin global output directory
+
+    Returns:
+        dict: the result of priming the cache
+    """
+    client_gate: Callable = admission.sharedAdmission_get(
+        rates=admission.budgets_parse(options.apiRate),
+        caps=admission.budgets_parse(options.inflight),
+    ).client_gate
+    RetryPolicy: retry.RetryPolicy = retry.sharedPolicy_get(
+        retries=options.retries, backoff=options.retryBackoff
+    )
+    cache.sharedCache_get(
+        ttl=float(options.metaCacheTTL),
+        clientWrap=lambda cl: RetryPolicy.client_wrap(client_gate(cl)),
+    )
+    d_prime: dict = action.metaCache_prime(
+        Env_setup(options, inputdir, outputdir), dag.flowSpec_load(options.flowSpec)
+    )
+    poller.sharedPoller_get(
+        client=cache.sharedCache_get().cl,
+        interval=float(options.pollInterval),
+        policies=poller.pollPolicies_build(
+            options.pollPolicy, float(options.pollInterval), options.pollSpec
+        ),
+    )
+    LOG(
+        "Metadata cache primed with %d plugins and %d pipelines"
+        % (d_prime["plugins"], d_prime["pipelines"])
+    )
+    return d_prime
+
+
 def ground_prep(options: Namespace, Env: data.env) -> action.PluginRun:
     """
     Do some per-tree setup -- prepare the ground!
@@ -242,22 +509,166 @@ def ground_prep(options: Namespace, Env: data.env) -> action.PluginRun:
     return PLinputFilter
 
 
-def replantSeed_catchError(PLseed: action.PluginRun, input: Path) -> dict:
+def conditional_build() -> behavior.Filter:
     """
-    Re-run a failed filter (pl-shexec) with explicit error catching
+    The filter that decides, as its tree starts, whether a tree is grown
+    off an input. Inputs are (batch) filtered on their headers before any
+    tree is started, so this is an unconditional pass.
+
+    Returns:
+        behavior.Filter: the filter
+    """
+    conditional: behavior.Filter = behavior.Filter()
+    conditional.filterOp = behavior.unconditionalPass
+    return conditional
+
+
+def input_rejected(input: Path, str_reason: str = "rejected by filter") -> dict:
+    """
+    The seed result of an <input> that a filter rejected.
+    """
+    LOG("Not growing a tree off %s: %s" % (str(input), str_reason))
+    return {"status": False, "message": "input rejected: %s" % str_reason}
+
+
+def tree_rejected(input: Path, str_reason: str) -> None:
+    """
+    Log an input that the --headerFilter rejected, without starting its
+    tree.
 
     Args:
-        PLseed (action.Pluginrun): the plugin run object to re-execute
-        input (Path): the input on which the seed failed
+        input (Path): input path returned by mapper
+        str_reason (str): why the input was rejected
+    """
+    sink.sharedSink_get().write(
+        {
+            "input": str(input),
+            "seed": input_rejected(input, str_reason),
+            "tree": {},
+            "nodes": [],
+            "rejected": str_reason,
+        }
+    )
+
+
+def seed_plant(PLinputFilter: action.PluginRun, input: Path) -> dict:
+    """
+    Plant the seed off <input> and journal it -- or, on resume, reuse the
+    seed that the journal shows was planted in an earlier run.
+
+    Args:
+        PLinputFilter (action.PluginRun): the seed filter of this tree
+        input (Path): input path returned by mapper
 
     Returns:
-        dict: the detailed error log from the failed run
+        dict: the seed result
     """
     global LOG
-    LOG("Some error was returned when planting the seed!")
-    LOG("Replanting seed with error catching on...")
-    d_seedreplant: dict = PLseed(str(input), append="--jsonReturn")
-    return d_seedreplant
+    Journal: journal.TreeJournal = journal.sharedJournal_get()
+    d_seedGet: dict = Journal.tree_state(str(input)).get("seed", {})
+    if d_seedGet:
+        LOG("Resuming tree off %s from seed %s" % (str(input), d_seedGet["branchInstanceID"]))
+        return d_seedGet
+    LOG("Planting seed off %s" % str(input))
+    Tracer: trace.Tracer = trace.sharedTracer_get()
+    with Tracer.span("seed", Tracer.lane(str(input))) as d_span:
+        d_seedGet = PLinputFilter(seed_target(input))
+        d_span["status"] = d_seedGet["status"]
+        d_span["branchInstanceID"] = d_seedGet.get("branchInstanceID")
+        if d_seedGet["status"]:
+            Journal.record(
+                str(input),
+                "seed",
+                seed={
+                    "status": True,
+                    "input": d_seedGet["input"],
+                    "branchInstanceID": d_seedGet["branchInstanceID"],
+                },
+            )
+        else:
+            LOG("Planting the seed off %s failed" % str(input))
+    return d_seedGet
+
+
+def tree_resumed(input: Path) -> dict:
+    """
+    On resume, the result of the tree off <input> if the journal shows it
+    was fully grown in an earlier run; such trees are not regrown.
+
+    Args:
+        input (Path): input path returned by mapper
+
+    Returns:
+        dict: the journaled tree result, or an empty dict
+    """
+    d_ret: dict = journal.sharedJournal_get().tree_state(str(input)).get("end", {})
+    if d_ret:
+        LOG("Tree off %s was grown in an earlier run, skipping" % str(input))
+        sink.sharedSink_get().write({**d_ret, "resumed": True})
+        status.sharedStatus_get().tree_end(str(input), "resumed")
+        dedup.sharedIndex_get().tree_record(
+            input, d_ret["seed"].get("branchInstanceID"), d_ret["tree"].get("feed")
+        )
+    return d_ret
+
+
+def tree_duplicate(input: Path, d_tree: dict) -> None:
+    """
+    Log an input whose content was already grown into the tree <d_tree>,
+    instead of growing it again.
+
+    Args:
+        input (Path): input path returned by mapper
+        d_tree (dict): the input, seed and feed of the existing tree
+    """
+    LOG("Input %s duplicates %s, skipping" % (str(input), d_tree["input"]))
+    sink.sharedSink_get().write(
+        {"input": str(input), "seed": {}, "tree": {}, "nodes": [], "duplicateOf": d_tree}
+    )
+
+
+def tree_begin(input: Path) -> None:
+    """
+    Note the start of the growth of the tree off <input> in the trace and
+    in the live status.
+    """
+    trace.sharedTracer_get().tree_begin(str(input))
+    status.sharedStatus_get().tree_begin(str(input))
+
+
+def tree_record(input: Path, d_ret: dict) -> dict:
+    """
+    Stream the compact record of the tree off <input> to the result log
+    and, if the tree was fully grown, journal its end and add it to the
+    dedup index (else release it there, so that a duplicate is grown).
+
+    Args:
+        input (Path): input path returned by mapper
+        d_ret (dict): the tree result, {"seed": <dict>, "tree": <records.NodeResult>}
+
+    Returns:
+        dict: the compact record of the tree
+    """
+    d_record: dict = sink.tree_compact(input, d_ret)
+    sink.sharedSink_get().write(d_record)
+    trace.sharedTracer_get().tree_end(
+        str(input),
+        finished=d_record["tree"].get("finished", False),
+        status=d_record["tree"].get("status", ""),
+    )
+    status.sharedStatus_get().tree_end(
+        str(input), "finished" if records.result_finished(d_ret["tree"]) else "failed"
+    )
+    if records.result_finished(d_ret["tree"]):
+        journal.sharedJournal_get().record(str(input), "end", result=d_record)
+        dedup.sharedIndex_get().tree_record(
+            input,
+            d_ret["seed"].get("branchInstanceID"),
+            d_ret["tree"].plinst.feed_id,
+        )
+    else:
+        dedup.sharedIndex_get().tree_release(input)
+    return d_record
 
 
 def tree_grow(options: Namespace, input: Path, output: Path = None) -> dict:
@@ -273,24 +684,29 @@ def tree_grow(options: Namespace, input: Path, output: Path = None) -> dict:
     Returns:
         dict: resultant object dictionary of this (threaded) growth
     """
-    global pluginInputDir, pluginOutputDir, LOG, ld_forestResult
+    global pluginInputDir, pluginOutputDir, LOG
 
     # set_trace(term_size=(253, 62), host = '0.0.0.0', port = 7900)
 
+    d_resumed: dict = tree_resumed(input)
+    if d_resumed:
+        return d_resumed
+    tree_begin(input)
     Env: data.env = Env_setup(options, pluginInputDir, pluginOutputDir, get_native_id())
     Env.set_telnet_trace_if_specified()
 
     timenow: Callable[[], str] = (
         lambda: datetime.now(timezone.utc).astimezone().isoformat()
     )
-    conditional: behavior.Filter = behavior.Filter()
-    conditional.obj_pass = behavior.unconditionalPass
+    conditional: behavior.Filter = conditional_build()
     PLinputFilter: action.PluginRun = ground_prep(options, Env)
-    LLD: action.LLDcomputeflow = action.LLDcomputeflow(env=Env, options=options)
+    LLD: action.LLDcomputeflow = action.LLDcomputeflow(
+        env=Env, options=options, tree=str(input)
+    )
     str_threadName: str = current_thread().getName()
     d_seedGet: dict = {"status": False, "message": "unable to plant seed"}
-    d_treeGrow: dict = {"status": False, "message": "unable to grow tree"}
-    d_ret: dict = {"seed": {}, "tree": {}}
+    d_treeGrow: records.NodeResult = records.NodeResult(error="unable to grow tree")
+    d_ret: dict = {"seed": {}, "tree": None}
 
     Path("%s/start-%s.touch" % (Env.outputdir.touch(), str_threadName))
     LOG("Growing a new tree in thread %s..." % str_threadName)
@@ -300,33 +716,272 @@ def tree_grow(options: Namespace, input: Path, output: Path = None) -> dict:
     fl: TextIOWrapper = open(str_heartbeat, "w")
     fl.write("Start time: {}\n".format(timenow()))
     if conditional.obj_pass(str(input)):
-        LOG("Planting seed off %s" % str(input))
-        d_seedGet = PLinputFilter(str(input))
+        d_seedGet = seed_plant(PLinputFilter, input)
         if d_seedGet["status"]:
             d_treeGrow = LLD(d_seedGet["branchInstanceID"])
-        else:
-            d_seedGet["failed"] = replantSeed_catchError(PLinputFilter, input)
+    else:
+        d_seedGet = input_rejected(input)
     fl.write("End   time: {}\n".format(timenow()))
     fl.close()
     d_ret["seed"] = d_seedGet
     d_ret["tree"] = d_treeGrow
-    ld_forestResult.append(d_ret)
-    return d_ret
+    return tree_record(input, d_ret)
 
 
-def treeGrowth_savelog(outputdir: Path) -> None:
+async def tree_growAsync(
+    options: Namespace, input: Path, output: Path = None, treeIndex: int = 0
+) -> dict:
     """
-    Write the global log file on the tree growth to the passed
-    <outputdir>
+    The coroutine equivalent of `tree_grow`: plant a seed off <input> and
+    grow the LLD compute flow from it, awaiting (rather than blocking on)
+    each node in the flow.
 
     Args:
-        outputdir (Path): the plugin base output directory
+        options (Namespace): CLI options
+        input (Path): input path returned by mapper
+        output (Path, optional): ouptut path returned by mapper. Defaults to None.
+        treeIndex (int, optional): index of this tree in the forest. Defaults to 0.
+
+    Returns:
+        dict: resultant object dictionary of this growth
+    """
+    global pluginInputDir, pluginOutputDir, LOG
+
+    d_resumed: dict = tree_resumed(input)
+    if d_resumed:
+        return d_resumed
+    tree_begin(input)
+    Env: data.env = Env_setup(options, pluginInputDir, pluginOutputDir, treeIndex)
+
+    timenow: Callable[[], str] = (
+        lambda: datetime.now(timezone.utc).astimezone().isoformat()
+    )
+    conditional: behavior.Filter = conditional_build()
+    PLinputFilter: action.PluginRun = ground_prep(options, Env)
+    LLD: asyncflow.AsyncLLDcomputeflow = asyncflow.AsyncLLDcomputeflow(
+        action.LLDcomputeflow(env=Env, options=options, tree=str(input))
+    )
+    str_treeName: str = "tree-%d" % treeIndex
+    d_seedGet: dict = {"status": False, "message": "unable to plant seed"}
+    d_treeGrow: records.NodeResult = records.NodeResult(error="unable to grow tree")
+    d_ret: dict = {"seed": {}, "tree": None}
+
+    LOG("Growing a new tree %s..." % str_treeName)
+    str_heartbeat: str = str(Env.outputdir.joinpath("heartbeat-%s.log" % str_treeName))
+    fl: TextIOWrapper = open(str_heartbeat, "w")
+    fl.write("Start time: {}\n".format(timenow()))
+    if conditional.obj_pass(str(input)):
+        d_seedGet = await asyncio.to_thread(seed_plant, PLinputFilter, input)
+        if d_seedGet["status"]:
+            d_treeGrow = await LLD(d_seedGet["branchInstanceID"])
+    else:
+        d_seedGet = input_rejected(input)
+    fl.write("End   time: {}\n".format(timenow()))
+    fl.close()
+    d_ret["seed"] = d_seedGet
+    d_ret["tree"] = d_treeGrow
+    return tree_record(input, d_ret)
+
+
+async def forest_growAsync(options: Namespace, mapper: Iterator) -> list:
+    """
+    Grow a tree for every input in <mapper> on a single event loop, with
+    --maxTrees worker tasks that each pull the next input from <mapper>
+    once their tree is grown -- so inputs are only read from the mapper
+    as there is room for them. Blocking CUBE API calls (and the pulls
+    from the mapper) run on a pool of --ioThreads threads.
+
+    Args:
+        options (Namespace): CLI options
+        mapper (Iterator): yields (input, output) path tuples
+
+    Returns:
+        list: the result of each tree growth, in order of completion
+    """
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=int(options.ioThreads))
+    )
+    mapperIter: Iterator = iter(mapper)
+    mapperLock: asyncio.Lock = asyncio.Lock()
+    treeCount: Iterator = itertools.count()
+    l_result: list = []
+
+    async def input_next() -> tuple:
+        async with mapperLock:
+            t_input: tuple = await asyncio.to_thread(next, mapperIter, None)
+            return (next(treeCount), t_input) if t_input else (None, None)
+
+    async def tree_worker() -> None:
+        while True:
+            treeIndex, t_input = await input_next()
+            if t_input is None:
+                return
+            l_result.append(await tree_growAsync(options, *t_input, treeIndex))
+
+    await asyncio.gather(*[tree_worker() for _ in range(max(1, int(options.maxTrees)))])
+    return l_result
+
+
+def tree_seed(options: Namespace, job: stages.TreeJob) -> dict:
+    """
+    The seed stage of `forest_growPipelined`: prepare the ground for the
+    tree of <job>, plant its seed and attach its compute flow.
+
+    Args:
+        options (Namespace): CLI options
+        job (stages.TreeJob): the tree
+
+    Returns:
+        dict: the seed result
+    """
+    global pluginInputDir, pluginOutputDir, LOG
+
+    tree_begin(job.input)
+    Env: data.env = Env_setup(options, pluginInputDir, pluginOutputDir, job.index)
+    conditional: behavior.Filter = conditional_build()
+    PLinputFilter: action.PluginRun = ground_prep(options, Env)
+    d_seedGet: dict = {"status": False, "message": "unable to plant seed"}
+
+    with open(str(Env.outputdir.joinpath("heartbeat-tree-%d.log" % job.index)), "w") as fl:
+        fl.write("Start time: {}\n".format(datetime.now(timezone.utc).astimezone().isoformat()))
+    if conditional.obj_pass(str(job.input)):
+        d_seedGet = seed_plant(PLinputFilter, job.input)
+        if d_seedGet["status"]:
+            job.flow = action.LLDcomputeflow(env=Env, options=options, tree=str(job.input))
+    else:
+        d_seedGet = input_rejected(job.input)
+    return d_seedGet
+
+
+def tree_done(job: stages.TreeJob) -> None:
+    """
+    Record the result of a tree grown by `forest_growPipelined`.
+    """
+    global pluginOutputDir
+
+    with open(str(pluginOutputDir.joinpath("heartbeat-tree-%d.log" % job.index)), "a") as fl:
+        fl.write("End   time: {}\n".format(datetime.now(timezone.utc).astimezone().isoformat()))
+    job.d_ret = tree_record(job.input, job.d_ret)
+    job.flow = None
+    job.scheduler = None
+
+
+def forest_growPipelined(options: Namespace, mapper: Iterator) -> int:
+    """
+    Grow a tree for every input in <mapper> through the stage pipeline,
+    with at most --maxTrees trees in the pipeline at once. Each result is
+    streamed to the result log by `tree_done` as its tree finishes.
+
+    Args:
+        options (Namespace): CLI options
+        mapper (Iterator): yields (input, output) path tuples
+
+    Returns:
+        int: the number of trees grown
+    """
+    engine: stages.StageEngine = stages.StageEngine(
+        dag.flowSpec_load(options.flowSpec),
+        seed=lambda job: tree_seed(options, job),
+        done=tree_done,
+        budgets=stages.stageBudgets_parse(options.stageBudget),
+        workers=options.stageWorkers,
+        maxTrees=options.maxTrees,
+        ordered=bool(options.priority),
+    )
+    count: int = engine.run(t for t in mapper if not tree_resumed(t[0]))
+    for str_stage, d_stats in engine.stats().items():
+        LOG(
+            "Stage %-28s entered %5d, peak in flight %4d, busy %8.1fs"
+            % (str_stage, d_stats["entered"], d_stats["peak"], d_stats["busy"])
+        )
+    return count
+
+
+def mapper_build(options: Namespace, inputdir: Path, outputdir: Path) -> Iterator:
+    """
+    Build the iterator of (input, output) tuples, one per tree. If any
+    of the granularity options are set, inputs are packed/split into
+    batches; otherwise there is one tree per file (or per directory with
+    --inNode). With --streamInputs, files are discovered lazily.
+
+    Args:
+        options (Namespace): CLI options
+        inputdir (Path): plugin global input directory
+        outputdir (Path): plugin global output directory
+
+    Returns:
+        Iterator: the mapper
+    """
+    if int(options.batchFiles) > 1 or int(options.batchBytes) or int(options.maxDirFiles):
+        return granularity.GranularityPlanner(
+            inputdir,
+            outputdir,
+            glob=options.pattern,
+            inNode=options.inNode,
+            batchFiles=options.batchFiles,
+            batchBytes=options.batchBytes,
+            maxDirFiles=options.maxDirFiles,
+        )
+    if options.streamInputs and not options.inNode:
+        return PathFilter(
+            inputdir,
+            outputdir,
+            stream=True,
+            include=options.pattern,
+            exclude=options.exclude,
+            maxDepth=options.maxDepth,
+            logger=LOG,
+        )
+    if not options.inNode:
+        return PathMapper.file_mapper(inputdir, outputdir, glob=options.pattern)
+    return PathMapper.dir_mapper_deep(inputdir, outputdir)
+
+
+def seed_target(input: Path | granularity.Batch) -> str | granularity.Batch:
     """
-    global ld_forestResult
+    The object to plant a seed off: a planned batch is passed as-is, a
+    plain mapper path as a string.
+    """
+    if isinstance(input, granularity.Batch):
+        return input
+    return str(input)
+
 
-    with open(str(outputdir.joinpath("treeLog.json")), "w") as f:
-        f.write(json.dumps(ld_forestResult, indent=4))
-    f.close()
+def outputName_get(options: Namespace, str_name: str) -> str:
+    """
+    The name of output file <str_name>, tagged with the shard if the
+    inputs are sharded, e.g. treeLog.jsonl -> treeLog.shard-1-of-4.jsonl
+
+    Args:
+        options (Namespace): CLI options
+        str_name (str): the unsharded file name
+
+    Returns:
+        str: the output file name
+    """
+    k, n = granularity.shard_parse(options.shard)
+    if n == 1:
+        return str_name
+    str_stem, str_dot, str_ext = str_name.partition(".")
+    return "%s.shard-%d-of-%d%s%s" % (str_stem, k, n, str_dot, str_ext)
+
+
+def treeGrowth_savelog(options: Namespace, outputdir: Path) -> None:
+    """
+    Close the streamed result log in the passed <outputdir> and, with
+    --legacyTreeLog, also write it out as the legacy treeLog.json
+
+    Args:
+        options (Namespace): CLI options
+        outputdir (Path): the plugin base output directory
+    """
+    ResultSink: sink.ResultSink = sink.sharedSink_get()
+    ResultSink.close()
+    LOG("Wrote %d tree records to %s" % (ResultSink.count, ResultSink.path))
+    if options.legacyTreeLog:
+        ResultSink.legacy_write(
+            outputdir.joinpath(outputName_get(options, "treeLog.json"))
+        )
 
 
 # documentation: https://fnndsc.github.io/chris_plugin/chris_plugin.html#chris_plugin
@@ -353,15 +1008,65 @@ def main(options: Namespace, inputdir: Path, outputdir: Path):
     pluginOutputDir = outputdir
 
     options.pftelDB = preamble(options)
+    shardK, shardN = granularity.shard_parse(options.shard)
+    journal.sharedJournal_get(
+        path=outputdir.joinpath(outputName_get(options, "journal.jsonl")),
+        resume=options.resume,
+    )
+    sink.sharedSink_get(
+        path=outputdir.joinpath(outputName_get(options, "treeLog.jsonl")),
+        compress=options.compressLog,
+    )
+    records.sharedRawStore_get(maxItems=options.rawStore)
+    Tracer: trace.Tracer = trace.sharedTracer_get(
+        path=outputdir.joinpath(outputName_get(options, "trace.json"))
+        if options.trace
+        else None
+    )
+    metaCache_setup(options, inputdir, outputdir)
+    RunStatus: status.RunStatus = status.sharedStatus_get(
+        path=outputdir.joinpath(outputName_get(options, "status.json")),
+        interval=options.statusInterval,
+        address=options.statusAddress,
+    )
+    RunStatus.source_add("poll", poller.sharedPoller_get().load)
+    str_statusURL: str = RunStatus.start()
+    if str_statusURL:
+        LOG("Serving the run status at %s" % str_statusURL)
 
     output: Path
-    if not options.inNode:
-        mapper: PathMapper = PathMapper.file_mapper(
-            inputdir, outputdir, glob=options.pattern
-        )
-    else:
-        mapper: PathMapper = PathMapper.dir_mapper_deep(inputdir, outputdir)
-    if int(options.thread):
+    if shardN > 1:
+        LOG("Growing shard %d of %d of the inputs" % (shardK, shardN))
+    filterVerdict: behavior.FilterVerdict = behavior.FilterVerdict()
+    mapper: Iterator = dedup.sharedIndex_get(
+        path=options.dedupIndex, threads=options.hashThreads
+    ).inputs_filter(
+        priority.PriorityScheduler(
+            behavior.mapper_filter(
+                granularity.inputs_shard(
+                    mapper_build(options, inputdir, outputdir), inputdir, shardK, shardN
+                ),
+                behavior.HeaderCriteria(options.headerFilter),
+                tree_rejected,
+                filterVerdict,
+                workers=int(options.filterWorkers),
+                chunk=int(options.filterChunk),
+            ),
+            keys=options.priority,
+            inputdir=inputdir,
+            manifest=options.priorityManifest,
+            slack=options.deadlineSlack,
+            window=options.priorityWindow,
+        ),
+        tree_duplicate,
+    )
+    mapper = RunStatus.inputs_count(mapper)
+    growthSpan: int = Tracer.span_begin("growth cycle")
+    if options.asyncMode:
+        asyncio.run(forest_growAsync(options, mapper))
+    elif options.pipelined:
+        forest_growPipelined(options, mapper)
+    elif int(options.thread):
         with ThreadPoolExecutor(max_workers=len(os.sched_getaffinity(0))) as pool:
             results: Iterator = pool.map(lambda t: tree_grow(options, *t), mapper)
 
@@ -372,8 +1077,51 @@ def main(options: Namespace, inputdir: Path, outputdir: Path):
         for input, output in mapper:
             d_results: dict = tree_grow(options, input, output)
 
+    Tracer.span_end(growthSpan)
     LOG("Ending growth cycle...")
-    treeGrowth_savelog(outputdir)
+    if options.headerFilter:
+        LOG(
+            "Header filter accepted %d and rejected %d inputs"
+            % (filterVerdict.accepted, filterVerdict.rejected)
+        )
+    for str_kind, d_stats in admission.sharedAdmission_get().stats().items():
+        LOG(
+            "Admission %-10s %8d admitted, %8.1fs waiting"
+            % (str_kind, d_stats["calls"], d_stats["waited"])
+        )
+    poller.sharedPoller_get().stop()
+    QAqueue: qa.QAQueue = qa.sharedQAQueue_get()
+    QAqueue.stop()
+    d_qa: dict = QAqueue.stats()
+    LOG(
+        "QA checks %d passed, %d failed; %d feeds renamed (%d already were), %d abandoned"
+        % (
+            d_qa["passed"],
+            d_qa["failed"],
+            d_qa["renamed"],
+            d_qa["already"],
+            d_qa["abandoned"],
+        )
+    )
+    d_retry: dict = retry.sharedPolicy_get().stats()
+    LOG(
+        "CUBE calls retried %d times, %d recovered; failed for good: %d throttled, %d transient, %d permanent"
+        % (
+            d_retry["retried"],
+            d_retry["recovered"],
+            d_retry["throttled"],
+            d_retry["transient"],
+            d_retry["permanent"],
+        )
+    )
+    RunStatus.close()
+    journal.sharedJournal_get().close()
+    dedup.sharedIndex_get().close()
+    treeGrowth_savelog(options, outputdir)
+    if Tracer.enabled():
+        Tracer.close()
+        LOG("Wrote %d trace events to %s" % (Tracer.count, Tracer.path))
+    shared.shared_reset()
 
 
 if __name__ == "__main__":
@@ -7,15 +7,164 @@ str_about = '''
     copying the object into a child plugin, and then running a pipeline
     on the result of that copy-to-child.
 
-    For now, this class is mostly dummy filler.
+    Besides the dummy `unconditionalPass`, objects can be filtered on
+    their DICOM headers with `HeaderCriteria`, so that (say) scouts, other
+    body parts and non-radiograph modalities are rejected before a seed is
+    ever planted off them. The criteria are a ';' separated list of
+    clauses, all of which must hold, of the form
+
+        <keyword><op><value>
+
+    where <keyword> is a tag keyword known to `logic.dicom` and <op> is
+
+        =   equals (case-insensitively) any of the ',' separated values
+        !=  equals none of them
+        ~   matches the (case-insensitive) regular expression
+        !~  does not match it
+        > >= < <=
+            compares as a number
+
+    e.g. 'Modality=DX,CR;BodyPartExamined~LEG|EXTREMITY;ImageType!~LOCALIZER;Rows>=1024'.
+    A multi-valued tag holds if any of its values does (for = and ~) or
+    if none does (for != and !~). A missing tag fails every clause but
+    != and !~.
+
+    An input of several files -- a batch, or an --inNode directory --
+    is judged on every one of its files (a directory on the files
+    directly in it), and is rejected if any of them fails: a tree grown
+    off it would take them all.
+
+    Rather than one object at a time, the criteria can be evaluated over
+    a whole input set -- in chunks, across a process pool -- with
+    `objects_evaluate` (which gives an accept mask and the reasons for
+    each rejection) or, as inputs stream in, `mapper_filter`.
 '''
 
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  re
+import  itertools
+import  multiprocessing
+from    collections             import deque
+from    concurrent.futures      import ProcessPoolExecutor
+from    pathlib                 import Path
+from    typing                  import Any, Callable, Iterator
+from    logic                   import dicom
+
 def unconditionalPass(str_object: str) -> bool:
     '''
     A dummy fall through function that always returns True.
     '''
     return True
 
+class Criterion:
+    '''
+    A single clause of the header criteria.
+    '''
+
+    def __init__(self, keyword : str, op : str, str_value : str):
+        self.keyword    : str   = keyword
+        self.op         : str   = op
+        self.str_value  : str   = str_value
+        self.l_value    : list  = [v.strip().upper() for v in str_value.split(',')]
+        self.regex              = re.compile(str_value, re.IGNORECASE) if '~' in op else None
+        self.number     : float = float(str_value) if op in ('>', '>=', '<', '<=') else None
+
+    def __str__(self) -> str:
+        return '%s%s%s' % (self.keyword, self.op, self.str_value)
+
+    def value_holds(self, value) -> bool:
+        if self.op in ('=', '!='):
+            return str(value).strip().upper() in self.l_value
+        if self.op in ('~', '!~'):
+            return bool(self.regex.search(str(value)))
+        try:
+            number  : float = float(value)
+        except (TypeError, ValueError):
+            return False
+        return {
+            '>'     : number >  self.number,
+            '>='    : number >= self.number,
+            '<'     : number <  self.number,
+            '<='    : number <= self.number
+        }[self.op]
+
+    def holds(self, d_header : dict) -> bool:
+        """
+        Does the clause hold for the header values <d_header>?
+        """
+        b_negated   : bool  = self.op.startswith('!')
+        if self.keyword not in d_header:
+            return b_negated
+        value               = d_header[self.keyword]
+        l_value     : list  = value if isinstance(value, list) else [value]
+        if b_negated:
+            return not any(self.value_holds(v) for v in l_value)
+        return any(self.value_holds(v) for v in l_value)
+
+class HeaderCriteria:
+    '''
+    A header-only DICOM predicate: the criteria <str_spec> (see above; a
+    string, or a file holding them, one clause per line or ';' separated)
+    are checked against the few tags they need, read from the head of
+    each object without its pixel data. An object that is a directory,
+    or a list of files (a batch), passes only if all of its files do.
+    '''
+
+    def __init__(self, str_spec : str, *args, **kwargs):
+        self.l_criterion    : list  = []
+        if str_spec and Path(str_spec).is_file():
+            str_spec    = Path(str_spec).read_text()
+        for str_clause in filter(None, (s.strip() for s in re.split(r'[;\n]', str_spec or ''))):
+            match   = re.fullmatch(r'(\w+)\s*(!=|!~|>=|<=|=|~|>|<)\s*(.*)', str_clause)
+            if not match:
+                raise ValueError("header criterion '%s' is not of form <keyword><op><value>" % str_clause)
+            if match[1] not in dicom.TAGS:
+                raise ValueError("unknown DICOM keyword '%s' (known: %s)" % (match[1], ', '.join(dicom.TAGS)))
+            self.l_criterion.append(Criterion(*match.groups()))
+        self.l_keyword      : list  = sorted({c.keyword for c in self.l_criterion})
+
+    def __bool__(self) -> bool:
+        return bool(self.l_criterion)
+
+    def header_check(self, d_header : dict) -> str:
+        """
+        The first clause that does not hold for <d_header>, as a reason,
+        or '' if all hold.
+        """
+        for criterion in self.l_criterion:
+            if not criterion.holds(d_header):
+                return 'header fails %s (%s=%s)' % (
+                    criterion, criterion.keyword, d_header.get(criterion.keyword, '<missing>')
+                )
+        return ''
+
+    def reason(self, str_object : str | list) -> str:
+        """
+        Why <str_object> -- a file, a directory or a list of files -- is
+        rejected, or '' if it passes. A directory or list is rejected for
+        its first file that fails.
+        """
+        if not self.l_criterion:
+            return ''
+        if isinstance(str_object, list) or Path(str_object).is_dir():
+            l_file  : list  = str_object if isinstance(str_object, list) else sorted(
+                str(p) for p in Path(str_object).iterdir() if p.is_file()
+            )
+            for str_file in l_file:
+                str_reason  : str   = self.reason(str_file)
+                if str_reason:
+                    return '%s: %s' % (Path(str_file).name, str_reason)
+            return ''
+        try:
+            d_header    : dict  = dicom.header_read(str_object, self.l_keyword)
+        except OSError as e:
+            return 'header unreadable: %s' % e
+        return self.header_check(d_header)
+
+    def __call__(self, str_object : str | list) -> bool:
+        return not self.reason(str_object)
+
 class Filter:
     '''
     An abstraction for evaluating a "condition" on some "object".
@@ -27,4 +176,139 @@ class Filter:
         self.filterOp = None
 
     def obj_pass(self, str_object: str) -> bool:
-        return self.filterOp(str_object)
\ No newline at end of file
+        return self.filterOp(str_object)
+
+class FilterVerdict:
+    '''
+    The outcome of filtering a set of objects: an accept mask, one byte
+    per object, and the reason for each rejection, by object index.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.mask           : bytearray = bytearray()
+        self.d_reason       : dict      = {}
+
+    def verdicts_add(self, l_reason : list) -> None:
+        """
+        Add the verdicts of the next objects, given as their rejection
+        reasons ('' for an accepted object).
+        """
+        for str_reason in l_reason:
+            if str_reason:
+                self.d_reason[len(self.mask)]   = str_reason
+            self.mask.append(not str_reason)
+
+    @property
+    def accepted(self) -> int:
+        return len(self.mask) - len(self.d_reason)
+
+    @property
+    def rejected(self) -> int:
+        return len(self.d_reason)
+
+def chunk_evaluate(criteria : HeaderCriteria, l_object : list) -> list:
+    """
+    The rejection reason ('' if accepted) of each object in <l_object>;
+    run in a pool process.
+    """
+    return [criteria.reason(str_object) for str_object in l_object]
+
+def pool_context() -> multiprocessing.context.BaseContext:
+    """
+    The multiprocessing context of the evaluation pool: a fork server
+    where there is one, else spawned processes -- never a plain fork.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+def chunks_evaluate(
+        criteria    : HeaderCriteria,
+        objects     : Iterator,
+        workers     : int = 0,
+        chunk       : int = 512
+    ) -> Iterator[tuple[list, list]]:
+    """
+    Evaluate <criteria> over <objects> (str paths, or lists of them for
+    batches), <chunk> at a time, across <workers> processes (the CPU
+    count if 0), with at most two chunks per worker in flight so that
+    <objects> can be streamed. A
+    first chunk that is not full -- a small input set -- is evaluated in
+    process, to spare starting the pool.
+
+    Yields:
+        tuple[list, list]: each chunk of objects, in order, with the
+                           rejection reason of each
+    """
+    objects                 = iter(objects)
+    l_first     : list      = list(itertools.islice(objects, chunk))
+    if len(l_first) < chunk:
+        if l_first:
+            yield l_first, chunk_evaluate(criteria, l_first)
+        return
+    workers                 = workers or os.cpu_count() or 1
+    q_inflight  : deque     = deque()
+    # the controller is multithreaded by now (the poller, the status
+    # writer, ...), and a forked child could inherit a held lock
+    with ProcessPoolExecutor(max_workers = workers, mp_context = pool_context()) as pool:
+        l_chunk : list      = l_first
+        while l_chunk or q_inflight:
+            while l_chunk and len(q_inflight) < 2 * workers:
+                q_inflight.append((l_chunk, pool.submit(chunk_evaluate, criteria, l_chunk)))
+                l_chunk     = list(itertools.islice(objects, chunk))
+            l_done, future  = q_inflight.popleft()
+            yield l_done, future.result()
+
+def objects_evaluate(
+        l_object    : list,
+        criteria    : HeaderCriteria,
+        **kwargs
+    ) -> FilterVerdict:
+    """
+    Evaluate <criteria> over the whole object set <l_object> (str paths)
+    in chunks across a process pool; kwargs as for `chunks_evaluate`.
+
+    Returns:
+        FilterVerdict: the accept mask and rejection reasons
+    """
+    verdict     : FilterVerdict = FilterVerdict()
+    for _, l_reason in chunks_evaluate(criteria, l_object, **kwargs):
+        verdict.verdicts_add(l_reason)
+    return verdict
+
+def mapper_filter(
+        mapper      : Iterator,
+        criteria    : HeaderCriteria,
+        on_reject   : Callable[[Any, str], None] = lambda input, str_reason: None,
+        verdict     : FilterVerdict = None,
+        **kwargs
+    ) -> Iterator:
+    """
+    Pass through the (input, output) tuples of <mapper> whose input meets
+    <criteria>, evaluated in chunks across a process pool (kwargs as for
+    `chunks_evaluate`) as the mapper yields them. Each rejected input is
+    reported to <on_reject> with the reason, and every verdict is added
+    to <verdict>, if given. A batch input (one with the paths of its
+    files, `l_path`) is judged on those files.
+
+    Returns:
+        Iterator: the accepted (input, output) tuples, in order
+    """
+    if not criteria:
+        yield from mapper
+        return
+    q_tuple     : deque = deque()
+    def objects() -> Iterator[str | list]:
+        for t_input in mapper:
+            q_tuple.append(t_input)
+            l_path  : list  = getattr(t_input[0], 'l_path', None)
+            yield [str(p) for p in l_path] if l_path else str(t_input[0])
+    for _, l_reason in chunks_evaluate(criteria, objects(), **kwargs):
+        if verdict is not None:
+            verdict.verdicts_add(l_reason)
+        for str_reason in l_reason:
+            t_input     : tuple = q_tuple.popleft()
+            if str_reason:
+                on_reject(t_input[0], str_reason)
+            else:
+                yield t_input
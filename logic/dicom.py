@@ -0,0 +1,200 @@
+str_about = '''
+    The dicom module reads a handful of tags from the header of a DICOM
+    file, without a DICOM library and without reading the pixel data.
+
+    The file is memory-mapped and its data elements are walked in order
+    (they are sorted by tag) only as far as the last tag asked for, so
+    that the cost is that of a few page faults at the head of the file,
+    whatever its size. Explicit and implicit VR little endian, and
+    explicit VR big endian, transfer syntaxes are understood; sequences
+    of undefined length are skipped over. Deflated datasets are not read.
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  mmap
+import  struct
+from    pathlib                 import Path
+
+# keyword: ((group, element), VR) of the tags that can be read
+TAGS            : dict  = {
+    'ImageType'                 : ((0x0008, 0x0008), 'CS'),
+    'SOPClassUID'               : ((0x0008, 0x0016), 'UI'),
+    'StudyDate'                 : ((0x0008, 0x0020), 'DA'),
+    'SeriesDate'                : ((0x0008, 0x0021), 'DA'),
+    'StudyTime'                 : ((0x0008, 0x0030), 'TM'),
+    'SeriesTime'                : ((0x0008, 0x0031), 'TM'),
+    'Modality'                  : ((0x0008, 0x0060), 'CS'),
+    'StudyDescription'          : ((0x0008, 0x1030), 'LO'),
+    'SeriesDescription'         : ((0x0008, 0x103E), 'LO'),
+    'PatientID'                 : ((0x0010, 0x0020), 'LO'),
+    'BodyPartExamined'          : ((0x0018, 0x0015), 'CS'),
+    'ViewPosition'              : ((0x0018, 0x5101), 'CS'),
+    'StudyInstanceUID'          : ((0x0020, 0x000D), 'UI'),
+    'SeriesInstanceUID'         : ((0x0020, 0x000E), 'UI'),
+    'SeriesNumber'              : ((0x0020, 0x0011), 'IS'),
+    'InstanceNumber'            : ((0x0020, 0x0013), 'IS'),
+    'SamplesPerPixel'           : ((0x0028, 0x0002), 'US'),
+    'PhotometricInterpretation' : ((0x0028, 0x0004), 'CS'),
+    'Rows'                      : ((0x0028, 0x0010), 'US'),
+    'Columns'                   : ((0x0028, 0x0011), 'US'),
+    'BitsAllocated'             : ((0x0028, 0x0100), 'US'),
+}
+d_TAGVR         : dict  = {tag: vr for tag, vr in TAGS.values()}
+d_TAGKEYWORD    : dict  = {tag: k for k, (tag, _) in TAGS.items()}
+
+PIXELDATA       : tuple = (0x7FE0, 0x0010)
+TS_IMPLICIT     : str   = '1.2.840.10008.1.2'
+TS_BIGENDIAN    : str   = '1.2.840.10008.1.2.2'
+TS_DEFLATED     : str   = '1.2.840.10008.1.2.1.99'
+# explicit VRs with a 2 byte reserved field and a 4 byte length
+VR_LONG         : set   = {b'OB', b'OD', b'OF', b'OL', b'OV', b'OW', b'SQ', b'SV',
+                           b'UC', b'UN', b'UR', b'UT', b'UV'}
+UNDEFINED       : int   = 0xFFFFFFFF
+ITEM            : tuple = (0xFFFE, 0xE000)
+ITEM_END        : tuple = (0xFFFE, 0xE00D)
+SEQUENCE_END    : tuple = (0xFFFE, 0xE0DD)
+
+class DatasetReader:
+    '''
+    A sequential reader of the data elements in <buf> from offset <pos>.
+    '''
+
+    def __init__(self, buf, pos : int, b_explicit : bool = True, b_little : bool = True):
+        self.buf            = buf
+        self.pos            : int       = pos
+        self.b_explicit     : bool      = b_explicit
+        self.str_endian     : str       = '<' if b_little else '>'
+
+    def tag_peek(self) -> tuple:
+        return struct.unpack_from(self.str_endian + 'HH', self.buf, self.pos)
+
+    def element_next(self) -> tuple:
+        """
+        Read the next element header and move past its value.
+
+        Returns:
+            tuple: (tag, VR (None if implicit), value offset, value length);
+                   the length of a value of undefined length is that of
+                   its encoding up to (not including) its delimiter
+        """
+        tag         : tuple = self.tag_peek()
+        vr          : str   = None
+        if self.b_explicit and tag[0] != 0xFFFE:
+            vr      = bytes(self.buf[self.pos + 4:self.pos + 6])
+            if vr in VR_LONG:
+                length  = struct.unpack_from(self.str_endian + 'I', self.buf, self.pos + 8)[0]
+                self.pos   += 12
+            else:
+                length  = struct.unpack_from(self.str_endian + 'H', self.buf, self.pos + 6)[0]
+                self.pos   += 8
+            vr      = vr.decode('ascii', 'replace')
+        else:
+            length  = struct.unpack_from(self.str_endian + 'I', self.buf, self.pos + 4)[0]
+            self.pos   += 8
+        start       : int   = self.pos
+        if length == UNDEFINED:
+            self.undefined_skip()
+            return tag, vr, start, self.pos - start
+        self.pos   += length
+        return tag, vr, start, length
+
+    def undefined_skip(self, delimiter : tuple = SEQUENCE_END) -> None:
+        """
+        Skip a sequence (or, with an ITEM_END <delimiter>, an item) of
+        undefined length, up to and past its delimiter.
+        """
+        while True:
+            tag     : tuple = self.tag_peek()
+            if tag == delimiter:
+                self.pos   += 8
+                return
+            if tag == ITEM:
+                length  = struct.unpack_from(self.str_endian + 'I', self.buf, self.pos + 4)[0]
+                self.pos   += 8
+                if length == UNDEFINED:
+                    self.undefined_skip(ITEM_END)
+                else:
+                    self.pos   += length
+                continue
+            self.element_next()
+
+def value_decode(buf, vr : str, b_little : bool = True) -> str | int | list:
+    """
+    The value of an element of VR <vr> in <buf>: US/UL as an int, text
+    as a str (a list of str if multi-valued).
+    """
+    str_endian  : str   = '<' if b_little else '>'
+    if vr in ('US', 'UL', 'SS', 'SL'):
+        str_fmt = {'US': 'H', 'UL': 'I', 'SS': 'h', 'SL': 'i'}[vr]
+        l_value = list(struct.unpack(str_endian + str_fmt * (len(buf) // struct.calcsize(str_fmt)), buf))
+        return l_value[0] if len(l_value) == 1 else l_value
+    str_value   : str   = bytes(buf).decode('latin-1').strip('\x00 ')
+    if '\\' in str_value:
+        return [s.strip() for s in str_value.split('\\')]
+    return str_value
+
+def header_read(path : Path | str, l_keyword : list = None) -> dict:
+    """
+    Read the tags <l_keyword> (see TAGS; all of them by default) from the
+    header of the DICOM file <path>.
+
+    Args:
+        path (Path | str):  the DICOM file
+        l_keyword (list):   the keywords of the tags to read
+
+    Returns:
+        dict: the value of each tag found, by keyword; a file that is not
+              DICOM (or cannot be parsed) gives what was read before the
+              problem, if anything
+    """
+    l_keyword       = list(TAGS) if l_keyword is None else l_keyword
+    s_want  : set   = {TAGS[k][0] for k in l_keyword}
+    d_value : dict  = {}
+    if not s_want: return d_value
+    lastTag : tuple = max(s_want)
+    with open(path, 'rb') as fp:
+        if os.fstat(fp.fileno()).st_size < 8:
+            return d_value
+        with mmap.mmap(fp.fileno(), 0, access = mmap.ACCESS_READ) as buf:
+            try:
+                reader  : DatasetReader = dataset_open(buf)
+                if reader is None: return d_value
+                while reader.pos + 8 <= len(buf):
+                    tag     = reader.tag_peek()
+                    if tag > lastTag or tag >= PIXELDATA: break
+                    tag, vr, start, length = reader.element_next()
+                    if tag in s_want:
+                        d_value[d_TAGKEYWORD[tag]]  = value_decode(
+                            buf[start:start + length], vr or d_TAGVR[tag], reader.str_endian == '<'
+                        )
+            except (struct.error, IndexError, ValueError):
+                pass
+    return d_value
+
+def dataset_open(buf) -> DatasetReader | None:
+    """
+    A reader positioned at the first element of the dataset in <buf>
+    (after any Part 10 preamble and file meta group), in the dataset's
+    transfer syntax -- or None if the dataset is deflated.
+    """
+    pos         : int   = 0
+    str_ts      : str   = ''
+    if len(buf) >= 132 and buf[128:132] == b'DICM':
+        # the file meta group is always explicit VR little endian
+        meta    : DatasetReader = DatasetReader(buf, 132)
+        while meta.pos + 8 <= len(buf) and meta.tag_peek()[0] == 0x0002:
+            tag, vr, start, length = meta.element_next()
+            if tag == (0x0002, 0x0010):
+                str_ts  = bytes(buf[start:start + length]).decode('ascii').strip('\x00 ')
+        pos     = meta.pos
+    elif len(buf) >= 6 and not bytes(buf[4:6]).isalpha():
+        # no preamble, and no VR after the first tag
+        str_ts  = TS_IMPLICIT
+    if str_ts == TS_DEFLATED:
+        return None
+    return DatasetReader(
+        buf, pos,
+        b_explicit  = str_ts != TS_IMPLICIT,
+        b_little    = str_ts != TS_BIGENDIAN
+    )
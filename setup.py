@@ -29,10 +29,12 @@ setup(
     py_modules          = ['dylld'],
     install_requires    = ['chris_plugin', 'pflogf', 'pudb', 'plog', 'pftag'],
     packages            =  ['control', 'logic', 'state'],
+    package_data        = {'control': ['*.json']},
     license             = 'MIT',
     entry_points        = {
         'console_scripts': [
-            'dylld = dylld:main'
+            'dylld = dylld:main',
+            'dylld_mergelogs = state.sink:merge_main'
         ]
     },
     classifiers         =[
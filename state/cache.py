@@ -0,0 +1,254 @@
+str_about = '''
+    This module provides a process-wide, thread-safe cache of CUBE
+    "metadata" -- the pipelines, plugin descriptors and pipeline default
+    parameters that every tree in a growth cycle needs but that never
+    change during a run.
+
+    Without this cache each tree would construct its own client and
+    re-fetch identical metadata before doing any real work. Here, the
+    metadata is fetched once (typically primed at startup) and then
+    shared by all `LLDcomputeflow` and `PluginRun` instances.
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  threading
+import  time
+from    typing                  import Any, Callable
+from    chrisclient             import client
+from    .                       import data
+from    .                       import shared
+
+class CUBEmetaCache:
+    '''
+    A thread-safe key/value cache of CUBE metadata with an optional
+    time-to-live and explicit invalidation. Concurrent lookups of the
+    same missing key are collapsed so that only one thread performs
+    the actual CUBE round-trip.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.ttl            : float         = 0.0
+        self.cl             : client.Client = None
+        self.clientWrap     : Callable      = None
+        self.d_auth         : dict          = {}
+        self.d_entry        : dict          = {}
+        self.d_keyLock      : dict          = {}
+        self.lock           : threading.RLock   = threading.RLock()
+        self.d_stats        : dict          = {
+            'hits'      : 0,
+            'misses'    : 0
+        }
+
+        for k, v in kwargs.items():
+            if k == 'ttl'       : self.ttl          = float(v)
+            if k == 'clientWrap': self.clientWrap   = v
+
+    def connect(self, str_url : str, str_user : str, str_password : str) -> client.Client:
+        """
+        Return the shared client for the given CUBE, creating it on first
+        use. Connecting to a different CUBE (or as a different user)
+        discards all cached metadata. If the cache has a <clientWrap>,
+        the client is wrapped by it (e.g. for admission control).
+
+        Args:
+            str_url (str):      CUBE API URL
+            str_user (str):     CUBE username
+            str_password (str): CUBE password
+
+        Returns:
+            client.Client: the shared client
+        """
+        d_auth  : dict  = {
+            'url'       : str_url,
+            'username'  : str_user,
+            'password'  : str_password
+        }
+        with self.lock:
+            if self.cl is None or d_auth != self.d_auth:
+                self.invalidate()
+                self.d_auth = d_auth
+                self.cl     = self.client_wrap(
+                                client.Client(str_url, str_user, str_password)
+                            )
+            return self.cl
+
+    def client_wrap(self, cl : Any) -> Any:
+        if self.clientWrap is None: return cl
+        return self.clientWrap(cl)
+
+    def request(self) -> client.Request:
+        """
+        Return a Request object using the shared credentials
+
+        Returns:
+            client.Request: a request object
+        """
+        return self.client_wrap(
+            client.Request(self.d_auth['username'], self.d_auth['password'])
+        )
+
+    def entry_isFresh(self, d_entry : dict) -> bool:
+        if not self.ttl: return True
+        return (time.monotonic() - d_entry['timestamp']) < self.ttl
+
+    def get(self, key : Any, fetch : Callable[[], Any]) -> Any:
+        """
+        Return the cached value for <key>, calling <fetch> to populate
+        it if it is missing or stale.
+
+        Args:
+            key (Any):          a hashable cache key
+            fetch (Callable):   zero-argument function returning the value
+
+        Returns:
+            Any: the cached value
+        """
+        with self.lock:
+            d_entry     = self.d_entry.get(key)
+            if d_entry and self.entry_isFresh(d_entry):
+                self.d_stats['hits']    += 1
+                return d_entry['value']
+            keyLock     = self.d_keyLock.setdefault(key, threading.Lock())
+
+        with keyLock:
+            # another thread may have filled this while we waited
+            with self.lock:
+                d_entry = self.d_entry.get(key)
+                if d_entry and self.entry_isFresh(d_entry):
+                    self.d_stats['hits']    += 1
+                    return d_entry['value']
+                self.d_stats['misses']  += 1
+            value       = fetch()
+            with self.lock:
+                self.d_entry[key] = {
+                    'timestamp' : time.monotonic(),
+                    'value'     : value
+                }
+        return value
+
+    def invalidate(self, key : Any = None) -> None:
+        """
+        Drop <key> from the cache, or everything if no key is given.
+
+        Args:
+            key (Any, optional): the key to drop. Defaults to None.
+        """
+        with self.lock:
+            if key is None:
+                self.d_entry.clear()
+            else:
+                self.d_entry.pop(key, None)
+
+    def pipelineWithName_get(self, str_pipelineName : str) -> dict:
+        """
+        The search result for pipelines matching <str_pipelineName>
+        """
+        return self.get(
+            ('pipeline', str_pipelineName),
+            lambda: self.cl.get_pipelines({'name': str_pipelineName})
+        )
+
+    def pipelineDefaultParameters_get(self, id_pipeline : int) -> dict:
+        """
+        The default parameters of pipeline <id_pipeline>. Callers must
+        not modify the returned structure.
+        """
+        return self.get(
+            ('pipelineDefaults', id_pipeline),
+            lambda: self.cl.get_pipeline_default_parameters(
+                        id_pipeline, {'limit': 1000}
+                    )
+        )
+
+    def pipelineTemplate_get(self, str_pipelineName : str) -> data.Pipeline:
+        """
+        The compiled node template of the pipeline matching
+        <str_pipelineName>. An unknown pipeline yields an empty template
+        with id -1.
+        """
+        def template_build() -> data.Pipeline:
+            d_pipeline  : dict  = self.pipelineWithName_get(str_pipelineName)
+            if not d_pipeline.get('data'):
+                return data.Pipeline(name = str_pipelineName)
+            id_pipeline : int   = d_pipeline['data'][0]['id']
+            d_response  : dict  = self.pipelineDefaultParameters_get(id_pipeline)
+            return data.Pipeline(
+                name    = str_pipelineName,
+                id      = id_pipeline,
+                nodes   = self.cl.compute_workflow_nodes_info(
+                            d_response.get('data', []), True
+                        )
+            )
+        return self.get(('pipelineTemplate', str_pipelineName), template_build)
+
+    def pluginWithName_get(self, str_pluginName : str) -> dict:
+        """
+        The search result for plugins with name <str_pluginName>
+        """
+        return self.get(
+            ('plugin', str_pluginName),
+            lambda: self.cl.get_plugins({'name': str_pluginName})
+        )
+
+    def pluginID_get(self, str_pluginName : str) -> int:
+        """
+        The id of the (first) plugin with name <str_pluginName>, or -1
+        """
+        d_plugin    : dict  = self.pluginWithName_get(str_pluginName)
+        if d_plugin.get('data'):
+            return d_plugin['data'][0]['id']
+        return -1
+
+    def pluginParameters_get(self, plugin_id : int) -> dict:
+        """
+        The parameter descriptors (flag, name, type, ...) of plugin
+        <plugin_id>
+        """
+        return self.get(
+            ('pluginParameters', plugin_id),
+            lambda: self.cl.get_plugin_parameters(plugin_id, {'limit': 1000})
+        )
+
+    def pluginFlagMap_get(self, str_pluginName : str) -> dict:
+        """
+        A map of CLI flag (e.g. '--fileFilter') to CUBE parameter name for
+        plugin <str_pluginName> -- CUBE expects the latter when creating
+        plugin instances.
+        """
+        def flagMap_build() -> dict:
+            plugin_id   : int   = self.pluginID_get(str_pluginName)
+            if plugin_id < 0: return {}
+            return {
+                d_param['flag']: d_param['name']
+                for d_param in self.pluginParameters_get(plugin_id)['data']
+            }
+        return self.get(('pluginFlagMap', str_pluginName), flagMap_build)
+
+    def prime(self, l_pluginName : list = [], l_pipelineName : list = []) -> dict:
+        """
+        Populate the cache up front so that trees never pay the metadata
+        round-trips themselves.
+
+        Args:
+            l_pluginName (list):    names of plugins to resolve (along
+                                    with their parameter flags)
+            l_pipelineName (list):  names of pipelines to compile into
+                                    node templates
+
+        Returns:
+            dict: the number of plugins and pipelines resolved
+        """
+        pipelinesResolved   : int   = 0
+        for str_plugin in l_pluginName:
+            self.pluginFlagMap_get(str_plugin)
+        for str_pipeline in l_pipelineName:
+            if self.pipelineTemplate_get(str_pipeline).id >= 0:
+                pipelinesResolved += 1
+        return {
+            'plugins'   : len(l_pluginName),
+            'pipelines' : pipelinesResolved
+        }
+
+# the process-wide metadata cache (see `shared.Shared`)
+sharedCache_get = shared.Shared(CUBEmetaCache).get
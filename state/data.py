@@ -303,9 +303,102 @@ class Pipeline:
     Information pertinent to the pipline being scheduled. This is
     encapsulated with a class object to allow for possible future
     expansion.
+
+    A Pipeline is an immutable, indexed template of the workflow nodes
+    of a CUBE pipeline (as returned by `compute_workflow_nodes_info`),
+    resolved once and then instantiated cheaply, and without any API
+    calls, for each tree. Nodes are shared between instances and only
+    copied when an instance overrides one of their parameters.
     '''
 
     def __init__(self, *args, **kwargs):
 
         self.str_pipelineName       = ''
+        self.id             : int   = -1
+        self.t_node         : tuple = ()
+        self.d_titleIndex   : dict  = {}
+        self.d_slotIndex    : dict  = {}
+
+        for k,v in kwargs.items():
+            if k == 'name'  : self.str_pipelineName = v
+            if k == 'id'    : self.id               = v
+            if k == 'nodes' : self.t_node           = tuple(
+                {key: val for key, val in node.items() if key != 'compute_resource_name'}
+                for node in v
+            )
+
+    def nodes_withTitle(self, str_title : str) -> tuple:
+        """
+        The indices of the nodes whose title contains <str_title>
 
+        Args:
+            str_title (str): a title substring
+
+        Returns:
+            tuple: matching node indices
+        """
+        t_index     : tuple = self.d_titleIndex.get(str_title)
+        if t_index is None:
+            t_index = tuple(
+                i for i, node in enumerate(self.t_node)
+                if str_title in node.get('title', '')
+            )
+            self.d_titleIndex[str_title] = t_index
+        return t_index
+
+    def slots_withName(self, nodeIndex : int, str_param : str) -> tuple:
+        """
+        The indices into the 'plugin_parameter_defaults' of node
+        <nodeIndex> whose parameter name contains <str_param>
+
+        Args:
+            nodeIndex (int):    the node index
+            str_param (str):    a parameter name substring
+
+        Returns:
+            tuple: matching parameter slot indices
+        """
+        t_slot      : tuple = self.d_slotIndex.get((nodeIndex, str_param))
+        if t_slot is None:
+            t_slot  = tuple(
+                i for i, d_default in enumerate(
+                    self.t_node[nodeIndex].get('plugin_parameter_defaults', [])
+                )
+                if str_param in d_default.get('name', '')
+            )
+            self.d_slotIndex[(nodeIndex, str_param)] = t_slot
+        return t_slot
+
+    def instantiate(self, d_pluginParameters : dict = {}) -> list:
+        """
+        Return the workflow nodes of this pipeline with the default
+        parameters overridden as per <d_pluginParameters>, a dictionary
+        of {<node title>: {<parameter name>: <value>}}. As with the rest
+        of this plugin, titles and names match on substrings.
+
+        Args:
+            d_pluginParameters (dict): parameter overrides
+
+        Returns:
+            list: a nodes_info list suitable for creating a workflow
+        """
+        l_node      : list  = list(self.t_node)
+        s_copied    : set   = set()
+        for str_title, d_parameters in d_pluginParameters.items():
+            for i in self.nodes_withTitle(str_title):
+                for str_param, value in d_parameters.items():
+                    t_slot  : tuple = self.slots_withName(i, str_param)
+                    if not t_slot: continue
+                    if i not in s_copied:
+                        l_node[i]   = {
+                            **l_node[i],
+                            'plugin_parameter_defaults':
+                                list(l_node[i]['plugin_parameter_defaults'])
+                        }
+                        s_copied.add(i)
+                    for slot in t_slot:
+                        l_node[i]['plugin_parameter_defaults'][slot] = {
+                            **l_node[i]['plugin_parameter_defaults'][slot],
+                            'default'   : value
+                        }
+        return l_node
@@ -0,0 +1,311 @@
+str_about = '''
+    The dedup module keeps a persistent index of the inputs that have
+    already been grown into trees, keyed by the content hash of the
+    input, so that the same DICOM data -- seen in an earlier run, or
+    appearing twice in one input -- is not sent through the compute flow
+    again.
+
+    The index is a small sqlite database with two tables:
+
+        hashes      path, size and mtime -> content digest; a cache so
+                    that files are only re-hashed if they have changed
+
+        trees       content digest -> the input, seed and feed of the
+                    tree that processed it
+
+    Hashing is done in parallel threads (hashlib releases the GIL while
+    it digests large buffers).
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  hashlib
+import  itertools
+import  sqlite3
+import  threading
+import  time
+from    pathlib                 import Path
+from    typing                  import Any, Callable, Iterator
+from    concurrent.futures      import ThreadPoolExecutor
+from    .                       import shared
+
+HASH_BLOCK      : int   = 1 << 20
+
+def file_digest(path : Path) -> str:
+    """
+    The content digest of the file at <path>
+
+    Args:
+        path (Path): the file
+
+    Returns:
+        str: hex digest
+    """
+    h       = hashlib.blake2b(digest_size = 20)
+    with open(path, 'rb') as fp:
+        while block := fp.read(HASH_BLOCK):
+            h.update(block)
+    return h.hexdigest()
+
+def input_files(input : Any) -> list:
+    """
+    The files that make up a mapper <input>: the file itself, the files
+    of a directory (in-node), or the files of a planned batch.
+
+    Args:
+        input (Any): a mapper input (Path or granularity.Batch)
+
+    Returns:
+        list: the file Paths
+    """
+    l_path  : list  = getattr(input, 'l_path', None)
+    if l_path is not None:
+        return list(l_path)
+    path    : Path  = Path(input)
+    if path.is_dir():
+        return sorted(p for p in path.iterdir() if p.is_file())
+    return [path]
+
+class DedupIndex:
+    '''
+    A persistent content-hash index of the inputs that have been grown
+    into trees.
+
+        path        the sqlite database file; with no path the index is
+                    disabled and every input is passed through
+        threads     the number of threads hashing files
+        window      the number of inputs hashed together
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.path           : Path              = None
+        self.threads        : int               = 8
+        self.window         : int               = 256
+        self.db             : sqlite3.Connection = None
+        self.lock           : threading.Lock    = threading.Lock()
+        self.d_pending      : dict              = {}
+        self.d_inputDigest  : dict              = {}
+        self.d_stats        : dict              = {
+            'inputs'        : 0,
+            'duplicates'    : 0,
+            'hashed'        : 0,
+            'cached'        : 0
+        }
+
+        for k, v in kwargs.items():
+            if k == 'path'      : self.path     = Path(v) if v else None
+            if k == 'threads'   : self.threads  = max(1, int(v))
+            if k == 'window'    : self.window   = max(1, int(v))
+
+        if self.path:
+            self.db     = sqlite3.connect(str(self.path), check_same_thread = False)
+            self.db.executescript('''
+                CREATE TABLE IF NOT EXISTS hashes (
+                    path    TEXT PRIMARY KEY,
+                    size    INTEGER,
+                    mtime   INTEGER,
+                    digest  TEXT
+                );
+                CREATE TABLE IF NOT EXISTS trees (
+                    digest  TEXT PRIMARY KEY,
+                    input   TEXT,
+                    seed    INTEGER,
+                    feed    INTEGER,
+                    stamp   REAL
+                );
+            ''')
+            self.db.commit()
+
+    def digests_get(self, l_path : list) -> dict:
+        """
+        The content digest of each file in <l_path>, from the cache where
+        the file is unchanged, otherwise hashed in parallel.
+
+        Args:
+            l_path (list): file Paths
+
+        Returns:
+            dict: {<path str>: <digest>}
+        """
+        d_digest    : dict  = {}
+        d_stat      : dict  = {str(p): os.stat(p) for p in l_path}
+        with self.lock:
+            for str_path, stat in d_stat.items():
+                row     = self.db.execute(
+                    'SELECT digest FROM hashes WHERE path = ? AND size = ? AND mtime = ?',
+                    (str_path, stat.st_size, stat.st_mtime_ns)
+                ).fetchone()
+                if row: d_digest[str_path] = row[0]
+        l_hash      : list  = [p for p in d_stat if p not in d_digest]
+        with ThreadPoolExecutor(max_workers = self.threads) as pool:
+            d_digest.update(zip(l_hash, pool.map(file_digest, l_hash)))
+        with self.lock:
+            self.db.executemany(
+                'INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?)',
+                [
+                    (p, d_stat[p].st_size, d_stat[p].st_mtime_ns, d_digest[p])
+                    for p in l_hash
+                ]
+            )
+            self.db.commit()
+            self.d_stats['hashed'] += len(l_hash)
+            self.d_stats['cached'] += len(d_stat) - len(l_hash)
+        return d_digest
+
+    @staticmethod
+    def digest_combine(l_digest : list) -> str:
+        """
+        The digest of an input made of several files: independent of the
+        order (and names) of the files.
+        """
+        if len(l_digest) == 1: return l_digest[0]
+        h       = hashlib.blake2b(digest_size = 20)
+        for str_digest in sorted(l_digest):
+            h.update(str_digest.encode())
+        return h.hexdigest()
+
+    def tree_lookup(self, str_digest : str) -> dict:
+        """
+        The tree that already processed content <str_digest>, if any.
+
+        Returns:
+            dict: {'input', 'seed', 'feed'} or an empty dict
+        """
+        with self.lock:
+            row = self.db.execute(
+                'SELECT input, seed, feed FROM trees WHERE digest = ?', (str_digest,)
+            ).fetchone()
+        if not row: return {}
+        return {'input': row[0], 'seed': row[1], 'feed': row[2]}
+
+    def held_check(self,
+            d_held          : dict,
+            on_duplicate    : Callable[[Any, dict], None],
+            b_final         : bool = False
+        ) -> list:
+        """
+        Re-check the duplicates in <d_held> (lists of (input, output)
+        tuples keyed on content digest) of trees that were still growing
+        when they were read. The duplicates of a tree that has since been
+        recorded are reported to <on_duplicate>. If the tree failed --
+        or, if <b_final>, is still growing -- the first duplicate is
+        returned to be grown after all, and the rest are kept in <d_held>
+        to wait on it.
+
+        Returns:
+            list: the (input, output) tuples to grow
+        """
+        l_grow      : list  = []
+        for str_digest in list(d_held):
+            d_tree  : dict  = self.tree_lookup(str_digest)
+            with self.lock:
+                if not d_tree and str_digest in self.d_pending and not b_final:
+                    continue
+                l_input : list  = d_held.pop(str_digest)
+                if d_tree:
+                    self.d_stats['duplicates'] += len(l_input)
+                else:
+                    input, output   = l_input.pop(0)
+                    self.d_pending.setdefault(str_digest, str(input))
+                    self.d_inputDigest[str(input)]  = str_digest
+                    l_grow.append((input, output))
+                    if l_input: d_held[str_digest] = l_input
+            if d_tree:
+                for input, _ in l_input:
+                    on_duplicate(input, d_tree)
+        return l_grow
+
+    def inputs_filter(self,
+            mapper          : Iterator,
+            on_duplicate    : Callable[[Any, dict], None] = lambda input, d_tree: None
+        ) -> Iterator:
+        """
+        Pass through the (input, output) tuples of <mapper> whose content
+        has not already been grown into a tree -- neither in an earlier
+        run nor earlier in this one. Each duplicate is instead reported to
+        <on_duplicate> with the tree that has its content.
+
+        Only duplicates of trees that were fully grown are skipped. A
+        duplicate of a tree that is still growing is held back until that
+        tree ends: if it failed, the duplicate is grown instead; if it is
+        still growing once <mapper> is exhausted, the duplicate is grown
+        as well.
+
+        Args:
+            mapper (Iterator):      yields (input, output) tuples
+            on_duplicate (Callable): called as on_duplicate(input, d_tree)
+
+        Returns:
+            Iterator: the non-duplicate (input, output) tuples
+        """
+        mapper  = iter(mapper)
+        if not self.db:
+            yield from mapper
+            return
+        d_held          : dict  = {}
+        while l_window := list(itertools.islice(mapper, self.window)):
+            yield from self.held_check(d_held, on_duplicate)
+            l_files     : list  = [input_files(input) for input, _ in l_window]
+            d_digest    : dict  = self.digests_get([p for l in l_files for p in l])
+            for (input, output), l_path in zip(l_window, l_files):
+                if not l_path:
+                    yield input, output
+                    continue
+                str_digest  : str   = self.digest_combine([d_digest[str(p)] for p in l_path])
+                d_tree      : dict  = self.tree_lookup(str_digest)
+                with self.lock:
+                    self.d_stats['inputs'] += 1
+                    b_held  : bool  = not d_tree and (
+                                        str_digest in self.d_pending or str_digest in d_held
+                                    )
+                    if d_tree:
+                        self.d_stats['duplicates']     += 1
+                    elif not b_held:
+                        self.d_pending[str_digest]      = str(input)
+                        self.d_inputDigest[str(input)]  = str_digest
+                if b_held:
+                    d_held.setdefault(str_digest, []).append((input, output))
+                    continue
+                if d_tree:
+                    on_duplicate(input, d_tree)
+                    continue
+                yield input, output
+        while d_held:
+            yield from self.held_check(d_held, on_duplicate, b_final = True)
+
+    def tree_record(self, input : Any, seedID : int, feedID : int) -> None:
+        """
+        Record that the content of <input> was grown into the tree off
+        seed <seedID> in feed <feedID>.
+        """
+        if not self.db: return
+        with self.lock:
+            str_digest  : str   = self.d_inputDigest.pop(str(input), None)
+            if str_digest is None: return
+            if self.d_pending.get(str_digest) == str(input):
+                self.d_pending.pop(str_digest)
+            self.db.execute(
+                'INSERT OR REPLACE INTO trees VALUES (?, ?, ?, ?, ?)',
+                (str_digest, str(input), seedID, feedID, time.time())
+            )
+            self.db.commit()
+
+    def tree_release(self, input : Any) -> None:
+        """
+        Forget the tree off <input>, which was not fully grown, so that a
+        duplicate of its content is grown instead.
+        """
+        if not self.db: return
+        with self.lock:
+            str_digest  : str   = self.d_inputDigest.pop(str(input), None)
+            if str_digest is not None and self.d_pending.get(str_digest) == str(input):
+                self.d_pending.pop(str_digest)
+
+    def close(self) -> None:
+        with self.lock:
+            if self.db:
+                self.db.close()
+                self.db = None
+
+# the process-wide dedup index (see `shared.Shared`)
+sharedIndex_get = shared.Shared(DedupIndex).get
@@ -0,0 +1,161 @@
+str_about = '''
+    The journal module keeps an append-only, crash-safe record of the
+    growth of each tree -- its seed, each workflow and join submitted to
+    CUBE and the outcome of each -- as it happens.
+
+    Each event is one JSON line, flushed and synced to disk before the
+    growth moves on, so that if the controller dies, a later run with
+    --resume can rebuild the state of every tree: trees that were done
+    are not regrown, seeds that were planted are not replanted, nodes
+    that finished are skipped, and nodes that were submitted but not yet
+    finished are simply waited on again rather than resubmitted.
+
+    Only the few fields needed to resume are journaled for each plugin
+    instance, so that the journal stays small.
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  json
+import  threading
+from    pathlib                 import Path
+from    .                       import shared
+
+# the plugin instance fields kept in the journal
+PLINST_FIELDS   : list  = ['id', 'title', 'status', 'feed_id', 'plugin_name', 'previous_id']
+
+def plinst_compact(d_plinst : dict) -> dict:
+    """
+    Just the journaled fields of plugin instance <d_plinst>
+    """
+    return {k: d_plinst[k] for k in PLINST_FIELDS if k in d_plinst}
+
+def detail_compact(d_detail : dict) -> dict:
+    """
+    The journaled form of a workflow detail (a 'data' list of plugin
+    instances) or of a single plugin instance.
+    """
+    if 'data' in d_detail:
+        return {
+            'data'  : [plinst_compact(d) for d in d_detail['data']],
+            **{k: d_detail[k] for k in ('workflow_id',) if k in d_detail}
+        }
+    return plinst_compact(d_detail)
+
+class TreeJournal:
+    '''
+    An append-only JSON lines journal of tree growth events, shared by
+    all trees.
+
+        path        the journal file
+        resume      if True, load the events already in the file and
+                    append to it; otherwise start a new journal
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.path           : Path              = None
+        self.b_resume       : bool              = False
+        self.lock           : threading.Lock    = threading.Lock()
+        self.d_tree         : dict              = {}
+        self.fp                                 = None
+
+        for k, v in kwargs.items():
+            if k == 'path'      : self.path     = Path(v)
+            if k == 'resume'    : self.b_resume = bool(v)
+
+        if self.path:
+            if self.b_resume and self.path.exists():
+                self.d_tree = journal_load(self.path)
+                journal_repair(self.path)
+            self.fp     = open(self.path, 'a' if self.b_resume else 'w')
+
+    def record(self, str_tree : str, str_event : str, **kwargs) -> None:
+        """
+        Durably append an event for tree <str_tree>.
+
+        Args:
+            str_tree (str):     the tree key (its input)
+            str_event (str):    'seed', 'submit', 'done' or 'end'
+            kwargs:             the event fields
+        """
+        if not self.fp: return
+        str_line    : str   = json.dumps({'tree': str_tree, 'event': str_event, **kwargs})
+        with self.lock:
+            self.fp.write(str_line + '\n')
+            self.fp.flush()
+            os.fsync(self.fp.fileno())
+
+    def tree_state(self, str_tree : str) -> dict:
+        """
+        The state of tree <str_tree> as of the journal loaded on resume.
+
+        Returns:
+            dict: {'seed', 'submit': {<node>: ...}, 'done': {<node>: ...},
+                  'end'} -- any of which may be missing
+        """
+        return self.d_tree.get(str_tree, {})
+
+    def close(self) -> None:
+        with self.lock:
+            if self.fp:
+                self.fp.close()
+                self.fp = None
+
+def journal_repair(path : Path) -> int:
+    """
+    Truncate the journal file <path> back to its last complete line, so
+    that a partly written last line (from a crash mid-write) is not
+    merged with the next event appended on resume.
+
+    Returns:
+        int: the number of bytes dropped
+    """
+    with open(path, 'r+b') as fp:
+        size    : int   = fp.seek(0, os.SEEK_END)
+        end     : int   = 0
+        pos     : int   = size
+        while pos:
+            start   : int   = max(0, pos - 4096)
+            fp.seek(start)
+            newline : int   = fp.read(pos - start).rfind(b'\n')
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            pos     = start
+        if end < size:
+            fp.truncate(end)
+    return size - end
+
+def journal_load(path : Path) -> dict:
+    """
+    Replay a journal file into the latest state of each tree. A partly
+    written last line (from a crash mid-write) is ignored.
+
+    Args:
+        path (Path): the journal file
+
+    Returns:
+        dict: the state of each tree, keyed on tree
+    """
+    d_tree      : dict  = {}
+    with open(path) as fp:
+        for str_line in fp:
+            try:
+                d_event : dict  = json.loads(str_line)
+            except json.JSONDecodeError:
+                continue
+            d_state     : dict  = d_tree.setdefault(d_event['tree'], {'submit': {}, 'done': {}})
+            str_event   : str   = d_event['event']
+            if str_event == 'seed':
+                d_state['seed']     = d_event['seed']
+            elif str_event == 'submit':
+                d_state['submit'][d_event['node']]  = d_event['submit']
+                d_state['done'].pop(d_event['node'], None)
+            elif str_event == 'done':
+                d_state['done'][d_event['node']]    = d_event['result']
+            elif str_event == 'end':
+                d_state['end']      = d_event['result']
+    return d_tree
+
+# the process-wide journal (see `shared.Shared`)
+sharedJournal_get = shared.Shared(TreeJournal).get
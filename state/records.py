@@ -0,0 +1,176 @@
+str_about = '''
+    The records module provides the compact, typed result model of the
+    compute flow.
+
+    A node wait used to return a dict holding the whole workflow
+    description and the full plugin instance payload, with the result of
+    the previous stage hung off its 'prior' key -- so by the last stage,
+    each tree held every earlier stage's full API response. Here, a node
+    result is a slotted dataclass that keeps only the ids, statuses,
+    timings and the few plugin instance fields that the flow actually
+    uses. If the raw payloads are wanted (e.g. for debugging), they can
+    be kept in a bounded side store, keyed on plugin instance id.
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  threading
+from    collections             import OrderedDict
+from    dataclasses             import dataclass, field
+from    .                       import shared
+
+@dataclass(slots = True)
+class PluginInstance:
+    '''
+    The fields of a CUBE plugin instance that the compute flow uses.
+    '''
+    id              : int           = -1
+    title           : str           = ''
+    status          : str           = 'unknown'
+    feed_id         : int | None    = None
+    plugin_name     : str           = ''
+    previous_id     : int | None    = None
+
+    @classmethod
+    def from_api(cls, d_plinst : dict) -> 'PluginInstance':
+        """
+        The compact form of a plugin instance API (or journal) payload
+        """
+        return cls(
+            id          = d_plinst.get('id', -1),
+            title       = d_plinst.get('title') or '',
+            status      = d_plinst.get('status') or 'unknown',
+            feed_id     = d_plinst.get('feed_id'),
+            plugin_name = d_plinst.get('plugin_name') or '',
+            previous_id = d_plinst.get('previous_id')
+        )
+
+    def asdict(self) -> dict:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+def workflow_compact(d_detail : dict) -> tuple:
+    """
+    The plugin instances of a workflow detail (a 'data' list of plugin
+    instances) or of a single plugin instance.
+    """
+    ld_plinst   : list  = d_detail.get('data', [d_detail]) if d_detail else []
+    return tuple(PluginInstance.from_api(d) for d in ld_plinst)
+
+@dataclass(slots = True)
+class NodeResult:
+    '''
+    The outcome of waiting on a node of the compute flow.
+
+        finished    the node finished successfully
+        status      the last known status of the node
+        plid        the id of the node waited on (-1 if not found)
+        polls       the number of status polls of the node
+        plinst      the node waited on
+        workflow    the plugin instances of the workflow (or join) that
+                    the node is part of
+        started     when the wait began (epoch seconds)
+        elapsed     how long the wait took (seconds)
+        error       why the node could not be run, if it could not
+        prior       the result of the node this one was grown off
+    '''
+    finished        : bool                  = False
+    status          : str                   = 'unknown'
+    plid            : int                   = -1
+    polls           : int                   = 0
+    plinst          : PluginInstance        = field(default_factory = PluginInstance)
+    workflow        : tuple                 = ()
+    started         : float                 = 0.0
+    elapsed         : float                 = 0.0
+    error           : str                   = ''
+    prior           : 'NodeResult | None'   = None
+
+    def workflow_detail(self) -> dict:
+        """
+        The workflow as a detail structure ({'data': [...]}), as taken by
+        `LLDcomputeflow.pluginInstanceID_findWithTitle`.
+        """
+        return {'data': [p.asdict() for p in self.workflow]}
+
+    def record(self) -> dict:
+        """
+        This result as a plain dict, without the 'prior' chain.
+        """
+        return {
+            'finished'  : self.finished,
+            'status'    : self.status,
+            'plid'      : self.plid,
+            'polls'     : self.polls,
+            'plinst'    : self.plinst.asdict(),
+            'workflow'  : [p.asdict() for p in self.workflow],
+            'started'   : self.started,
+            'elapsed'   : self.elapsed,
+            'error'     : self.error
+        }
+
+    @classmethod
+    def from_record(cls, d_record : dict) -> 'NodeResult':
+        """
+        The inverse of `record`
+        """
+        return cls(
+            finished    = d_record.get('finished', False),
+            status      = d_record.get('status', 'unknown'),
+            plid        = d_record.get('plid', -1),
+            polls       = d_record.get('polls', 0),
+            plinst      = PluginInstance.from_api(d_record.get('plinst') or {}),
+            workflow    = tuple(PluginInstance.from_api(d) for d in d_record.get('workflow', [])),
+            started     = d_record.get('started', 0.0),
+            elapsed     = d_record.get('elapsed', 0.0),
+            error       = d_record.get('error', '')
+        )
+
+    def chain(self) -> list:
+        """
+        This result and all the results along its 'prior' chain, root
+        first.
+        """
+        l_result    : list          = []
+        result      : NodeResult    = self
+        while result is not None:
+            l_result.insert(0, result)
+            result  = result.prior
+        return l_result
+
+def result_finished(result : NodeResult | None) -> bool:
+    """
+    Did the node of <result> (which may be None, for a node that was not
+    run) finish successfully?
+    """
+    return bool(result is not None and result.finished)
+
+class RawStore:
+    '''
+    A bounded, thread-safe side store of raw API payloads, keyed on
+    plugin instance id. Once full, the least recently stored payloads are
+    dropped. A size of 0 keeps nothing.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.maxItems       : int               = 0
+        self.d_raw          : OrderedDict       = OrderedDict()
+        self.lock           : threading.Lock    = threading.Lock()
+        self.dropped        : int               = 0
+
+        for k, v in kwargs.items():
+            if k == 'maxItems'  : self.maxItems = int(v)
+
+    def put(self, plid : int, d_raw : dict) -> None:
+        if not self.maxItems: return
+        with self.lock:
+            self.d_raw[plid]    = d_raw
+            self.d_raw.move_to_end(plid)
+            while len(self.d_raw) > self.maxItems:
+                self.d_raw.popitem(last = False)
+                self.dropped   += 1
+
+    def get(self, plid : int) -> dict | None:
+        with self.lock:
+            return self.d_raw.get(plid)
+
+# the process-wide raw payload store (see `shared.Shared`)
+sharedRawStore_get = shared.Shared(RawStore).get
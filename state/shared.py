@@ -0,0 +1,52 @@
+str_about = '''
+    The shared module holds the process-wide objects of a run -- the
+    CUBE metadata cache, the status poller, the result sink and so on.
+
+    Each is kept in a `Shared` slot, which creates its object on the first
+    `get` with the kwargs of that call; later calls return the same
+    object, whatever their kwargs. `shared_reset` empties every slot, so
+    that a run that ends leaves nothing behind for the next one in the
+    same process (a closed sink, the paths, client and settings of the
+    last run).
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  threading
+from    typing                  import Any, Callable
+
+l_shared    : list  = []
+
+class Shared:
+    '''
+    A slot for the process-wide object made by <factory>.
+    '''
+
+    def __init__(self, factory : Callable[..., Any]):
+        self.factory        : Callable          = factory
+        self.instance       : Any               = None
+        self.lock           : threading.Lock    = threading.Lock()
+        l_shared.append(self)
+
+    def get(self, **kwargs) -> Any:
+        """
+        Return the shared object, creating it from the kwargs if this is
+        the first call (since the last reset). The kwargs of any later
+        call are ignored.
+        """
+        with self.lock:
+            if self.instance is None:
+                self.instance   = self.factory(**kwargs)
+            return self.instance
+
+    def reset(self) -> None:
+        with self.lock:
+            self.instance   = None
+
+def shared_reset() -> None:
+    """
+    Forget every shared object. The objects are not closed or stopped --
+    that is for the run that used them.
+    """
+    for slot in l_shared:
+        slot.reset()
@@ -0,0 +1,281 @@
+str_about = '''
+    The sink module streams the result of each tree, as it finishes, to a
+    JSON Lines log -- one compact record per tree, optionally gzip
+    compressed on the fly.
+
+    Previously each full result (with its nested workflow responses and
+    recursive 'prior' chain) was held in memory until the end of the run
+    and then dumped in one go, so that memory grew with the size of the
+    run and the final dump could take a long time. Here, a record only
+    keeps the outcome of the seed, of the tree and of each node along the
+    'prior' chain, and is written out as soon as the tree is done. The
+    legacy (pretty-printed JSON array) treeLog.json can still be produced
+    from the JSON Lines log at the end of the run.
+
+    The logs of controllers that each grew one shard of the inputs (see
+    --shard) can be merged into one, e.g.
+
+        python -m state.sink merged.jsonl out-0/ out-1/ out-2/
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  sys
+import  gzip
+import  json
+import  re
+import  threading
+from    argparse                import ArgumentParser, Namespace
+from    pathlib                 import Path
+from    typing                  import Any, Iterator
+from    state                   import records
+from    state                   import shared
+
+# the tail of a failed seed's error output kept in its record
+SEED_ERRORTAIL  : int   = 2000
+
+def seed_compact(d_seed : dict) -> dict:
+    """
+    The record of a seed result: its status and branch instance, and for
+    a failed seed the tail of the error output and the diagnostics of its
+    first and last failed attempts.
+    """
+    d_record    : dict  = {
+        k: d_seed[k] for k in ('status', 'input', 'branchInstanceID', 'message') if k in d_seed
+    }
+    if not d_seed.get('status'):
+        d_run       : dict  = d_seed.get('run') or {}
+        if d_run.get('stderr'):
+            d_record['stderr']          = d_run['stderr'][-SEED_ERRORTAIL:]
+        if d_run.get('nativeError'):
+            d_record['nativeError']     = d_run['nativeError']
+        if d_run.get('failure'):
+            d_record['failure']         = d_run['failure']
+    return d_record
+
+def node_compact(result : records.NodeResult) -> dict:
+    """
+    The record of a node wait result
+    """
+    return {
+        'title'     : result.plinst.title,
+        'plid'      : result.plid,
+        'feed'      : result.plinst.feed_id,
+        'status'    : result.status,
+        'finished'  : result.finished,
+        'polls'     : result.polls,
+        'elapsed'   : round(result.elapsed, 3)
+    }
+
+def tree_compact(input : Any, d_ret : dict) -> dict:
+    """
+    The compact record of the tree result <d_ret> grown off <input>: the
+    seed, the outcome of the last node and the outcome of each node along
+    the 'prior' chain, root first.
+
+    Args:
+        input (Any):    the mapper input of the tree
+        d_ret (dict):   the tree result, {'seed', 'tree'}, where 'tree' is
+                        a records.NodeResult
+
+    Returns:
+        dict: the record
+    """
+    tree        : records.NodeResult    = d_ret.get('tree')
+    l_node      : list                  = []
+    d_tree      : dict                  = {}
+    if tree is not None:
+        # a result with an error is for a node that was never waited on
+        l_node  = [node_compact(r) for r in tree.chain() if not r.error]
+        d_tree  = l_node[-1] if not tree.error else {
+            'finished'  : tree.finished,
+            'status'    : tree.status,
+            'error'     : tree.error
+        }
+    return {
+        'input'     : str(input),
+        'seed'      : seed_compact(d_ret.get('seed') or {}),
+        'tree'      : d_tree,
+        'nodes'     : l_node
+    }
+
+class ResultSink:
+    '''
+    A thread-safe, append-only JSON Lines log of tree results.
+
+        path        the log file; '.gz' is appended if compressing. With
+                    no path, records are simply dropped.
+        compress    gzip the log on the fly
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.path           : Path              = None
+        self.b_compress     : bool              = False
+        self.lock           : threading.Lock    = threading.Lock()
+        self.fp                                 = None
+        self.count          : int               = 0
+
+        for k, v in kwargs.items():
+            if k == 'path'      : self.path         = Path(v) if v else None
+            if k == 'compress'  : self.b_compress   = bool(v)
+
+        if self.path:
+            if self.b_compress:
+                self.path   = self.path.with_name(self.path.name + '.gz')
+                self.fp     = gzip.open(self.path, 'wt', encoding = 'utf-8')
+            else:
+                self.fp     = open(self.path, 'w', encoding = 'utf-8')
+
+    def write(self, d_record : dict) -> None:
+        """
+        Append <d_record> to the log.
+        """
+        if not self.path: return
+        str_line    : str   = json.dumps(d_record, default = str)
+        with self.lock:
+            self.fp.write(str_line + '\n')
+            # a gzip stream is sync flushed (Z_SYNC_FLUSH) after each
+            # record too, so that the records of a run that dies before
+            # closing the log can still be read back
+            self.fp.flush()
+            self.count     += 1
+
+    def close(self) -> None:
+        with self.lock:
+            if self.fp:
+                self.fp.close()
+                self.fp     = None
+
+    def records(self) -> Iterator[dict]:
+        """
+        Read the records back from the (closed) log, one at a time.
+        """
+        if not self.path: return
+        yield from treeLog_read(self.path)
+
+    def legacy_write(self, path : Path) -> int:
+        """
+        Write the records as the legacy treeLog.json -- a pretty-printed
+        JSON array -- streaming rather than loading them all.
+
+        Args:
+            path (Path): the legacy log file
+
+        Returns:
+            int: the number of records written
+        """
+        count       : int   = 0
+        with open(path, 'w') as fp:
+            fp.write('[')
+            for d_record in self.records():
+                fp.write(',\n' if count else '\n')
+                fp.write('    ' + json.dumps(d_record, indent = 4).replace('\n', '\n    '))
+                count  += 1
+            fp.write('\n]' if count else ']')
+        return count
+
+# the process-wide result sink (see `shared.Shared`)
+sharedSink_get = shared.Shared(ResultSink).get
+
+def treeLog_read(path : Path) -> Iterator[dict]:
+    """
+    The records of the (plain or gzip compressed) JSON Lines log <path>
+    """
+    opener  = gzip.open if Path(path).suffix == '.gz' else open
+    with opener(path, 'rt', encoding = 'utf-8') as fp:
+        for str_line in fp:
+            if str_line.strip():
+                yield json.loads(str_line)
+
+def treeLogs_find(l_path : list) -> list[Path]:
+    """
+    The JSON Lines logs in <l_path>, where a directory stands for the
+    (possibly sharded, possibly compressed) treeLog*.jsonl[.gz] in it.
+    """
+    l_log       : list  = []
+    for path in map(Path, l_path):
+        if path.is_dir():
+            l_log  += sorted(p for p in path.iterdir() if re.fullmatch(r'treeLog.*\.jsonl(\.gz)?', p.name))
+        else:
+            l_log.append(path)
+    return l_log
+
+def treeLogs_merge(l_path : list, path : Path, **kwargs) -> dict:
+    """
+    Merge the tree logs in <l_path> (see `treeLogs_find`) into the one
+    log <path>, ordered by input. An input logged more than once -- e.g.
+    by a shard that was rerun with --resume -- is kept once: its last
+    fully grown record if any, else its last record.
+
+    kwargs:
+        compress        gzip the merged log
+        legacy          also write the merged log as a legacy JSON array
+                        to this path
+
+    Returns:
+        dict: the logs merged, the records read and written, and any
+              shards missing from a sharded set of logs
+    """
+    b_compress  : bool  = False
+    str_legacy  : str   = ''
+    for k, v in kwargs.items():
+        if k == 'compress'  : b_compress    = bool(v)
+        if k == 'legacy'    : str_legacy    = v
+
+    l_log       : list  = treeLogs_find(l_path)
+    d_record    : dict  = {}
+    d_shard     : dict  = {}
+    count       : int   = 0
+    for log in l_log:
+        match   = re.search(r'\.shard-(\d+)-of-(\d+)\.', log.name)
+        if match:
+            d_shard.setdefault(int(match[2]), set()).add(int(match[1]))
+        for d_new in treeLog_read(log):
+            count      += 1
+            d_old   : dict  = d_record.get(d_new['input'])
+            if d_old and d_old.get('tree', {}).get('finished') and not d_new.get('tree', {}).get('finished'):
+                continue
+            d_record[d_new['input']]    = d_new
+
+    Merged      : ResultSink    = ResultSink(path = path, compress = b_compress)
+    for str_input in sorted(d_record):
+        Merged.write(d_record[str_input])
+    Merged.close()
+    if str_legacy:
+        Merged.legacy_write(Path(str_legacy))
+    return {
+        'logs'      : [str(p) for p in l_log],
+        'read'      : count,
+        'written'   : Merged.count,
+        'path'      : str(Merged.path),
+        'missing'   : {
+            n: sorted(set(range(n)) - l_k) for n, l_k in d_shard.items() if len(l_k) < n
+        }
+    }
+
+parser      : ArgumentParser    = ArgumentParser(
+    description     = 'Merge the (per-shard) tree logs of dylld controllers into one'
+)
+parser.add_argument('path',             help = 'the merged log')
+parser.add_argument('logs',             nargs = '+',
+                    help = 'tree logs, or output directories holding treeLog*.jsonl[.gz]')
+parser.add_argument('--compress',       action = 'store_true',
+                    help = 'gzip the merged log')
+parser.add_argument('--legacy',         default = '',
+                    help = 'also write the merged log as a legacy JSON array to this file')
+
+def merge_main(l_argv : list = None) -> int:
+    options     : Namespace = parser.parse_args(l_argv)
+    d_merge     : dict      = treeLogs_merge(
+                                options.logs, Path(options.path),
+                                compress = options.compress, legacy = options.legacy
+                            )
+    print('merged %d records of %d logs into %d in %s' % (
+            d_merge['read'], len(d_merge['logs']), d_merge['written'], d_merge['path']
+        ))
+    for n, l_k in d_merge['missing'].items():
+        print('warning: no log of shard(s) %s of %d' % (', '.join(map(str, l_k)), n))
+    return 1 if d_merge['missing'] else 0
+
+if __name__ == '__main__':
+    sys.exit(merge_main())
@@ -0,0 +1,256 @@
+str_about = '''
+    The status module keeps a live picture of a growth cycle, for the
+    operators watching a large run.
+
+    The trees report, as they go, when they begin, which stage (the seed,
+    or a node of the flow spec) they are in, which workflows they are
+    waiting on, and how they end. A background thread atomically rewrites
+    a snapshot of it all to status.json (written to a temporary file and
+    renamed, so a reader never sees a half-written file) every few
+    seconds, and a snapshot can also be served over a local HTTP endpoint,
+    e.g.
+
+        curl -s http://127.0.0.1:8080/status
+
+    A snapshot holds the count of trees in each stage (and queued,
+    finished, failed or resumed), the number of nodes waited on and the
+    IDs of the workflows they are in, the throughput in trees per hour
+    and, from it, an ETA for the inputs discovered so far. Other parts of
+    the controller can add to it with `source_add` -- e.g. the status
+    poller's current load.
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  json
+import  threading
+import  time
+from    datetime                import datetime, timezone
+from    http.server             import BaseHTTPRequestHandler, ThreadingHTTPServer
+from    pathlib                 import Path
+from    typing                  import Callable, Iterator
+from    .                       import shared
+
+def address_parse(str_address : str) -> tuple[str, int]:
+    """
+    Parse a '[<host>:]<port>' address; the host defaults to 127.0.0.1.
+    """
+    str_host, _, str_port   = str_address.rpartition(':')
+    if not str_port.isdigit():
+        raise ValueError("status address '%s' is not of form [<host>:]<port>" % str_address)
+    return (str_host or '127.0.0.1', int(str_port))
+
+class RunStatus:
+    '''
+    The live status of a growth cycle.
+
+        path        the status file (none if unset)
+        interval    seconds between rewrites of the status file
+        address     '[<host>:]<port>' to serve the status on (none if
+                    unset; port 0 picks a free port)
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.path           : Path              = None
+        self.interval       : float             = 5.0
+        self.address        : tuple             = None
+        self.d_tree         : dict              = {}
+        self.d_ended        : dict              = {'finished': 0, 'failed': 0, 'resumed': 0}
+        self.discovered     : int               = 0
+        self.b_discovering  : bool              = True
+        self.d_source       : dict              = {}
+        self.started        : float             = time.monotonic()
+        self.lock           : threading.Condition   = threading.Condition()
+        self.thread         : threading.Thread  = None
+        self.server         : ThreadingHTTPServer   = None
+        self.b_stop         : bool              = False
+        self.count          : int               = 0
+
+        for k, v in kwargs.items():
+            if k == 'path'      : self.path         = Path(v) if v else None
+            if k == 'interval'  : self.interval     = float(v)
+            if k == 'address'   : self.address      = address_parse(v) if v else None
+
+    def inputs_count(self, mapper : Iterator) -> Iterator:
+        """
+        Pass through the (input, output) tuples of <mapper>, counting them
+        as discovered.
+        """
+        for t_input in mapper:
+            with self.lock:
+                self.discovered    += 1
+            yield t_input
+        with self.lock:
+            self.b_discovering  = False
+
+    def tree_begin(self, str_tree : str) -> None:
+        with self.lock:
+            self.d_tree[str_tree]   = {'stage': 'seed', 'workflows': {}}
+
+    def tree_stage(self, str_tree : str, str_stage : str) -> None:
+        """
+        Move tree <str_tree> on to stage <str_stage>.
+        """
+        with self.lock:
+            if str_tree in self.d_tree:
+                self.d_tree[str_tree]['stage']  = str_stage
+
+    def wait_begin(self, str_tree : str, plid : int, workflowID : int = None) -> None:
+        """
+        Tree <str_tree> waits on node <plid>, in workflow <workflowID> (if
+        a workflow node).
+        """
+        with self.lock:
+            if str_tree in self.d_tree:
+                self.d_tree[str_tree]['workflows'][plid]    = workflowID
+
+    def wait_end(self, str_tree : str, plid : int) -> None:
+        with self.lock:
+            if str_tree in self.d_tree:
+                self.d_tree[str_tree]['workflows'].pop(plid, None)
+
+    def tree_end(self, str_tree : str, str_outcome : str) -> None:
+        """
+        Tree <str_tree> ended as 'finished', 'failed' or 'resumed' (grown
+        in an earlier run).
+        """
+        with self.lock:
+            self.d_tree.pop(str_tree, None)
+            self.d_ended[str_outcome]  += 1
+
+    def source_add(self, str_name : str, source : Callable[[], dict]) -> None:
+        """
+        Add what <source>() returns to each snapshot, under <str_name>.
+        """
+        with self.lock:
+            self.d_source[str_name] = source
+
+    def snapshot(self) -> dict:
+        """
+        The status now.
+        """
+        with self.lock:
+            elapsed     : float = time.monotonic() - self.started
+            ended       : int   = sum(self.d_ended.values())
+            grown       : int   = self.d_ended['finished'] + self.d_ended['failed']
+            d_stage     : dict  = {}
+            for d_tree in self.d_tree.values():
+                d_stage[d_tree['stage']]    = d_stage.get(d_tree['stage'], 0) + 1
+            l_workflow  : list  = sorted({
+                w for d_tree in self.d_tree.values()
+                for w in d_tree['workflows'].values() if w is not None
+            })
+            waiting     : int   = sum(len(d['workflows']) for d in self.d_tree.values())
+            remaining   : int   = self.discovered - ended
+            d_trees     : dict  = {
+                'discovered'    : self.discovered,
+                'discovering'   : self.b_discovering,
+                'queued'        : remaining - len(self.d_tree),
+                'growing'       : len(self.d_tree),
+                **self.d_ended
+            }
+            d_source    : dict  = dict(self.d_source)
+        perHour         : float = grown / elapsed * 3600 if elapsed else 0.0
+        eta             : float = remaining / perHour * 3600 if perHour else None
+        d_status        : dict  = {
+            'time'      : datetime.now(timezone.utc).astimezone().isoformat(),
+            'elapsed'   : round(elapsed, 1),
+            'trees'     : d_trees,
+            'stages'    : d_stage,
+            'waiting'   : waiting,
+            'workflows' : l_workflow,
+            'treesPerHour'  : round(perHour, 1),
+            'eta'       : round(eta, 1) if eta is not None else None,
+            'etaTime'   : datetime.fromtimestamp(time.time() + eta, timezone.utc).astimezone().isoformat()
+                            if eta is not None else None
+        }
+        for str_name, source in d_source.items():
+            try:
+                d_status[str_name]  = source()
+            except Exception as e:
+                d_status[str_name]  = {'error': repr(e)}
+        return d_status
+
+    def write(self) -> None:
+        """
+        Atomically rewrite the status file with a snapshot.
+        """
+        if not self.path: return
+        path_tmp    : Path  = self.path.with_name('.%s.tmp' % self.path.name)
+        path_tmp.write_text(json.dumps(self.snapshot(), indent = 2))
+        os.replace(path_tmp, self.path)
+        self.count         += 1
+
+    def serve(self) -> str:
+        """
+        Serve snapshots at /status (and /) on <address>.
+
+        Returns:
+            str: the status URL
+        """
+        status      : RunStatus = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0].rstrip('/') not in ('', '/status'):
+                    self.send_error(404)
+                    return
+                b_response  : bytes = json.dumps(status.snapshot(), indent = 2).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(b_response)))
+                self.end_headers()
+                self.wfile.write(b_response)
+
+            def log_message(self, *args) : pass
+
+        self.server         = ThreadingHTTPServer(self.address, Handler)
+        self.server.daemon_threads  = True
+        threading.Thread(target = self.server.serve_forever, name = 'StatusServer', daemon = True).start()
+        return 'http://%s:%d/status' % self.server.server_address[:2]
+
+    def start(self) -> str:
+        """
+        Start rewriting the status file and, with an address, serving the
+        status.
+
+        Returns:
+            str: the status URL, if served
+        """
+        str_url     : str   = ''
+        if self.address:
+            str_url         = self.serve()
+        if self.path and self.interval:
+            self.b_stop     = False
+            self.thread     = threading.Thread(target = self.run, name = 'RunStatus', daemon = True)
+            self.thread.start()
+        return str_url
+
+    def run(self) -> None:
+        while True:
+            try:
+                self.write()
+            except OSError:
+                pass
+            with self.lock:
+                self.lock.wait_for(lambda: self.b_stop, timeout = self.interval)
+                if self.b_stop:
+                    return
+
+    def close(self) -> None:
+        """
+        Stop, with a last rewrite of the status file.
+        """
+        with self.lock:
+            self.b_stop     = True
+            self.lock.notify_all()
+        if self.thread:
+            self.thread.join()
+        self.write()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+# the process-wide run status (see `shared.Shared`)
+sharedStatus_get = shared.Shared(RunStatus).get
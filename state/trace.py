@@ -0,0 +1,170 @@
+str_about = '''
+    The trace module records timed spans of the growth of each tree -- the
+    tree itself, its seed, each node of its compute flow, the workflow
+    and join submissions, the waits on CUBE (with their poll counts) and
+    the QA check -- and streams them to a Chrome trace file (the "Trace
+    Event" JSON array format, as read by chrome://tracing and Perfetto).
+
+    Each tree gets its own lane (trace "thread"), named for its input, so
+    that its spans nest by time within it regardless of which thread or
+    coroutine ran them; lane 0 holds the spans of the growth cycle as a
+    whole. A span is either a context (`span`) or, where it begins and
+    ends in different places -- e.g. a node submitted by one stage worker
+    and completed by another -- a `span_begin` / `span_end` pair.
+
+    With no trace file, the tracer is disabled and spans cost next to
+    nothing.
+'''
+
+import  os
+os.environ['XDG_CONFIG_HOME'] = '/tmp'
+import  itertools
+import  json
+import  threading
+import  time
+from    contextlib              import contextmanager
+from    pathlib                 import Path
+from    typing                  import Iterator
+from    .                       import shared
+
+class Tracer:
+    '''
+    A thread-safe, streaming Chrome trace writer.
+
+        path        the trace file; with no path, nothing is traced
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.path           : Path              = None
+        self.lock           : threading.Lock    = threading.Lock()
+        self.fp                                 = None
+        self.t0             : float             = time.perf_counter()
+        self.tokens                             = itertools.count(1)
+        self.d_open         : dict              = {}
+        self.d_lane         : dict              = {}
+        self.d_tree         : dict              = {}
+        self.count          : int               = 0
+
+        for k, v in kwargs.items():
+            if k == 'path'      : self.path     = Path(v) if v else None
+
+        if self.path:
+            self.fp     = open(self.path, 'w')
+            self.fp.write('[\n')
+            self.event_write({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': 0,
+                              'args': {'name': 'growth cycle'}})
+
+    def enabled(self) -> bool:
+        return self.fp is not None
+
+    def now(self) -> int:
+        """
+        Microseconds since the tracer was created
+        """
+        return int((time.perf_counter() - self.t0) * 1e6)
+
+    def event_write(self, d_event : dict) -> None:
+        str_line    : str   = json.dumps(d_event, default = str)
+        with self.lock:
+            if not self.fp: return
+            self.fp.write(str_line + ',\n')
+            self.count += 1
+
+    def lane(self, str_tree : str) -> int:
+        """
+        The lane of tree <str_tree>, created (and named) on first use.
+        """
+        if not self.enabled() or not str_tree: return 0
+        with self.lock:
+            tid     : int   = self.d_lane.get(str_tree)
+            if tid is not None: return tid
+            tid     = self.d_lane[str_tree] = len(self.d_lane) + 1
+        self.event_write({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid,
+                          'args': {'name': str_tree}})
+        return tid
+
+    def span_begin(self, str_name : str, lane : int = 0, **kwargs) -> int:
+        """
+        Begin a span named <str_name> in <lane>, with <kwargs> as its args.
+
+        Returns:
+            int: the token with which to end the span (0 if not tracing)
+        """
+        if not self.enabled(): return 0
+        token       : int   = next(self.tokens)
+        with self.lock:
+            self.d_open[token]  = (str_name, lane, self.now(), kwargs)
+        return token
+
+    def span_end(self, token : int, **kwargs) -> None:
+        """
+        End the span of <token>, adding <kwargs> to its args. Ending an
+        unknown (or already ended) span does nothing.
+        """
+        if not token: return
+        end         : int   = self.now()
+        with self.lock:
+            t_open  : tuple = self.d_open.pop(token, None)
+        if t_open is None: return
+        str_name, lane, start, d_args = t_open
+        self.event_write({
+            'name'  : str_name,
+            'cat'   : str_name.split(' ')[0],
+            'ph'    : 'X',
+            'pid'   : 1,
+            'tid'   : lane,
+            'ts'    : start,
+            'dur'   : end - start,
+            'args'  : {**d_args, **kwargs}
+        })
+
+    def tree_begin(self, str_tree : str, **kwargs) -> None:
+        """
+        Begin the root span of tree <str_tree> in its lane. The tree span
+        is kept by tree, since its growth may begin and end in different
+        threads (or coroutines) that share nothing else.
+        """
+        if not self.enabled(): return
+        token       : int   = self.span_begin('tree', self.lane(str_tree), tree = str_tree, **kwargs)
+        with self.lock:
+            self.d_tree[str_tree]   = token
+
+    def tree_end(self, str_tree : str, **kwargs) -> None:
+        """
+        End the root span of tree <str_tree>, if begun.
+        """
+        if not self.enabled(): return
+        with self.lock:
+            token   : int   = self.d_tree.pop(str_tree, 0)
+        self.span_end(token, **kwargs)
+
+    @contextmanager
+    def span(self, str_name : str, lane : int = 0, **kwargs) -> Iterator[dict]:
+        """
+        A span about the body of the context. The yielded dict holds the
+        span args, and may be added to within the body.
+        """
+        d_args      : dict  = dict(kwargs)
+        token       : int   = self.span_begin(str_name, lane)
+        try:
+            yield d_args
+        finally:
+            self.span_end(token, **d_args)
+
+    def close(self) -> None:
+        """
+        End any spans still open (marked as unfinished) and close the file.
+        """
+        for token in list(self.d_open):
+            self.span_end(token, unfinished = True)
+        with self.lock:
+            if self.fp:
+                # drop the trailing comma of the last event
+                self.fp.seek(self.fp.tell() - 2)
+                self.fp.write('\n]\n')
+                self.fp.truncate()
+                self.fp.close()
+                self.fp = None
+
+# the process-wide tracer (see `shared.Shared`)
+sharedTracer_get = shared.Shared(Tracer).get
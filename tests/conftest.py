@@ -0,0 +1,64 @@
+import struct
+
+import pytest
+
+from logic import dicom
+from state import shared
+
+
+def element_encode(tag, vr, value, explicit=True):
+    if isinstance(value, int):
+        value = struct.pack('<H', value)
+    elif isinstance(value, str):
+        value = value.encode('latin-1')
+        if len(value) % 2:
+            value += b'\x00' if vr == 'UI' else b' '
+    header = struct.pack('<HH', *tag)
+    if not explicit:
+        return header + struct.pack('<I', len(value)) + value
+    if vr.encode() in dicom.VR_LONG:
+        return header + vr.encode() + b'\x00\x00' + struct.pack('<I', len(value)) + value
+    return header + vr.encode() + struct.pack('<H', len(value)) + value
+
+
+@pytest.fixture(autouse=True)
+def shared_fresh():
+    """
+    Forget the process-wide objects that a test left behind.
+    """
+    yield
+    shared.shared_reset()
+
+
+@pytest.fixture
+def dicom_write():
+    """
+    A factory of minimal DICOM files: dicom_write(path, explicit=True,
+    sequence=False, **{<keyword>: <value>}) writes a Part 10 file with
+    the given tags (and, optionally, an undefined length sequence ahead of
+    them) followed by some pixel data.
+    """
+    def write(path, explicit=True, sequence=False, **d_tag):
+        str_ts = '1.2.840.10008.1.2.1' if explicit else dicom.TS_IMPLICIT
+        meta = element_encode((0x0002, 0x0010), 'UI', str_ts)
+        l_element = []
+        if sequence:
+            item = element_encode((0x0008, 0x0100), 'SH', 'CODE', explicit)
+            l_element.append((
+                (0x0008, 0x0006),
+                struct.pack('<HH', 0x0008, 0x0006)
+                + (b'SQ\x00\x00' if explicit else b'') + struct.pack('<I', dicom.UNDEFINED)
+                + struct.pack('<HHI', 0xFFFE, 0xE000, dicom.UNDEFINED) + item
+                + struct.pack('<HHI', 0xFFFE, 0xE00D, 0)
+                + struct.pack('<HHI', 0xFFFE, 0xE0DD, 0)
+            ))
+        for str_keyword, value in d_tag.items():
+            tag, vr = dicom.TAGS[str_keyword]
+            l_element.append((tag, element_encode(tag, vr, value, explicit)))
+        l_element.append((dicom.PIXELDATA, element_encode(dicom.PIXELDATA, 'OW', b'\x00' * 64, explicit)))
+        with open(path, 'wb') as fp:
+            fp.write(b'\x00' * 128 + b'DICM' + meta)
+            for _, data in sorted(l_element, key=lambda t: t[0]):
+                fp.write(data)
+        return path
+    return write
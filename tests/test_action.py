@@ -0,0 +1,47 @@
+from argparse import Namespace
+
+from control import action
+from state import data
+
+
+class FakeMetaCache:
+    def pluginFlagMap_get(self, str_pluginName):
+        return {
+            '--fileFilter': 'fileFilter',
+            '--exec': 'exec',
+            '--noJobLogging': 'noJobLogging',
+            '--verbose': 'verbose',
+            '--pftelDB': 'pftelDB',
+        }
+
+
+def test_PLshexec_CUBEdata_maps_flags_to_names():
+    Env = data.env()
+    Env.CUBE.parentPluginInstanceID = '12'
+    PLseed = action.PluginRun(
+        options=Namespace(pattern='**/*dcm', inNode=False, pftelDB='')
+    )
+    PLseed.env = Env
+    PLseed.metaCache = FakeMetaCache()
+
+    d_data = PLseed.PLshexec_CUBEdata('image.dcm')
+    assert d_data['fileFilter'] == 'image.dcm'
+    assert d_data['exec'].startswith('cp %inputWorkingDir/%inputWorkingFile')
+    assert d_data['noJobLogging'] is True
+    assert d_data['title'] == 'image.dcm'
+    assert d_data['previous_id'] == '12'
+
+
+def test_PLshexec_CUBEdata_keeps_trailing_value_chars():
+    Env = data.env()
+    Env.CUBE.parentPluginInstanceID = '12'
+    PLseed = action.PluginRun(
+        options=Namespace(pattern='**/*dcm', inNode=False, pftelDB='http://tel/db?token=YWJj=')
+    )
+    PLseed.env = Env
+    PLseed.metaCache = FakeMetaCache()
+
+    d_data = PLseed.PLshexec_CUBEdata('scan-')
+    assert d_data['pftelDB'] == 'http://tel/db?token=YWJj='
+    assert d_data['fileFilter'] == 'scan-'
+    assert d_data['title'] == 'scan-'
@@ -0,0 +1,59 @@
+import threading
+import time
+
+from control import admission
+
+
+def test_token_bucket_limits_rate():
+    bucket = admission.TokenBucket(50, burst=1)
+    tic = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - tic >= 0.09
+
+
+def test_gated_client_admits_calls_by_type():
+    class Client:
+        def get_plugin_instances(self, d):
+            return d
+
+        def create_workflow(self, *args):
+            return args
+
+        def compute_workflow_nodes_info(self, d):
+            return d
+
+    controller = admission.AdmissionController(
+        rates=admission.budgets_parse('write=1000')
+    )
+    cl = controller.client_gate(Client())
+    assert cl.get_plugin_instances({'a': 1}) == {'a': 1}
+    cl.create_workflow(1, 2)
+    cl.compute_workflow_nodes_info({})
+    d_stats = controller.stats()
+    assert d_stats['read']['calls'] == 1
+    assert d_stats['write']['calls'] == 1
+
+
+def test_inflight_cap_bounds_concurrent_work():
+    controller = admission.AdmissionController(caps={'workflow': 2})
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def work():
+        with controller.work('workflow'):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.pop()
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(peak) == 2
+    assert controller.stats()['workflow']['peak'] == 2
@@ -0,0 +1,94 @@
+import pytest
+
+from control.granularity import Batch
+from logic.behavior import FilterVerdict, HeaderCriteria, mapper_filter, objects_evaluate
+
+SPEC = 'Modality=DX,CR; BodyPartExamined~leg|extremity; ImageType!~LOCALIZER; Rows>=1024'
+
+
+def test_header_check_clauses():
+    criteria = HeaderCriteria(SPEC)
+    assert criteria.l_keyword == ['BodyPartExamined', 'ImageType', 'Modality', 'Rows']
+    d_header = {'Modality': 'dx', 'BodyPartExamined': 'LEG', 'ImageType': ['ORIGINAL', 'PRIMARY'], 'Rows': 2048}
+    assert criteria.header_check(d_header) == ''
+    assert criteria.header_check({**d_header, 'Modality': 'CT'}) == 'header fails Modality=DX,CR (Modality=CT)'
+    assert criteria.header_check({**d_header, 'ImageType': ['DERIVED', 'LOCALIZER']}).startswith('header fails ImageType')
+    assert criteria.header_check({**d_header, 'Rows': 512}).startswith('header fails Rows>=1024')
+    # a missing tag fails all but negated clauses
+    assert criteria.header_check({k: v for k, v in d_header.items() if k != 'ImageType'}) == ''
+    d_noBodyPart = {k: v for k, v in d_header.items() if k != 'BodyPartExamined'}
+    assert 'BodyPartExamined=<missing>' in criteria.header_check(d_noBodyPart)
+
+
+def test_criteria_on_files(tmp_path, dicom_write):
+    criteria = HeaderCriteria(SPEC)
+    legs = dicom_write(tmp_path / 'legs.dcm', Modality='DX', BodyPartExamined='LEG', Rows=2048)
+    scout = dicom_write(tmp_path / 'scout.dcm', explicit=False, Modality='CR', BodyPartExamined='EXTREMITY',
+                        ImageType='DERIVED\\LOCALIZER', Rows=2048)
+    (tmp_path / 'notes.txt').write_text('not a DICOM file')
+    assert criteria(str(legs))
+    assert not criteria(str(scout))
+    assert criteria.reason(str(tmp_path / 'notes.txt')).startswith('header fails Modality')
+    assert criteria.reason('batch+3').startswith('header unreadable')
+    assert not HeaderCriteria('') and HeaderCriteria('')(str(scout))
+
+
+def test_bad_criteria():
+    for str_spec in ('Modality', 'Colour=red', 'Rows>=many'):
+        with pytest.raises(ValueError):
+            HeaderCriteria(str_spec)
+
+
+def test_objects_evaluate(tmp_path, dicom_write):
+    criteria = HeaderCriteria('Modality=DX')
+    l_object = [
+        str(dicom_write(tmp_path / ('%d.dcm' % i), Modality='DX' if i % 3 else 'CT'))
+        for i in range(7)
+    ]
+    # chunks of 2 spread the set across the pool
+    verdict = objects_evaluate(l_object, criteria, workers=2, chunk=2)
+    assert list(verdict.mask) == [0, 1, 1, 0, 1, 1, 0]
+    assert sorted(verdict.d_reason) == [0, 3, 6]
+    assert verdict.d_reason[3] == 'header fails Modality=DX (Modality=CT)'
+    assert (verdict.accepted, verdict.rejected) == (4, 3)
+    # a set smaller than a chunk is evaluated in process
+    assert list(objects_evaluate(l_object[:2], criteria).mask) == [0, 1]
+
+
+def test_mapper_filter(tmp_path, dicom_write):
+    l_tuple = [
+        (dicom_write(tmp_path / ('%d.dcm' % i), Modality='CR' if i % 2 else 'MR'), tmp_path / 'out' / str(i))
+        for i in range(5)
+    ]
+    l_rejected = []
+    verdict = FilterVerdict()
+    accepted = mapper_filter(
+        iter(l_tuple), HeaderCriteria('Modality=CR'),
+        lambda input, str_reason: l_rejected.append(input), verdict, workers=2, chunk=2
+    )
+    assert list(accepted) == [l_tuple[1], l_tuple[3]]
+    assert l_rejected == [l_tuple[0][0], l_tuple[2][0], l_tuple[4][0]]
+    assert verdict.rejected == 3
+    # no criteria, no filtering
+    assert list(mapper_filter(iter(l_tuple), HeaderCriteria(''))) == l_tuple
+
+
+def test_criteria_on_batches_and_dirs(tmp_path, dicom_write):
+    criteria = HeaderCriteria('Modality=DX')
+    series = tmp_path / 'series'
+    series.mkdir()
+    l_dx = [dicom_write(series / ('%d.dcm' % i), Modality='DX') for i in range(3)]
+    assert criteria(str(series)) and criteria([str(p) for p in l_dx])
+    # a single failing file rejects the directory, or the batch, it is in
+    ct = dicom_write(series / '3.dcm', Modality='CT')
+    assert criteria.reason(str(series)) == '3.dcm: header fails Modality=DX (Modality=CT)'
+    assert not criteria([str(l_dx[0]), str(ct)])
+    # batches from the mapper are judged on their files, not their names
+    l_tuple = [
+        (Batch('series/0.dcm+2', [p.name for p in l_dx], paths=l_dx), tmp_path / 'out' / '0'),
+        (Batch('series/1.dcm+1', ['1.dcm', '3.dcm'], paths=[l_dx[1], ct]), tmp_path / 'out' / '1'),
+    ]
+    l_rejected = []
+    accepted = mapper_filter(iter(l_tuple), criteria, lambda input, str_reason: l_rejected.append(str(input)))
+    assert list(accepted) == [l_tuple[0]]
+    assert l_rejected == ['series/1.dcm+1']
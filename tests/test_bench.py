@@ -0,0 +1,34 @@
+from bench import fakecube, throughput
+from control import dag
+
+
+def test_pipelines_from_spec_chain_titles():
+    d_pipeline = fakecube.pipelines_fromSpec(dag.flowSpec_load())
+    l_push = [p for name, p in d_pipeline.items() if 'PACS' in name][0]
+    assert [p['title'] for p in l_push] == ['image-to-DICOM', 'pacs-push', 'QA-Check']
+    assert l_push[-1]['plugin'] == 'pl-lld_chxr'
+    l_inference = [p for name, p in d_pipeline.items() if 'inference' in name][0]
+    # 'heatmaps' (waited on) is part of the 'generate-landmark-heatmaps' title
+    assert [p['title'] for p in l_inference] == ['dcm-to-mha', 'generate-landmark-heatmaps']
+
+
+def test_benchmark_reports_throughput(tmp_path):
+    d_report = throughput.main(
+        ['--trees', '3', '--mode', 'pipelined', '--latency', 'default=0.02',
+         '--pollInterval', '0.02', '--workdir', str(tmp_path), '--', '--stageWorkers', '2']
+    )
+    assert d_report['returncode'] == 0
+    assert d_report['grown'] == 3
+    assert d_report['args'] == ['--stageWorkers', '2']
+    assert d_report['callsPerTree'] > 0 and d_report['maxrssMB'] > 0
+    assert (tmp_path / 'controller.log').exists()
+
+
+def test_benchmark_async_grows_every_tree(tmp_path):
+    d_report = throughput.main(
+        ['--trees', '5', '--mode', 'async', '--latency', 'default=0.02',
+         '--pollInterval', '0.02', '--workdir', str(tmp_path), '--', '--maxTrees', '2']
+    )
+    assert d_report['returncode'] == 0
+    assert d_report['logged'] == 5
+    assert d_report['grown'] == 5
@@ -0,0 +1,66 @@
+import threading
+import time
+
+from state.cache import CUBEmetaCache
+
+
+def test_get_fetches_once_across_threads():
+    metaCache = CUBEmetaCache()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return {'data': [{'id': 7}]}
+
+    threads = [
+        threading.Thread(target=metaCache.get, args=('k', fetch)) for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert metaCache.get('k', fetch) == {'data': [{'id': 7}]}
+
+
+def test_ttl_and_invalidate():
+    metaCache = CUBEmetaCache(ttl=0.01)
+    values = iter(range(10))
+    first = metaCache.get('k', lambda: next(values))
+    time.sleep(0.02)
+    second = metaCache.get('k', lambda: next(values))
+    assert second != first
+    metaCache.invalidate('k')
+    assert metaCache.get('k', lambda: next(values)) != second
+
+
+def test_pipeline_template_instantiates_copy_on_write():
+    from state.data import Pipeline
+
+    pipeline = Pipeline(
+        name='p',
+        id=3,
+        nodes=[
+            {
+                'piping_id': 1,
+                'title': 'dcm-to-mha',
+                'compute_resource_name': 'host',
+                'plugin_parameter_defaults': [
+                    {'name': 'imageName', 'default': 'a.png'},
+                    {'name': 'rotate', 'default': '0'},
+                ],
+            },
+            {
+                'piping_id': 2,
+                'title': 'heatmaps',
+                'plugin_parameter_defaults': [{'name': 'pftelDB', 'default': ''}],
+            },
+        ],
+    )
+    l_node = pipeline.instantiate({'dcm-to-mha': {'rotate': '90'}})
+    assert 'compute_resource_name' not in l_node[0]
+    assert l_node[0]['plugin_parameter_defaults'][1]['default'] == '90'
+    assert pipeline.t_node[0]['plugin_parameter_defaults'][1]['default'] == '0'
+    assert l_node[1] is pipeline.t_node[1]
+    assert pipeline.instantiate()[0]['plugin_parameter_defaults'][1]['default'] == '0'
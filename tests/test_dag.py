@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+from control import dag
+from state import records
+
+
+def spec_build(nodes):
+    return dag.FlowSpec({'name': 't', 'nodes': nodes})
+
+
+def test_bundled_spec_orders_lld_flow():
+    spec = dag.flowSpec_load()
+    assert spec.l_order[0] == 'inference'
+    assert spec.node_last() == 'push'
+    assert spec.d_deps['mergeMarkedJPGSwithDICOMS'] == [
+        'measurement',
+        'mergeDICOMSwithInference',
+    ]
+    assert len(spec.pipelines()) == 4
+
+
+def test_cycle_and_unknown_refs_are_rejected():
+    with pytest.raises(ValueError):
+        spec_build(
+            [
+                {'id': 'a', 'type': 'join', 'parent': 'b'},
+                {'id': 'b', 'type': 'join', 'parent': 'a'},
+            ]
+        )
+    with pytest.raises(ValueError):
+        spec_build([{'id': 'a', 'type': 'join', 'parent': 'nope'}])
+
+
+def test_parameters_resolve_dotted_placeholders():
+    d_param = dag.parameters_resolve(
+        {'push': {'url': '${orthanc.url}', 'n': 3, 'x': '${unknown}'}},
+        {'orthanc.url': 'http://o'},
+    )
+    assert d_param == {'push': {'url': 'http://o', 'n': 3, 'x': '${unknown}'}}
+
+
+def test_scheduler_runs_branches_concurrently_and_skips_failures():
+    spec = spec_build(
+        [
+            {'id': 'root', 'type': 'workflow', 'pipeline': 'p', 'attach': 'seed'},
+            {'id': 'left', 'type': 'join', 'parent': 'root'},
+            {'id': 'right', 'type': 'join', 'parent': 'root'},
+            {'id': 'bad', 'type': 'join', 'parent': 'root'},
+            {'id': 'after', 'type': 'join', 'parent': 'bad'},
+        ]
+    )
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def execute(d_node, d_result):
+        with lock:
+            active.append(d_node['id'])
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(d_node['id'])
+        return records.NodeResult(finished=d_node['id'] != 'bad')
+
+    d_result = dag.FlowScheduler(spec).run(execute)
+    assert max(peak) == 3
+    assert d_result['after'] is None
+    assert d_result['left'].finished
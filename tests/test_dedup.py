@@ -0,0 +1,66 @@
+from state import dedup
+
+
+def test_duplicates_are_skipped_within_and_across_runs(tmp_path):
+    inputdir = tmp_path / 'in'
+    inputdir.mkdir()
+    for name, content in [('a.dcm', b'A'), ('b.dcm', b'B'), ('c.dcm', b'A')]:
+        (inputdir / name).write_bytes(content)
+    mapper = [(inputdir / n, tmp_path) for n in ('a.dcm', 'b.dcm', 'c.dcm')]
+    index_path = tmp_path / 'index.db'
+
+    l_dup = []
+    index = dedup.DedupIndex(path=index_path, threads=2)
+    l_pass = []
+    for input, output in index.inputs_filter(iter(mapper), lambda i, d: l_dup.append((i.name, d['input']))):
+        l_pass.append(input)
+        if input.name == 'a.dcm':
+            index.tree_record(input, 7, 3)
+    assert [i.name for i in l_pass] == ['a.dcm', 'b.dcm']
+    assert l_dup == [('c.dcm', str(inputdir / 'a.dcm'))]
+    assert index.d_stats['hashed'] == 3
+    index.close()
+
+    index = dedup.DedupIndex(path=index_path)
+    l_pass = list(index.inputs_filter(iter(mapper)))
+    assert [i.name for i, _ in l_pass] == ['b.dcm']
+    assert index.d_stats['cached'] == 3
+    assert index.tree_lookup(dedup.file_digest(inputdir / 'c.dcm'))['feed'] == 3
+    index.close()
+
+
+def test_duplicate_of_failed_tree_is_grown(tmp_path):
+    for name in ('a.dcm', 'c.dcm', 'd.dcm'):
+        (tmp_path / name).write_bytes(b'A')
+    (tmp_path / 'b.dcm').write_bytes(b'B')
+    mapper = [(tmp_path / n, tmp_path) for n in ('a.dcm', 'c.dcm', 'b.dcm', 'd.dcm')]
+
+    l_dup = []
+    index = dedup.DedupIndex(path=tmp_path / 'index.db')
+    l_pass = []
+    for input, output in index.inputs_filter(iter(mapper), lambda i, d: l_dup.append(i.name)):
+        l_pass.append(input.name)
+        if input.name == 'a.dcm':
+            # a.dcm is still growing while its duplicates are read
+            continue
+        index.tree_record(input, 8, 3)
+        if input.name == 'b.dcm':
+            index.tree_release(tmp_path / 'a.dcm')
+    # a.dcm failed, so its first duplicate is grown, and the second skipped
+    assert l_pass == ['a.dcm', 'b.dcm', 'c.dcm']
+    assert l_dup == ['d.dcm']
+    assert index.tree_lookup(dedup.file_digest(tmp_path / 'a.dcm'))['input'] == str(tmp_path / 'c.dcm')
+    index.close()
+
+
+def test_duplicate_of_unfinished_tree_is_grown(tmp_path):
+    for name in ('a.dcm', 'c.dcm'):
+        (tmp_path / name).write_bytes(b'A')
+    index = dedup.DedupIndex(path=tmp_path / 'index.db')
+    l_pass = list(index.inputs_filter([(tmp_path / n, tmp_path) for n in ('a.dcm', 'c.dcm')]))
+    assert [i.name for i, _ in l_pass] == ['a.dcm', 'c.dcm']
+    index.close()
+
+
+def test_disabled_index_passes_everything():
+    assert list(dedup.DedupIndex().inputs_filter([(1, 2)])) == [(1, 2)]
@@ -0,0 +1,18 @@
+from logic import dicom
+
+
+def test_header_read_explicit_and_implicit(tmp_path, dicom_write):
+    for explicit in (True, False):
+        path = dicom_write(tmp_path / ('%d.dcm' % explicit), explicit=explicit, sequence=True,
+                           Modality='DX', StudyDate='20261018', Rows=2048, SeriesDescription='Legs')
+        assert dicom.header_read(path) == {
+            'StudyDate': '20261018', 'Modality': 'DX', 'SeriesDescription': 'Legs', 'Rows': 2048
+        }
+        assert dicom.header_read(path, ['Modality']) == {'Modality': 'DX'}
+
+
+def test_header_read_not_dicom(tmp_path):
+    (tmp_path / 'a.txt').write_text('hello, this is not a DICOM file at all')
+    (tmp_path / 'empty').write_bytes(b'')
+    assert dicom.header_read(tmp_path / 'a.txt', ['Modality']) == {}
+    assert dicom.header_read(tmp_path / 'empty') == {}
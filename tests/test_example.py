@@ -1,23 +1,82 @@
+import json
+import threading
 from pathlib import Path
 
+import pytest
+
+from bench import fakecube
+from control import dag
 from dylld import parser, main, DISPLAY_TITLE
 
 
-def test_main(mocker, tmp_path: Path):
+@pytest.mark.parametrize('l_mode', [[], ['--pipelined'], ['--async']])
+def test_main(mocker, tmp_path: Path, l_mode):
     """
-    Simulated test run of the app.
+    Simulated test run of the app, against a fake CUBE -- a run per
+    mode, in the one process.
     """
     inputdir = tmp_path / 'incoming'
     outputdir = tmp_path / 'outgoing'
     inputdir.mkdir()
     outputdir.mkdir()
+    for i in range(2):
+        (inputdir / ('%d.dcm' % i)).write_bytes(bytes([i]) * 64)
 
-    options = parser.parse_args(['--name', 'bar'])
+    cube = fakecube.FakeCUBE(
+        pipelines=fakecube.pipelines_fromSpec(dag.flowSpec_load()),
+        latency={'default': 0.02},
+        qaFailRate=1,
+    )
+    options = parser.parse_args(
+        ['--CUBEurl', cube.start(), '--pluginInstanceID', '1', '--pollInterval', '0.02', *l_mode]
+    )
 
     mock_print = mocker.patch('builtins.print')
-    main(options, inputdir, outputdir)
-    mock_print.assert_called_once_with(DISPLAY_TITLE)
+    try:
+        main(options, inputdir, outputdir)
+    finally:
+        cube.stop()
+    mock_print.assert_any_call(DISPLAY_TITLE)
+
+    l_record = [json.loads(s) for s in (outputdir / 'treeLog.jsonl').read_text().splitlines()]
+    assert sorted(Path(r['input']).name for r in l_record) == ['0.dcm', '1.dcm']
+    assert all(r['tree']['finished'] and r['tree']['title'] == 'QA-Check' for r in l_record)
+    assert [n['title'] for n in l_record[0]['nodes']][-1] == 'QA-Check'
+    d_stats = cube.stats()
+    assert d_stats['workflows'] == 8
+    # both QA failures are in the one fake feed, which is renamed once
+    assert d_stats['routes']['PUT <id>/'] == 1
+    assert cube.d_feed[1]['name'] == 'QA-failed:fakecube'
+
+
+def test_main_async_cap_with_few_io_threads(mocker, tmp_path: Path):
+    """
+    An --async run whose trees outnumber the I/O threads, with a cap on
+    in-flight workflows, must not deadlock on the cap.
+    """
+    inputdir = tmp_path / 'incoming'
+    outputdir = tmp_path / 'outgoing'
+    inputdir.mkdir()
+    outputdir.mkdir()
+    for i in range(6):
+        (inputdir / ('%d.dcm' % i)).write_bytes(bytes([i]) * 64)
 
-    expected_output_file = outputdir / 'bar.txt'
-    assert expected_output_file.exists()
-    assert expected_output_file.read_text() == 'did nothing successfully!'
+    cube = fakecube.FakeCUBE(
+        pipelines=fakecube.pipelines_fromSpec(dag.flowSpec_load()),
+        latency={'default': 0.02},
+    )
+    options = parser.parse_args(
+        ['--CUBEurl', cube.start(), '--pluginInstanceID', '1', '--pollInterval', '0.02',
+         '--async', '--maxTrees', '6', '--ioThreads', '2', '--inflight', 'workflow=1']
+    )
+    mocker.patch('builtins.print')
+    run = threading.Thread(target=main, args=(options, inputdir, outputdir), daemon=True)
+    try:
+        run.start()
+        run.join(60)
+    finally:
+        cube.stop()
+    assert not run.is_alive()
+    l_record = [json.loads(s) for s in (outputdir / 'treeLog.jsonl').read_text().splitlines()]
+    assert len(l_record) == 6
+    assert all(r['tree']['finished'] for r in l_record)
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+from chris_plugin import PathMapper
+
+from control.filter import PathFilter, pattern_match
+
+
+def tree_make(root: Path):
+    for str_path in ('a.dcm', 'notes.txt', 'x/b.dcm', 'x/y/c.dcm', 'scratch/d.dcm', 'x/y/z/e.dcm'):
+        (root / str_path).parent.mkdir(parents=True, exist_ok=True)
+        (root / str_path).write_bytes(b'')
+
+
+def test_pattern_match():
+    assert pattern_match('a.dcm', '**/*dcm')
+    assert pattern_match('x/y/c.dcm', '**/*dcm')
+    assert pattern_match('x/y/c.dcm', '*.dcm')
+    assert not pattern_match('b.dcm', 'x/*.dcm')
+    assert pattern_match('x/b.dcm', 'x/*.dcm')
+    assert not pattern_match('notes.txt', '**/*dcm')
+
+
+def test_stream_matches_path_mapper(tmp_path):
+    inputdir, outputdir = tmp_path / 'in', tmp_path / 'out'
+    tree_make(inputdir)
+    l_stream = sorted(PathFilter(inputdir, outputdir, stream=True, include='**/*dcm'))
+    l_mapper = sorted(PathMapper.file_mapper(inputdir, outputdir, glob='**/*dcm'))
+    assert l_stream == l_mapper
+
+
+def test_stream_exclude_and_depth(tmp_path):
+    inputdir, outputdir = tmp_path / 'in', tmp_path / 'out'
+    tree_make(inputdir)
+    l_log = []
+    Filter = PathFilter(inputdir, outputdir, stream=True, include='*.dcm,*.txt',
+                        exclude='scratch', maxDepth=1, logger=l_log.append)
+    it = iter(Filter)
+    # nothing is walked until the first match is asked for
+    assert Filter.d_stats == {}
+    l_rel = sorted(str(i.relative_to(inputdir)) for i, _ in it)
+    assert l_rel == ['a.dcm', 'notes.txt', 'x/b.dcm']
+    assert Filter.d_stats['excluded'] == 1 and Filter.d_stats['pruned'] == 1
+    assert len(l_log) == 2 and l_log[-1].startswith('Matched 3 of ')
+
+
+def test_stream_ends_on_symlink_loop(tmp_path):
+    inputdir, outputdir = tmp_path / 'in', tmp_path / 'out'
+    tree_make(inputdir)
+    (inputdir / 'x' / 'y' / 'up').symlink_to(inputdir / 'x')
+    (inputdir / 'link').symlink_to(inputdir / 'x' / 'y')
+    Filter = PathFilter(inputdir, outputdir, stream=True, include='**/*dcm', maxDepth=-1)
+    l_rel = sorted(str(i.relative_to(inputdir)) for i, _ in Filter)
+    # every directory is walked once, whichever of its paths is found first
+    assert len(l_rel) == 5 and {Path(s).name for s in l_rel} == {'a.dcm', 'b.dcm', 'c.dcm', 'd.dcm', 'e.dcm'}
+    assert Filter.d_stats['revisits'] >= 1
@@ -0,0 +1,56 @@
+from pathlib import Path
+
+import pytest
+
+from control.granularity import GranularityPlanner, inputs_shard, shard_parse
+
+
+def test_files_packed_into_batches(tmp_path):
+    for i in range(7):
+        (tmp_path / ('im%d.dcm' % i)).write_bytes(b'x' * 10)
+    l_batch = [b for b, _ in GranularityPlanner(tmp_path, tmp_path, glob='**/*dcm', batchFiles=3)]
+    assert [len(b) for b in l_batch] == [3, 3, 1]
+    assert l_batch[0].filter_args() == '--fileFilter=im0.dcm,im1.dcm,im2.dcm'
+    assert l_batch[0].name == 'im0.dcm+2'
+
+    l_batch = [b for b, _ in GranularityPlanner(tmp_path, tmp_path, glob='**/*dcm', batchFiles=10, batchBytes=25)]
+    assert [len(b) for b in l_batch] == [2, 2, 2, 1]
+
+
+def test_large_directories_split(tmp_path):
+    (tmp_path / 'big').mkdir()
+    (tmp_path / 'small').mkdir()
+    for i in range(10):
+        (tmp_path / 'big' / ('im%d.dcm' % i)).touch()
+    (tmp_path / 'small' / 'a.dcm').touch()
+    l_batch = [b for b, _ in GranularityPlanner(tmp_path, tmp_path, glob='**/*dcm', inNode=True, maxDirFiles=4)]
+    assert [b.name for b in l_batch] == ['big-part1of3', 'big-part2of3', 'big-part3of3', 'small']
+    assert sorted(len(b) for b in l_batch[:3]) == [3, 3, 4]
+    assert l_batch[-1].filter_args() == '--dirFilter=small;--fileFilter=dcm'
+
+
+def test_shards_partition_inputs_stably():
+    assert shard_parse('') == (0, 1)
+    assert shard_parse('2/4') == (2, 4)
+    for str_bad in ('4/4', '1', 'a/b'):
+        with pytest.raises(ValueError):
+            shard_parse(str_bad)
+    l_input = [(Path('/in/%d/im.dcm' % i), Path('/out')) for i in range(200)]
+    ll_shard = [list(inputs_shard(l_input, Path('/in'), k, 4)) for k in range(4)]
+    assert sorted(t for l in ll_shard for t in l) == sorted(l_input)
+    assert all(30 < len(l) < 70 for l in ll_shard)
+    # the same partition wherever the input space is mounted
+    l_moved = [(Path('/mnt') / i.relative_to('/in'), o) for i, o in l_input]
+    assert [i.relative_to('/mnt') for i, _ in inputs_shard(l_moved, Path('/mnt'), 1, 4)] == \
+           [i.relative_to('/in') for i, _ in ll_shard[1]]
+
+
+def test_batches_named_by_relative_path(tmp_path):
+    for str_dir in ('p1/series', 'p2/series'):
+        (tmp_path / str_dir).mkdir(parents=True)
+        for i in range(2):
+            (tmp_path / str_dir / ('im%d.dcm' % i)).touch()
+    l_batch = [b for b, _ in GranularityPlanner(tmp_path, tmp_path, glob='**/*dcm', inNode=True)]
+    assert [str(b) for b in l_batch] == ['p1/series', 'p2/series']
+    l_batch = [b for b, _ in GranularityPlanner(tmp_path, tmp_path, glob='**/*dcm', batchFiles=2)]
+    assert [str(b) for b in l_batch] == ['p1/series/im0.dcm+1', 'p2/series/im0.dcm+1']
@@ -0,0 +1,48 @@
+import threading
+
+from control.jobber import Jobber, RingBuffer
+
+
+def test_ringbuffer_keeps_tail():
+    buffer = RingBuffer(5)
+    for str_chunk in ['abc', 'defg', 'h']:
+        buffer.append(str_chunk)
+    assert buffer.text() == 'defgh'
+    assert buffer.dropped == 3
+
+
+def test_job_run_drains_both_streams(tmp_path):
+    script = tmp_path / 'noisy.sh'
+    script.write_text(
+        '#!/bin/bash\n'
+        'head -c 200000 /dev/zero | tr "\\0" e >&2\n'
+        'echo out\n'
+        'exit 3\n'
+    )
+    script.chmod(0o755)
+    shell = Jobber({'jobDir': str(tmp_path / 'jobs'), 'bufferSize': 1000, 'spill': True})
+    d_job = shell.job_run(str(script))
+    assert d_job['returncode'] == 3
+    assert d_job['stdout'] == 'out\n'
+    assert len(d_job['stderr']) == 1000
+    assert d_job['truncated']
+    assert (tmp_path / 'jobs' / ('%s.json' % d_job['jobid'])).exists()
+    assert len((tmp_path / 'jobs' / ('%s.stderr' % d_job['jobid'])).read_text()) == 200000
+
+
+def test_job_run_timeout_and_cancel(tmp_path):
+    shell = Jobber({'jobDir': str(tmp_path)})
+    d_job = shell.job_run('sleep 30', timeout=0.2)
+    assert d_job['timedout'] and d_job['returncode'] != 0
+
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+    d_job = shell.job_run('sleep 30', cancel=cancel)
+    assert d_job['cancelled'] and d_job['returncode'] != 0
+
+
+def test_job_run_without_job_logging(tmp_path):
+    shell = Jobber({'jobDir': str(tmp_path / 'jobs'), 'noJobLogging': True})
+    d_job = shell.job_run('echo quiet')
+    assert d_job['stdout'] == 'quiet\n'
+    assert not (tmp_path / 'jobs').exists()
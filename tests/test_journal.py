@@ -0,0 +1,63 @@
+from state import journal, records
+
+
+def test_journal_replays_tree_state(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    Journal = journal.TreeJournal(path=path)
+    Journal.record('a.dcm', 'seed', seed={'status': True, 'branchInstanceID': 7})
+    Journal.record(
+        'a.dcm',
+        'submit',
+        node='inference',
+        submit={'detail': {'data': [{'id': 8, 'title': 'heatmaps'}]}, 'waitFor': 'heatmaps'},
+    )
+    Journal.record(
+        'a.dcm',
+        'done',
+        node='inference',
+        result=records.NodeResult(
+            finished=True, plid=8, plinst=records.PluginInstance.from_api({'id': 8, 'summary': 'big'})
+        ).record(),
+    )
+    Journal.record('a.dcm', 'submit', node='merge', submit={'detail': {'id': 9}, 'waitFor': 'merge'})
+    Journal.close()
+    with open(path, 'a') as fp:
+        fp.write('{"tree": "a.dcm", "event": "do')
+
+    resumed = journal.TreeJournal(path=path, resume=True)
+    d_state = resumed.tree_state('a.dcm')
+    assert d_state['seed']['branchInstanceID'] == 7
+    assert d_state['done']['inference']['plinst']['id'] == 8
+    assert 'summary' not in d_state['done']['inference']['plinst']
+    assert 'merge' in d_state['submit'] and 'merge' not in d_state['done']
+    assert 'end' not in d_state
+    resumed.close()
+
+
+def test_resume_from_torn_journal(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    Journal = journal.TreeJournal(path=path)
+    Journal.record('a', 'seed', seed={'status': True, 'branchInstanceID': 1})
+    Journal.close()
+    with open(path, 'a') as fp:
+        fp.write('{"tree": "a", "event": "do')
+
+    resumed = journal.TreeJournal(path=path, resume=True)
+    resumed.record('b', 'seed', seed={'status': True, 'branchInstanceID': 2})
+    resumed.close()
+    assert sorted(journal.journal_load(path)) == ['a', 'b']
+    assert journal.journal_load(path)['b']['seed']['branchInstanceID'] == 2
+
+
+def test_flow_reattaches_unfinished_nodes():
+    from control import action
+
+    flow = action.LLDcomputeflow.__new__(action.LLDcomputeflow)
+    flow.d_resume = {
+        'submit': {'a': {'detail': {'id': 1}, 'waitFor': 'a'}, 'b': {'detail': {}, 'waitFor': 'b'}},
+        'done': {'a': {'finished': True}, 'b': {'finished': False}},
+    }
+    assert flow.flowNode_reattach({'id': 'a'}) == {}
+    assert flow.nodesDone_resumed() == {'a': records.NodeResult(finished=True)}
+    flow.d_resume['done'].pop('b')
+    assert flow.flowNode_reattach({'id': 'b'})['reattached']
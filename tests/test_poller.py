@@ -0,0 +1,98 @@
+import pytest
+from control.poller import StatusPoller, pollPolicies_build
+
+
+class FakeClient:
+    def __init__(self, d_status):
+        self.d_status = d_status
+        self.l_query = []
+
+    def get_plugin_instances(self, search_params):
+        self.l_query.append(search_params)
+        l_data = [
+            {'id': i, 'feed_id': f, 'status': s}
+            for i, (f, s) in self.d_status.items()
+            if f == search_params['feed_id']
+        ]
+        limit, offset = search_params['limit'], search_params['offset']
+        return {
+            'data': l_data[offset:offset + limit],
+            'hasNextPage': offset + limit < len(l_data),
+            'total': len(l_data),
+        }
+
+    def get_plugin_instance_by_id(self, id):
+        self.l_query.append({'id': id})
+        f, s = self.d_status[id]
+        return {'id': id, 'feed_id': f, 'status': s}
+
+
+class FailingClient(FakeClient):
+    def get_plugin_instances(self, search_params):
+        self.l_query.append(search_params)
+        raise ConnectionError('CUBE is down')
+
+
+def test_poll_once_queries_feed_in_bulk():
+    cl = FakeClient({1: (9, 'started'), 2: (9, 'finishedSuccessfully'), 3: (9, 'started'), 4: (8, 'started')})
+    statusPoller = StatusPoller(client=cl)
+    statusPoller.start = lambda: None
+    futures = {i: statusPoller.watch(i, 9) for i in (1, 2, 3)}
+    statusPoller.watch(4)
+
+    assert statusPoller.poll_once() == 1
+    assert cl.l_query == [{'feed_id': 9, 'limit': 100, 'offset': 0}, {'id': 4}]
+    assert futures[2].result(timeout=0)['status'] == 'finishedSuccessfully'
+    assert not futures[1].done()
+    assert statusPoller.status_last(1)['status'] == 'started'
+
+    cl.d_status[1] = (9, 'finishedWithError')
+    cl.d_status[3] = (9, 'finishedSuccessfully')
+    cl.d_status[4] = (8, 'finishedSuccessfully')
+    assert statusPoller.poll_once() == 3
+    assert futures[1].result(timeout=0)['status'] == 'finishedWithError'
+    assert statusPoller.d_waiter == {}
+
+
+def test_large_feed_falls_back_to_id_queries():
+    cl = FakeClient({i: (9, 'started') for i in range(1, 1001)})
+    statusPoller = StatusPoller(client=cl, pageLimit=10)
+    statusPoller.start = lambda: None
+    for i in (995, 500, 20):
+        statusPoller.watch(i, 9)
+
+    statusPoller.poll_once()
+    # one page of the feed, then the three IDs by id -- not 100 pages
+    assert len(cl.l_query) == 4
+    assert [q.get('id') for q in cl.l_query[1:]] == [20, 500, 995]
+    assert statusPoller.status_last(500)['status'] == 'started'
+
+
+def test_adaptive_policy_backs_off_to_cap():
+    d_policy = pollPolicies_build(
+        'adaptive', 5, '{"heatmaps": {"expect": 60, "jitter": 0}, "default": {"jitter": 0}}'
+    )
+    statusPoller = StatusPoller(policies=d_policy)
+    policy = statusPoller.policy_forTitle('generate-landmark-HEATMAPS')
+    assert policy.delay_first() == 60
+    l_interval = [0.0]
+    for _ in range(10):
+        l_interval.append(policy.interval_next(l_interval[-1]))
+    assert l_interval[1] == 1.0
+    assert l_interval[2] == 1.5
+    assert l_interval[-1] == 30.0
+    assert statusPoller.policy_forTitle('QA-Check') is d_policy['default']
+
+
+def test_failed_poll_reschedules_waiters():
+    cl = FailingClient({1: (9, 'started'), 2: (9, 'started')})
+    statusPoller = StatusPoller(client=cl, interval=30)
+    statusPoller.start = lambda: None
+    for i in (1, 2):
+        statusPoller.watch(i, 9)
+
+    with pytest.raises(ConnectionError):
+        statusPoller.poll_once()
+    assert statusPoller.ids_due(dueOnly=True) == []
+    assert statusPoller.load()['failed'] == 1
+    assert all(d['polls'] == 1 for d in statusPoller.d_waiter.values())
@@ -0,0 +1,49 @@
+import json
+import os
+
+import pytest
+
+from control.granularity import Batch
+from control.priority import PriorityScheduler
+
+
+def test_manifest_then_studydate(tmp_path, dicom_write):
+    for str_name, str_date in (('a', '20240101'), ('b', '20260101'), ('c', '20250101'), ('stat', '20200101')):
+        dicom_write(tmp_path / (str_name + '.dcm'), StudyDate=str_date)
+    (tmp_path / 'nodate.dcm').write_bytes(b'')
+    l_input = [(tmp_path / n, None) for n in ('a.dcm', 'b.dcm', 'nodate.dcm', 'c.dcm', 'stat.dcm')]
+    scheduler = PriorityScheduler(l_input, keys='manifest,-studydate', inputdir=tmp_path,
+                                  manifest=json.dumps({'stat*': 0}))
+    assert [i.name for i, _ in scheduler] == ['stat.dcm', 'b.dcm', 'c.dcm', 'a.dcm', 'nodate.dcm']
+    assert scheduler.d_stats == {'ordered': 5, 'failed': 1}
+
+
+def test_earliest_deadline_first(tmp_path):
+    for i, str_name in enumerate(('old', 'new', 'urgent')):
+        (tmp_path / str_name).write_bytes(b'x' * (3 - i))
+        os.utime(tmp_path / str_name, (1000 + i, 1000 + i))
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(json.dumps({'urgent': {'deadline': 1500}}))
+    l_input = [(tmp_path / n, None) for n in ('old', 'new', 'urgent')]
+    l_order = [i.name for i, _ in PriorityScheduler(l_input, keys='edf', manifest=str(manifest), slack=600)]
+    assert l_order == ['urgent', 'old', 'new']
+    assert [i.name for i, _ in PriorityScheduler(l_input, keys='size')] == ['urgent', 'new', 'old']
+    # no keys: the mapper order; a window only reorders that many at a time
+    assert [i.name for i, _ in PriorityScheduler(l_input)] == ['old', 'new', 'urgent']
+    assert [i.name for i, _ in PriorityScheduler(l_input, keys='-mtime', window=1)] == ['new', 'urgent', 'old']
+    with pytest.raises(ValueError):
+        PriorityScheduler(l_input, keys='colour')
+
+
+def test_batch_keyed_on_most_urgent_file(tmp_path):
+    for str_name, mtime in (('a1', 1000), ('a2', 4000), ('b1', 2000), ('b2', 3000)):
+        (tmp_path / str_name).write_bytes(b'x')
+        os.utime(tmp_path / str_name, (mtime, mtime))
+    l_input = [
+        (Batch('a', ['a1', 'a2'], paths=[tmp_path / 'a1', tmp_path / 'a2']), None),
+        (Batch('b', ['b1', 'b2'], paths=[tmp_path / 'b1', tmp_path / 'b2']), None),
+    ]
+    # oldest first: a has the oldest file; newest first: a has the newest
+    assert [b.name for b, _ in PriorityScheduler(l_input, keys='mtime')] == ['a', 'b']
+    assert [b.name for b, _ in PriorityScheduler(l_input, keys='-mtime')] == ['a', 'b']
+    assert [b.name for b, _ in PriorityScheduler(l_input[::-1], keys='-mtime')] == ['a', 'b']
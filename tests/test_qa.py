@@ -0,0 +1,56 @@
+from control.qa import QAQueue
+
+
+class FakeCUBE:
+    def __init__(self, d_name, failures=0):
+        self.d_name = d_name
+        self.failures = failures
+        self.l_put = []
+
+    def get_feed_by_id(self, id):
+        return {'id': id, 'name': self.d_name[id]}
+
+    def put(self, url, d_data):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('CUBE unavailable')
+        self.l_put.append(url)
+        self.d_name[int(url.rstrip('/').rsplit('/', 1)[-1])] = d_data['name']
+
+
+def plinst(id, feed, failed):
+    return {'id': id, 'feed_id': feed, 'plugin_name': 'pl-lld_chxr',
+            'summary': 'QA check failed' if failed else 'QA check passed'}
+
+
+def test_renames_coalesced_and_idempotent():
+    cube = FakeCUBE({1: 'a', 2: 'QA-failed:b', 3: 'c'})
+    qaQueue = QAQueue(client=cube, request=cube, url='http://cube/api/v1/', delay=60)
+    assert qaQueue.outcome_put(plinst(10, 1, True))
+    assert qaQueue.outcome_put(plinst(11, 1, True))
+    assert qaQueue.outcome_put(plinst(11, 1, True))
+    assert qaQueue.outcome_put(plinst(12, 2, True))
+    assert not qaQueue.outcome_put(plinst(13, 3, False))
+    # nothing is renamed while the trees run
+    assert cube.l_put == []
+    qaQueue.stop()
+    assert cube.l_put == ['http://cube/api/v1/1/']
+    assert cube.d_name == {1: 'QA-failed:a', 2: 'QA-failed:b', 3: 'c'}
+    d_stats = qaQueue.stats()
+    assert (d_stats['passed'], d_stats['failed']) == (1, 3)
+    assert (d_stats['renamed'], d_stats['already'], d_stats['pending']) == (1, 1, 0)
+
+
+def test_failed_rename_retried():
+    cube = FakeCUBE({1: 'a', 2: 'b'}, failures=1)
+    qaQueue = QAQueue(client=cube, request=cube, url='', delay=0, backoff=0.01, retries=1)
+    qaQueue.outcome_put(plinst(10, 1, True))
+    qaQueue.stop()
+    assert cube.d_name[1] == 'QA-failed:a'
+    assert qaQueue.stats()['retried'] == 1
+    # out of retries
+    cube.failures = 2
+    qaQueue.outcome_put(plinst(11, 2, True))
+    qaQueue.stop()
+    assert cube.d_name[2] == 'b'
+    assert qaQueue.stats()['abandoned'] == 1
@@ -0,0 +1,29 @@
+from state import records
+
+
+def test_node_result_round_trips_without_prior_chain():
+    first = records.NodeResult(finished=True, plid=3)
+    last = records.NodeResult(
+        finished=True,
+        status='finishedSuccessfully',
+        plid=9,
+        plinst=records.PluginInstance.from_api({'id': 9, 'title': 'QA-Check', 'summary': 'big'}),
+        workflow=records.workflow_compact({'data': [{'id': 8, 'title': 'heatmaps'}, {'id': 9}]}),
+        prior=first,
+    )
+    d_record = last.record()
+    assert 'prior' not in d_record and 'summary' not in d_record['plinst']
+    restored = records.NodeResult.from_record(d_record)
+    assert restored.plinst == last.plinst and restored.workflow == last.workflow
+    assert restored.workflow_detail()['data'][0]['title'] == 'heatmaps'
+    assert [r.plid for r in last.chain()] == [3, 9]
+    assert not hasattr(last, '__dict__')
+
+
+def test_raw_store_is_bounded():
+    store = records.RawStore(maxItems=2)
+    for plid in range(5):
+        store.put(plid, {'id': plid})
+    assert store.get(0) is None and store.get(4) == {'id': 4}
+    assert store.dropped == 3
+    records.RawStore().put(1, {'id': 1})
@@ -0,0 +1,100 @@
+import pytest
+from chrisclient.exceptions import ChrisRequestException
+
+from control import action
+from control.retry import CUBEFailure, RetryPolicy, failure_classify
+
+
+class FlakyClient:
+    def __init__(self, l_error):
+        self.l_error = list(l_error)
+        self.calls = 0
+
+    def respond(self):
+        self.calls += 1
+        if self.l_error:
+            raise self.l_error.pop(0)
+        return {'id': 1}
+
+    def get_feed_by_id(self, id):
+        return self.respond()
+
+    def create_workflow(self, id, d_data):
+        return self.respond()
+
+
+def policy_make(l_sleep, **kwargs):
+    return RetryPolicy(sleep=l_sleep.append, jitter=False, backoff=1, **kwargs)
+
+
+def test_failure_classify():
+    assert failure_classify(ChrisRequestException('Request was throttled. Expected available in 7 seconds.')) == 'throttled'
+    assert failure_classify(ChrisRequestException("HTTPConnectionPool: Read timed out. (read timeout=30)")) == 'transient'
+    assert failure_classify(ConnectionResetError()) == 'transient'
+    assert failure_classify(ChrisRequestException('Could not find feed with id 3')) == 'permanent'
+    assert failure_classify('ERROR: 503 Service Unavailable') == 'transient'
+
+
+def test_reads_retried_with_backoff():
+    l_sleep = []
+    policy = policy_make(l_sleep)
+    cl = policy.client_wrap(FlakyClient([ChrisRequestException('Read timed out')] * 3))
+    assert cl.get_feed_by_id(1) == {'id': 1}
+    assert l_sleep == [1, 2, 4]
+    assert policy.stats()['retried'] == 3 and policy.stats()['recovered'] == 1
+
+
+def test_writes_retried_only_if_unsent():
+    l_sleep = []
+    policy = policy_make(l_sleep)
+    flaky = FlakyClient([ChrisRequestException('Max retries exceeded: Connection refused'),
+                         ChrisRequestException('Read timed out'), ChrisRequestException('Read timed out')])
+    cl = policy.client_wrap(flaky)
+    # the timed out POST may have landed, so it is not retried
+    with pytest.raises(CUBEFailure) as failure:
+        cl.create_workflow(1, {})
+    assert flaky.calls == 2
+    assert failure.value.asdict() == {
+        'method': 'create_workflow', 'kind': 'transient', 'attempts': 2,
+        'first': 'Max retries exceeded: Connection refused', 'last': 'Read timed out',
+    }
+    assert 'first: Max retries exceeded' in str(failure.value)
+
+
+def test_throttled_waits_as_asked_and_permanent_fails_fast():
+    l_sleep = []
+    policy = policy_make(l_sleep, retries=1)
+    cl = policy.client_wrap(FlakyClient([ChrisRequestException('throttled, available in 7 seconds')]))
+    assert cl.create_workflow(1, {}) == {'id': 1}
+    assert l_sleep == [7]
+    flaky = FlakyClient([ChrisRequestException('Could not find feed with id 3')])
+    with pytest.raises(CUBEFailure, match='permanent failure of get_feed_by_id after 1 attempt:'):
+        policy.client_wrap(flaky).get_feed_by_id(3)
+    assert flaky.calls == 1
+
+
+class FakeShell:
+    def __init__(self, l_run):
+        self.l_run = l_run
+
+    def job_run(self, str_cmd):
+        return self.l_run.pop(0)
+
+
+def test_seed_script_keeps_first_failure(monkeypatch):
+    PLseed = action.PluginRun()
+    PLseed.retry = policy_make([])
+    monkeypatch.setattr(PLseed, 'chrispl_run_cmd', lambda *args: {'cmd': 'true'})
+    PLseed.shell = FakeShell([
+        {'returncode': 1, 'stdout': '', 'stderr': 'Failed to establish a new connection'},
+        {'returncode': 0, 'stdout': 'created instance 42 of pl-shexec', 'stderr': ''},
+    ])
+    assert PLseed.seed_submitScript('image.dcm')['id'] == 42
+    PLseed.shell = FakeShell([
+        {'returncode': 1, 'stdout': '', 'stderr': 'Failed to establish a new connection'},
+        {'returncode': 2, 'stdout': '', 'stderr': 'Invalid value for fileFilter'},
+    ])
+    d_seed = PLseed.seed_submitScript('image.dcm')
+    assert not d_seed['status'] and d_seed['returncode'] == 2
+    assert d_seed['failure']['first'] == 'Failed to establish a new connection'
+    assert d_seed['failure']['kind'] == 'permanent' and d_seed['failure']['attempts'] == 2
@@ -0,0 +1,64 @@
+import json
+import zlib
+
+from state import records, sink
+
+
+def d_ret_build():
+    first = records.NodeResult(
+        finished=True, status='finishedSuccessfully', plid=3,
+        plinst=records.PluginInstance(id=3, title='heatmaps', feed_id=1),
+    )
+    last = records.NodeResult(
+        finished=True, status='finishedSuccessfully', plid=9,
+        plinst=records.PluginInstance(id=9, title='QA-Check', feed_id=1), prior=first,
+    )
+    return {'seed': {'status': True, 'branchInstanceID': 2, 'run': {'stdout': 'x' * 10000}},
+            'tree': last}
+
+
+def test_tree_compact_flattens_prior_chain():
+    d_record = sink.tree_compact('a.dcm', d_ret_build())
+    assert [n['title'] for n in d_record['nodes']] == ['heatmaps', 'QA-Check']
+    assert d_record['tree']['plid'] == 9
+    assert d_record['seed'] == {'status': True, 'branchInstanceID': 2}
+
+
+def test_compressed_sink_and_legacy_log(tmp_path):
+    ResultSink = sink.ResultSink(path=tmp_path / 'treeLog.jsonl', compress=True)
+    for i in range(3):
+        ResultSink.write(sink.tree_compact('%d.dcm' % i, d_ret_build()))
+    ResultSink.close()
+    assert ResultSink.path.name == 'treeLog.jsonl.gz'
+    assert ResultSink.legacy_write(tmp_path / 'treeLog.json') == 3
+    l_record = json.loads((tmp_path / 'treeLog.json').read_text())
+    assert [r['input'] for r in l_record] == ['0.dcm', '1.dcm', '2.dcm']
+
+
+def test_compressed_sink_flushes_each_record(tmp_path):
+    ResultSink = sink.ResultSink(path=tmp_path / 'treeLog.jsonl', compress=True)
+    for i in range(2):
+        ResultSink.write(sink.tree_compact('%d.dcm' % i, d_ret_build()))
+    # a run that dies now has not closed the log, yet its records are on disk
+    str_text = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(ResultSink.path.read_bytes()).decode()
+    assert [json.loads(s)['input'] for s in str_text.splitlines()] == ['0.dcm', '1.dcm']
+    ResultSink.close()
+
+
+def test_shard_logs_merge(tmp_path):
+    for k, l_input in enumerate([['b.dcm', 'c.dcm'], ['a.dcm', 'c.dcm']]):
+        ResultSink = sink.ResultSink(path=tmp_path / ('treeLog.shard-%d-of-3.jsonl' % k), compress=k)
+        for str_input in l_input:
+            d_record = sink.tree_compact(str_input, d_ret_build())
+            if k:
+                d_record['tree']['finished'] = False
+            ResultSink.write(d_record)
+        ResultSink.close()
+    d_merge = sink.treeLogs_merge([tmp_path], tmp_path / 'merged.jsonl', legacy=tmp_path / 'merged.json')
+    assert d_merge['read'] == 4 and d_merge['written'] == 3
+    assert d_merge['missing'] == {3: [2]}
+    l_record = list(sink.treeLog_read(tmp_path / 'merged.jsonl'))
+    assert [r['input'] for r in l_record] == ['a.dcm', 'b.dcm', 'c.dcm']
+    # the fully grown record of c.dcm is kept over the later, unfinished one
+    assert l_record[2]['tree']['finished']
+    assert len(json.loads((tmp_path / 'merged.json').read_text())) == 3
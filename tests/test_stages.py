@@ -0,0 +1,94 @@
+import os
+import threading
+from concurrent.futures import Future
+
+from control import dag, stages
+from state import records
+
+
+SPEC = dag.FlowSpec(
+    {
+        'nodes': [
+            {'id': 'a', 'type': 'workflow', 'pipeline': 'p', 'attach': 'seed'},
+            {'id': 'j', 'type': 'join', 'parent': 'a'},
+            {'id': 'b', 'type': 'workflow', 'pipeline': 'q', 'attach': 'j'},
+        ]
+    }
+)
+
+
+class FakeFlow:
+    '''Resolves every wait after a short delay, on a timer thread.'''
+
+    flowSpec = SPEC
+
+    def __init__(self, fail=()):
+        self.fail = fail
+
+    def flowNode_submit(self, d_node, d_result):
+        return {
+            'detail': d_node['id'],
+            'waitFor': d_node['id'],
+            'waitArgs': {},
+            'prior': None,
+        }
+
+    def nodeWait_begin(self, detail, title, **kwargs):
+        future = Future()
+        threading.Timer(0.02, future.set_result, ({'title': title},)).start()
+        return {'future': future, 'timeout': None, 'title': title}
+
+    def nodeWait_end(self, d_wait, d_plinfo):
+        return records.NodeResult(
+            finished=d_wait['title'] not in self.fail,
+            plinst=records.PluginInstance.from_api(d_plinfo),
+        )
+
+    def flowNode_done(self, d_node, d_ret):
+        return d_ret
+
+    def nodesDone_resumed(self):
+        return {}
+
+
+def test_stage_engine_grows_trees_through_stages():
+    def seed(job):
+        job.flow = FakeFlow(fail=('j',) if job.index == 1 else ())
+        return {'status': True, 'branchInstanceID': 10 + job.index}
+
+    d_result = {}
+    engine = stages.StageEngine(
+        SPEC,
+        seed=seed,
+        done=lambda job: d_result.__setitem__(job.index, job.d_ret),
+        budgets=stages.stageBudgets_parse('seed=2,default=3'),
+        workers=2,
+        maxTrees=4,
+    )
+    assert engine.run((i, None) for i in range(12)) == 12
+
+    assert len(d_result) == 12
+    assert d_result[0]['tree'].plinst.title == 'b'
+    assert not d_result[1]['tree'].finished
+    d_stats = engine.stats()
+    assert d_stats['a']['entered'] == 12
+    assert d_stats['b']['entered'] == 11
+    assert d_stats['a']['peak'] <= 3
+
+
+def test_failed_seed_finishes_tree():
+    l_result = []
+    engine = stages.StageEngine(
+        SPEC, seed=lambda job: {'status': False}, done=lambda job: l_result.append(job.d_ret)
+    )
+    assert engine.run([(0, None)]) == 1
+    assert l_result[0]['tree'].error == 'unable to grow tree'
+
+
+def test_unlimited_seed_budget_keeps_default_workers():
+    engine = stages.StageEngine(SPEC, budgets={'seed': 0})
+    assert engine.d_stage['seed'].workers == (os.cpu_count() or 1)
+    assert engine.d_stage['seed'].slots is None
+    engine = stages.StageEngine(SPEC, budgets={'seed': 2})
+    assert engine.d_stage['seed'].workers == 2
+    assert engine.d_stage['seed'].budget == 2
@@ -0,0 +1,48 @@
+import json
+import urllib.request
+
+import pytest
+
+from state.status import RunStatus, address_parse
+
+
+def test_snapshot_counts_trees_by_stage():
+    runStatus = RunStatus()
+    l_input = list(runStatus.inputs_count(iter([('a', 'o'), ('b', 'o'), ('c', 'o'), ('d', 'o')])))
+    assert len(l_input) == 4
+    for str_tree in ('a', 'b', 'c'):
+        runStatus.tree_begin(str_tree)
+    runStatus.tree_stage('b', 'heatmaps')
+    runStatus.wait_begin('b', 7, 70)
+    runStatus.tree_stage('c', 'join')
+    runStatus.wait_begin('c', 8)
+    runStatus.tree_end('a', 'finished')
+    runStatus.started -= 3600
+    d_status = runStatus.snapshot()
+    assert d_status['trees'] == {
+        'discovered': 4, 'discovering': False, 'queued': 1, 'growing': 2,
+        'finished': 1, 'failed': 0, 'resumed': 0,
+    }
+    assert d_status['stages'] == {'heatmaps': 1, 'join': 1}
+    assert (d_status['waiting'], d_status['workflows']) == (2, [70])
+    # one tree an hour, with three to go
+    assert d_status['treesPerHour'] == pytest.approx(1, rel=0.01)
+    assert d_status['eta'] == pytest.approx(3 * 3600, rel=0.01)
+    runStatus.wait_end('b', 7)
+    assert runStatus.snapshot()['workflows'] == []
+
+
+def test_status_written_and_served(tmp_path):
+    runStatus = RunStatus(path=tmp_path / 'status.json', interval=0, address='0')
+    runStatus.source_add('poll', lambda: {'watched': 3})
+    str_url = runStatus.start()
+    try:
+        with urllib.request.urlopen(str_url) as response:
+            assert json.load(response)['poll'] == {'watched': 3}
+    finally:
+        runStatus.close()
+    assert json.loads((tmp_path / 'status.json').read_text())['trees']['discovered'] == 0
+    assert [p.name for p in tmp_path.iterdir()] == ['status.json']
+    assert address_parse('0.0.0.0:8080') == ('0.0.0.0', 8080)
+    with pytest.raises(ValueError):
+        address_parse('localhost')
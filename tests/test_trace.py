@@ -0,0 +1,56 @@
+import json
+
+from bench import throughput
+from state import trace
+
+
+def test_spans_nest_in_tree_lanes(tmp_path):
+    Tracer = trace.Tracer(path=tmp_path / 'trace.json')
+    Tracer.tree_begin('a.dcm')
+    with Tracer.span('seed', Tracer.lane('a.dcm')) as d_span:
+        d_span['status'] = True
+    token = Tracer.span_begin('waitForNodeInWorkflow heatmaps', Tracer.lane('a.dcm'), plid=3)
+    Tracer.span_end(token, polls=4)
+    Tracer.span_end(token, polls=5)
+    Tracer.tree_end('a.dcm', finished=True)
+    Tracer.span_begin('node never done', Tracer.lane('b.dcm'))
+    Tracer.close()
+
+    l_event = json.loads((tmp_path / 'trace.json').read_text())
+    d_lane = {e['args']['name']: e['tid'] for e in l_event if e['ph'] == 'M'}
+    assert d_lane == {'growth cycle': 0, 'a.dcm': 1, 'b.dcm': 2}
+    d_span = {e['name']: e for e in l_event if e['ph'] == 'X'}
+    assert d_span['waitForNodeInWorkflow heatmaps']['args'] == {'plid': 3, 'polls': 4}
+    assert d_span['seed']['args'] == {'status': True}
+    tree, seed = d_span['tree'], d_span['seed']
+    assert tree['tid'] == seed['tid'] == 1
+    assert tree['ts'] <= seed['ts'] and seed['ts'] + seed['dur'] <= tree['ts'] + tree['dur']
+    assert d_span['node never done']['args'] == {'unfinished': True}
+
+
+def test_disabled_tracer_writes_nothing():
+    Tracer = trace.Tracer()
+    assert not Tracer.enabled()
+    assert Tracer.span_begin('seed') == 0
+    Tracer.tree_begin('a.dcm')
+    with Tracer.span('seed') as d_span:
+        d_span['status'] = True
+    Tracer.close()
+    assert Tracer.count == 0
+
+
+def test_controller_trace(tmp_path):
+    d_report = throughput.main(
+        ['--trees', '2', '--mode', 'pipelined', '--latency', 'default=0.02',
+         '--pollInterval', '0.02', '--workdir', str(tmp_path), '--', '--trace']
+    )
+    assert d_report['returncode'] == 0
+    l_event = json.loads((tmp_path / 'outgoing' / 'trace.json').read_text())
+    l_span = [e for e in l_event if e['ph'] == 'X']
+    l_cat = [e['cat'] for e in l_span]
+    assert l_cat.count('tree') == l_cat.count('seed') == 2
+    assert l_cat.count('growth') == 1
+    assert l_cat.count('QA_check') == 2
+    assert {'node', 'workflow_schedule', 'topologicalNode_run', 'waitForNodeInWorkflow'} <= set(l_cat)
+    assert all('polls' in e['args'] for e in l_span if e['cat'] == 'waitForNodeInWorkflow')
+    assert not any(e['args'].get('unfinished') for e in l_span)